@@ -0,0 +1,189 @@
+"""Batch analysis of whole directories of experiment files, without the GUI.
+
+Every file is imported and fitted exactly as the app's Import File and
+Calculate Speed buttons do (importer.import_file, then estimator.fit_flat
+or a robust fit). Files are spread over a process pool and each one's
+rows are written to the summary as soon as it finishes:
+
+    python batch.py submissions/ -o summary.csv
+    python batch.py lab1/ lab2/run3.csv -o summary.json --fit theil-sen --intervals
+    python batch.py spectra/ --wavelength-unit Å --frequency-unit fs
+
+The summary has one row per reading plus one row per file (reading "all")
+holding the average. Files are read as nm and THz unless the unit options
+say otherwise (a time unit for the second column means it holds periods).
+Nothing here imports Kivy.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from estimator import fit_flat, percent_error
+from importer import RAW_EXTENSIONS, import_file
+from readings import ReadingStore
+from units import DEFAULT, FREQUENCY_UNITS, PERIOD_UNITS, WAVELENGTH_UNITS, Conversion
+
+EXTENSIONS = (".csv", ".txt", ".npy") + RAW_EXTENSIONS  # The app's file chooser filters
+FIELDS = ["file", "reading", "points", "speed", "error_percent", "ci_low", "ci_high", "status"]
+FITS = ("least-squares", "theil-sen", "ransac")
+
+
+def find_files(paths):
+    """Expands directories (recursively) into the data files they contain, sorted."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found += [os.path.join(root, name) for name in sorted(files)
+                          if name.lower().endswith(EXTENSIONS)]
+        else:
+            found.append(path)
+    return found
+
+
+def _row(path, reading, points, speed, low=math.nan, high=math.nan, status="ok"):
+    finite = math.isfinite(speed)
+    return {
+        "file": path,
+        "reading": reading,
+        "points": int(points),
+        "speed": float(speed) if finite else None,
+        "error_percent": float(percent_error(speed)) if finite else None,
+        "ci_low": float(low) if math.isfinite(low) else None,
+        "ci_high": float(high) if math.isfinite(high) else None,
+        "status": status if finite or status != "ok" else "needs two distinct wavelengths",
+    }
+
+
+def analyse_file(path, fit="least-squares", intervals=False, conversion=DEFAULT):
+    """Imports and fits one file; returns its summary rows (readings, then the file)."""
+    store = ReadingStore(columns=("x", "y"))
+    try:
+        import_file(store, path, conversion=conversion)
+    except (OSError, ValueError) as e:
+        return [_row(path, "all", 0, math.nan, status=f"error: {e}")]
+    x, y, offsets = store.flat("x", "y")
+    lengths = store.lengths
+
+    if fit != "least-squares":
+        from robust import robust_fit_flat
+
+        speeds = np.array([f.speed for f in robust_fit_flat(x, y, offsets, fit)])
+        low = high = np.full(len(speeds), math.nan)
+        average_low = average_high = math.nan
+    elif intervals:
+        from uncertainty import speed_intervals
+
+        result = speed_intervals(x, y, offsets, workers=1)  # Already inside a pool worker
+        speeds, low, high = result.speeds, result.low, result.high
+        average_low, average_high = result.average_low, result.average_high
+    else:
+        speeds = fit_flat(x, y, offsets).speeds
+        low = high = np.full(len(speeds), math.nan)
+        average_low = average_high = math.nan
+
+    rows = [_row(path, i + 1, lengths[i], speeds[i], low[i], high[i]) for i in range(len(speeds))]
+    valid = speeds[np.isfinite(speeds)]
+    average = math.fsum(valid) / len(valid) if len(valid) else math.nan
+    rows.append(_row(path, "all", store.total, average, average_low, average_high))
+    return rows
+
+
+class SummaryWriter:
+    """Streams rows to CSV, or to a JSON array that is valid once closed."""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        self._first = True
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, FIELDS)
+            self._csv.writeheader()
+        else:
+            stream.write("[")
+
+    def write(self, rows):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        else:
+            for row in rows:
+                self.stream.write(("\n  " if self._first else ",\n  ") + json.dumps(row))
+                self._first = False
+        self.stream.flush()
+
+    def close(self):
+        if self.fmt == "json":
+            self.stream.write("\n]\n")
+        self.stream.flush()
+
+
+def run(paths, output=None, fmt=None, fit="least-squares", intervals=False, workers=None,
+        conversion=DEFAULT):
+    """Analyses every file under ``paths`` and writes the summary; returns the number of files."""
+    files = find_files(paths)
+    if fmt is None:
+        fmt = "json" if output and output.lower().endswith(".json") else "csv"
+    stream = open(output, "w", newline="") if output else sys.stdout
+    writer = SummaryWriter(stream, fmt)
+    started = time.perf_counter()
+    try:
+        if workers == 1 or len(files) <= 1:
+            for done, path in enumerate(files, 1):
+                writer.write(analyse_file(path, fit, intervals, conversion))
+                _progress(done, len(files), started)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(analyse_file, path, fit, intervals, conversion) for path in files]
+                for done, future in enumerate(as_completed(futures), 1):
+                    writer.write(future.result())
+                    _progress(done, len(files), started)
+    finally:
+        writer.close()
+        if output:
+            stream.close()
+    return len(files)
+
+
+def _progress(done, total, started):
+    print(f"\r{done}/{total} files, {time.perf_counter() - started:.1f}s", end="", file=sys.stderr)
+    if done == total:
+        print(file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit the speed of light for every file in a batch.")
+    parser.add_argument("paths", nargs="+", help="data files or directories to search")
+    parser.add_argument("-o", "--output", help="summary file (.csv or .json); CSV to stdout if omitted")
+    parser.add_argument("--format", choices=("csv", "json"), help="override the format implied by --output")
+    parser.add_argument("--fit", choices=FITS, default="least-squares")
+    parser.add_argument("--intervals", action="store_true",
+                        help="add 95%% confidence intervals (least squares only)")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--wavelength-unit", default=DEFAULT.wavelength_unit,
+                        help=f"unit of the first column: {', '.join(WAVELENGTH_UNITS)} (default: %(default)s)")
+    parser.add_argument("--frequency-unit", default=DEFAULT.frequency_unit,
+                        help=f"unit of the second column: {', '.join(FREQUENCY_UNITS)}, or "
+                             f"{', '.join(PERIOD_UNITS)} to read it as periods (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        conversion = Conversion(args.wavelength_unit, args.frequency_unit)
+    except ValueError as e:
+        parser.error(str(e))
+    count = run(args.paths, args.output, args.format, args.fit, args.intervals, args.workers, conversion)
+    if count == 0:
+        print("No data files found.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Headless benchmarks for the parse, add, fit and plot paths of the app.
+
+Drives the real MobileSpeedOfLightApp methods on an offscreen Kivy window
+(exports through matplotlib on Agg), over 10 to 10^6 points split across 1 to 1000
+readings, and records the time and peak traced memory of each case. Every
+run is appended as one JSON line to the history file (in the user's cache
+directory, outside the repository), tagged with the git commit, so runs can
+be compared across commits:
+
+    python bench.py                   # full matrix
+    python bench.py --quick           # up to 10^3 points, for a fast check
+    python bench.py --only plot       # cases whose name contains "plot"
+    python bench.py --compare         # latest run against the one before it
+    python bench.py --compare abc123  # latest run against commit abc123
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from kivy.config import Config
+
+Config.set('graphics', 'maxfps', '0')  # Clock.tick must not sleep between deliveries
+
+from kivy.clock import Clock
+import numpy as np
+
+from main import MobileSpeedOfLightApp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HISTORY = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                       'speed-of-light', 'bench_history.jsonl')
+POINTS = (10, 10 ** 3, 10 ** 5, 10 ** 6)
+READINGS = (1, 10, 100, 1000)
+QUICK_POINTS = 10 ** 3
+SLOWER = 1.2  # --compare flags cases that got this much slower
+
+
+def make_values(points, seed=0):
+    """A wavelength sweep (nm) and matching frequencies (THz) with 1% noise."""
+    rng = np.random.default_rng(seed)
+    wavelengths = np.sort(rng.uniform(400, 700, points))
+    frequencies = 2.998e5 / wavelengths * (1 + rng.normal(0, 0.01, points))
+    return wavelengths, frequencies
+
+
+def to_text(values):
+    return ' '.join(map(repr, values.tolist()))
+
+
+def new_app():
+    app = MobileSpeedOfLightApp()
+    app.build()
+    # Plain stand-ins for the TextInputs: the benchmark times parsing, not glyph layout
+    app.wavelength_input = SimpleNamespace(text='')
+    app.frequency_input = SimpleNamespace(text='')
+    return app
+
+
+def fill(app, points, readings):
+    """Loads ``readings`` readings sharing ``points`` points the way an import does."""
+    from estimator import RunningFit
+    from units import DEFAULT
+
+    per_reading = points // readings
+    wavelengths, frequencies = make_values(per_reading * readings)
+    x, y = DEFAULT.apply(wavelengths, frequencies)
+    unknown = np.full(per_reading, np.nan)  # No uncertainties, as with imported files
+    for i in range(readings):
+        part = slice(i * per_reading, (i + 1) * per_reading)
+        index = app.readings.append(x[part], y[part], unknown, unknown)
+        app.running_fits.append(RunningFit.from_arrays(*app.readings.reading(index, 'x', 'y')))
+    app.update_readings_display(range(readings))
+
+
+def wait_for_jobs(app):
+    """Delivers finished background jobs on this thread, as the app's main loop would."""
+    while app.scheduler.busy:
+        time.sleep(0.0005)  # Leave the GIL to the worker
+        Clock.tick()
+
+
+# Each case takes (points, readings), does its untimed setup and returns the call to time
+
+def case_parse(points, readings):
+    app = new_app()
+    text = to_text(make_values(points)[0])
+    return lambda: app.validate_input(text)
+
+
+def case_add_reading(points, readings):
+    app = new_app()
+    per_reading = points // readings
+    wavelengths, frequencies = make_values(per_reading * readings)
+    texts = [(to_text(wavelengths[i * per_reading:(i + 1) * per_reading]),
+              to_text(frequencies[i * per_reading:(i + 1) * per_reading])) for i in range(readings)]
+
+    def run():
+        for x_text, y_text in texts:
+            app.wavelength_input.text = x_text
+            app.frequency_input.text = y_text
+            app.add_reading(None)
+    return run
+
+
+def case_calculate(points, readings):
+    app = new_app()
+    fill(app, points, readings)
+
+    def run():
+        app.calculate_speed_of_light(None)
+        wait_for_jobs(app)
+    return run
+
+
+def case_plot(points, readings):
+    app = new_app()
+    fill(app, points, readings)
+
+    def run():
+        app.plot_graph(None)
+        wait_for_jobs(app)
+    return run
+
+
+def case_replot(points, readings):
+    """Plot once, add one more reading, plot again: the incremental path."""
+    app = new_app()
+    fill(app, points, readings)
+    app.plot_graph(None)
+    wait_for_jobs(app)
+    wavelengths, frequencies = make_values(max(points // readings, 2), seed=1)
+    app.wavelength_input.text = to_text(wavelengths)
+    app.frequency_input.text = to_text(frequencies)
+
+    def run():
+        app.add_reading(None)
+        app.plot_graph(None)
+        wait_for_jobs(app)
+    return run
+
+
+def case_pan(points, readings):
+    """Sixty frames of panning a plot that is already on screen."""
+    app = new_app()
+    fill(app, points, readings)
+    app.plot_graph(None)
+
+    def run():
+        for _ in range(60):
+            app.plot_view.pan(2, 1)
+            app.plot_view.apply_view()
+    return run
+
+
+def case_export(points, readings):
+    app = new_app()
+    fill(app, points, readings)
+    app.plot_graph(None)
+    path = os.path.join(tempfile.gettempdir(), 'bench_plot.png')
+
+    def run():
+        app.exported = None  # Write it every time
+        app.write_plot(path, app.plot_args)
+    return run
+
+
+CASES = {
+    'parse': case_parse,
+    'add_reading': case_add_reading,
+    'calculate': case_calculate,
+    'plot': case_plot,
+    'replot': case_replot,
+    'pan': case_pan,
+    'export': case_export,
+}
+
+
+def matrix(quick=False, only=None):
+    """Every (case, points, readings) to run; each reading gets at least two points."""
+    for name in CASES:
+        if only and only not in name:
+            continue
+        for points in POINTS:
+            if quick and points > QUICK_POINTS:
+                continue
+            for readings in READINGS:
+                if points // readings < 2 or (name == 'parse' and readings > 1):
+                    continue
+                yield name, points, readings
+
+
+def measure(name, points, readings, repeats):
+    """Best wall time over ``repeats`` fresh runs, then one traced run for peak memory."""
+    best = float('inf')
+    for _ in range(repeats):
+        run = CASES[name](points, readings)
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+
+    run = CASES[name](points, readings)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def git_commit():
+    """Short hash of HEAD plus whether the tree has local changes, or (None, None)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip() != ''
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_benchmarks(quick=False, only=None, history=HISTORY):
+    """Runs the matrix, prints each case as it finishes and appends the run to ``history``."""
+    commit, dirty = git_commit()
+    results = {}
+    for name, points, readings in matrix(quick, only):
+        repeats = 1 if points >= 10 ** 5 else 5
+        key = f'{name}/points={points}/readings={readings}'
+        results[key] = measure(name, points, readings, repeats)
+        print(f"{key:40s} {results[key]['seconds'] * 1e3:10.2f} ms "
+              f"{results[key]['peak_bytes'] / 2 ** 20:9.2f} MiB", flush=True)
+
+    record = {
+        'time': time.time(),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+    with open(history, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    return record
+
+
+def load_history(path=HISTORY):
+    """Reads every saved benchmark run from ``path``."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(runs, commit=None):
+    """Prints the latest run against the one before it (or the newest run of ``commit``)."""
+    if len(runs) < 2:
+        print("Need at least two runs in the history to compare.")
+        return
+    latest = runs[-1]
+    earlier = runs[:-1]
+    if commit is not None:
+        earlier = [run for run in earlier if run['commit'] and run['commit'].startswith(commit)]
+        if not earlier:
+            print(f"No earlier run of commit {commit} in the history.")
+            return
+    baseline = earlier[-1]
+
+    print(f"{baseline['commit']} -> {latest['commit']}{' (dirty)' if latest['dirty'] else ''}")
+    for key, result in latest['results'].items():
+        if key not in baseline['results']:
+            continue
+        before = baseline['results'][key]['seconds']
+        ratio = result['seconds'] / before if before else float('inf')
+        flag = '  SLOWER' if ratio > SLOWER else ('  faster' if ratio < 1 / SLOWER else '')
+        print(f"{key:40s} {before * 1e3:10.2f} -> {result['seconds'] * 1e3:10.2f} ms  x{ratio:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help=f'only sizes up to {QUICK_POINTS} points')
+    parser.add_argument('--only', help='only cases whose name contains this')
+    parser.add_argument('--history', default=HISTORY, help='JSON-lines history file')
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT',
+                        help='compare the latest run instead of benchmarking')
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        compare(load_history(args.history), args.compare or None)
+    else:
+        run_benchmarks(args.quick, args.only, args.history)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -37,7 +37,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy,matplotlib,numpy,pillow
+requirements = python3,kivy,matplotlib,numpy,pillow,sqlite3
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
@@ -450,3 +450,15 @@ warn_on_root = 1
 #    Then, invoke the command line with the "demo" profile:
 #
 #buildozer --profile demo android debug
+
+
+#    -----------------------------------------------------------------------------
+#    Slim profile: the plot on screen is drawn by Kivy itself, so matplotlib
+#    (and the pillow it brings in) is only needed for Export PNG. This build
+#    leaves both out; the Export button explains that it is unavailable.
+#
+#buildozer --profile slim android debug
+
+[app@slim]
+title = Speed of light using graph (slim)
+requirements = python3,kivy,numpy,sqlite3
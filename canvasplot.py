@@ -0,0 +1,610 @@
+"""Native λ vs 1/ν plot drawn with Kivy canvas instructions.
+
+Every reading is one or more line-strip Meshes whose vertex buffers are
+float32 numpy arrays, handed to Kivy in place. Vertices are stored in
+coordinates normalized to a "home" frame a little larger than the data, so
+panning and zooming only move three transform instructions; the buffers are
+rewritten only when a reading grows, when data leaves the home frame, or
+when a zoom changes how finely large readings are decimated. The grid,
+tick labels, legend and outlier rings are redrawn in screen coordinates
+once per frame while the view moves.
+
+    plot = CanvasPlot()
+    plot.update(store, outliers=None, trendlines=False)  # After every change
+
+Drag to pan, pinch or scroll to zoom, double-tap to fit the data again.
+matplotlib (plotting.py) is only needed to export a PNG.
+"""
+import math
+
+import numpy as np
+
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import (Color, InstructionGroup, Line, Mesh, PopMatrix, PushMatrix, Rectangle,
+                           Rotate, Scale, StencilPop, StencilPush, StencilUnUse, StencilUse, Translate)
+from kivy.metrics import dp
+from kivy.uix.widget import Widget
+from kivy.utils import get_color_from_hex
+
+from estimator import fit_flat, ragged_to_flat
+from instrument import span
+from plotstyle import (BACKGROUND, LEGEND_MAX, OUTLIER_COLOR, POINTS_PER_BUCKET, READING_COLORS,
+                       TRENDLINE_COLORS, minmax_decimate)
+from trendlines import fit_trendlines, trendline_curves
+
+LIVE_COLOR = '#FFFFFF'
+
+CHUNK = 65535  # Vertices per Mesh: GL ES 2 indices are unsigned shorts
+INDICES = np.arange(CHUNK, dtype=np.uint16)  # Shared by every Mesh, sliced to its length
+VERTEX_FORMAT = [(b'vPosition', 2, 'float')]
+HOME_GROWTH = 0.5  # Fraction of the data span added on each side when the home frame is rebuilt
+VIEW_MARGIN = 0.05  # Padding around the data when the view fits it
+ZOOM_STEP = 1.2  # Per mouse-wheel notch
+MAX_ZOOM = 1e4  # Relative to the home frame; float32 vertices stay sub-pixel up to here
+MAX_BUCKETS = 2 ** 16  # Decimation buckets per reading at the deepest zoom
+OUTLIER_MAX = 2000  # Rings drawn at most (24 vertices each, one Mesh)
+RING_SEGMENTS = 12
+LABEL_CACHE = 256  # Tick label textures kept
+
+
+def nice_ticks(low, high, target=5):
+    """Round tick positions (1, 2, 2.5 or 5 times a power of ten) inside [low, high]."""
+    if not high > low:
+        return np.array([low]), 1.0
+    raw = (high - low) / target
+    magnitude = 10.0 ** math.floor(math.log10(raw))
+    step = next(s * magnitude for s in (1, 2, 2.5, 5, 10) if s * magnitude >= raw)
+    first = math.ceil(low / step)
+    return np.arange(first, math.floor(high / step) + 1) * step, step
+
+
+def tick_labels(ticks, step):
+    """Tick texts with a shared power of ten factored out; returns (texts, exponent)."""
+    largest = np.abs(ticks).max() if len(ticks) else 0
+    exponent = math.floor(math.log10(largest)) if largest > 0 else 0
+    if -3 < exponent < 4:
+        exponent = 0
+    scale = 10.0 ** -exponent
+    scaled = step * scale
+    decimals = next((d for d in range(8) if abs(round(scaled * 10 ** d) - scaled * 10 ** d) < 1e-6), 8)
+    return [f'{t * scale:.{decimals}f}' for t in ticks], exponent
+
+
+def _padded(low, high, fraction):
+    span = high - low
+    if not span > 0:
+        span = abs(low) * 0.01 or 1.0  # A single wavelength still gets a visible frame
+    return low - span * fraction, high + span * fraction
+
+
+class _Series:
+    """One reading: its vertex buffer, the Meshes drawing it and its fit line."""
+
+    def __init__(self, color):
+        self.group = InstructionGroup()
+        self.group.add(Color(*color))
+        self.meshes = []
+        self.fit_color = Color(*color[:3], 0.6)
+        self.fit_mesh = Mesh(fmt=VERTEX_FORMAT, mode='lines', vertices=np.zeros(4, np.float32),
+                             indices=INDICES[:2])
+        self.vertices = np.zeros(0, np.float32)  # Capacity grows by doubling
+        self.count = 0  # Vertices in use
+        self.length = 0  # Full-resolution points of the reading
+        self.decimated = False
+        self.fit_ends = None  # (x, y) ends of the fit line in data units
+
+    def set_vertices(self, u, v):
+        """Replaces the drawn points, reusing the buffer when it is large enough."""
+        n = len(u)
+        if 2 * n > len(self.vertices):
+            self.vertices = np.empty(2 * max(2 * n, 64), np.float32)
+            self.count = 0  # New buffer: every Mesh has to point at it
+        self.vertices[0:2 * n:2] = u
+        self.vertices[1:2 * n:2] = v
+        self._upload(n, 0)
+
+    def append_vertices(self, u, v):
+        """Adds points after the ones already drawn; only the Meshes they touch are updated."""
+        start, n = self.count, self.count + len(u)
+        if 2 * n > len(self.vertices):
+            grown = np.empty(2 * max(2 * n, 64), np.float32)
+            grown[:2 * start] = self.vertices[:2 * start]
+            self.vertices = grown
+            self.count = 0
+        self.vertices[2 * start:2 * n:2] = u
+        self.vertices[2 * start + 1:2 * n:2] = v
+        self._upload(n, start if self.count else 0)
+
+    def _upload(self, n, first_changed):
+        """Points every chunk Mesh from the one holding ``first_changed`` on at the buffer."""
+        # Consecutive chunks share one vertex so the strip stays continuous
+        chunks = max(math.ceil((n - 1) / (CHUNK - 1)), 1) if n else 0
+        # The chunk before the first new vertex ends on it, so it is refreshed too
+        first_chunk = min(max(first_changed - 1, 0) // (CHUNK - 1), len(self.meshes))
+        for k in range(first_chunk, chunks):
+            start = k * (CHUNK - 1)
+            stop = min(start + CHUNK, n)
+            vertices = self.vertices[2 * start:2 * stop]
+            if k < len(self.meshes):
+                mesh = self.meshes[k]
+                mesh.vertices = vertices
+                mesh.indices = INDICES[:stop - start]
+            else:
+                mesh = Mesh(fmt=VERTEX_FORMAT, mode='line_strip', vertices=vertices,
+                            indices=INDICES[:stop - start])
+                self.meshes.append(mesh)
+                self.group.add(mesh)
+        for mesh in self.meshes[chunks:]:
+            self.group.remove(mesh)
+        del self.meshes[chunks:]
+        self.count = n
+
+    def set_fit(self, u, v):
+        self.fit_mesh.vertices = np.array([u[0], v[0], u[1], v[1]], np.float32)
+
+
+class CanvasPlot(Widget):
+    """Interactive plot of every reading, its fit line, outliers and trendlines.
+
+    ``update`` brings the plot in line with a ReadingStore; only readings that
+    are new or grew are touched, and a grown reading that is drawn in full
+    only uploads its new points. Readings with more points than the plot has
+    pixel columns are drawn from a min/max decimation, redone for the zoom
+    level once a gesture ends; the fit lines always use the full data.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.series = []
+        self.live = None  # Streamed samples, drawn over the readings
+        self._live = None  # (x, y) behind the live series, sorted by x
+        self.auto = True  # The view follows the data until the user pans or zooms
+        self.trends = None  # Trendlines on show, for their residual and AIC figures
+        self._home = None  # (x0, x1, y0, y1) data frame the vertices are normalized to
+        self._bounds = None  # (xmin, xmax, ymin, ymax) of everything drawn
+        self._view = (0.0, 1.0, 0.0, 1.0)  # Shown part of the home frame, normalized
+        self._store = None  # Readings the series were built from, for re-decimation
+        self._outliers = None
+        self._trend_key = None
+        self._trend_series = []
+        self._lod = 0  # Decimation level: buckets double with every level
+        self._lod_key = None  # (level, plot width) the series were last decimated for
+        self._touches = []
+        self._labels = {}  # (text, size, colour) -> texture
+
+        with self.canvas.before:
+            Color(*get_color_from_hex(BACKGROUND))
+            self._background = Rectangle()
+        with self.canvas:
+            self._grid = InstructionGroup()  # Screen coordinates
+            StencilPush()
+            self._clip = Rectangle()
+            StencilUse()
+            PushMatrix()
+            self._offset = Translate()
+            self._scale = Scale(1, 1, 1)
+            self._origin = Translate()
+        self._data = InstructionGroup()  # Normalized coordinates under the transform
+        self.canvas.add(self._data)
+        with self.canvas:
+            PopMatrix()
+            self._overlay = InstructionGroup()  # Outlier rings, screen coordinates
+            StencilUnUse()
+            self._unclip = Rectangle()
+            StencilPop()
+        with self.canvas.after:
+            self._text = InstructionGroup()  # Ticks, titles, legend
+
+        self._redraw = Clock.create_trigger(self.apply_view)  # At most once per frame
+        self._relod = Clock.create_trigger(self.refresh_lod, 0.15)  # Once a gesture settles
+        self.bind(pos=self._redraw, size=self._redraw)
+        self.bind(size=self._relod)  # Buckets follow the plot's width
+
+    # Geometry
+
+    @property
+    def plot_rect(self):
+        """(x, y, width, height) of the data area, in the widget's parent coordinates."""
+        left, bottom, right, top = dp(58), dp(40), dp(10), dp(26)
+        return (self.x + left, self.y + bottom,
+                max(self.width - left - right, 1), max(self.height - bottom - top, 1))
+
+    @property
+    def lod_ratio(self):
+        """Full-resolution points per drawn point (1 means nothing was decimated)."""
+        shown = sum(s.count for s in self.series)
+        return sum(s.length for s in self.series) / shown if shown else 1.0
+
+    def buckets(self):
+        """Decimation buckets for one reading at the current zoom level."""
+        return min(int(self.plot_rect[2]) << self._lod, MAX_BUCKETS)
+
+    def _normalize(self, x, y):
+        x0, x1, y0, y1 = self._home
+        return (x - x0) * (1 / (x1 - x0)), (y - y0) * (1 / (y1 - y0))
+
+    # Data
+
+    def clear(self):
+        """Removes every reading and forgets the view."""
+        self._data.clear()
+        self.series = []
+        self.live = self._live = None
+        self._trend_series = []
+        self._trend_key = None
+        self.trends = None
+        self._outliers = None
+        self._home = self._bounds = self._store = None
+        self.auto = True
+        self._view = (0.0, 1.0, 0.0, 1.0)
+        self.apply_view()
+
+    def update(self, readings, outliers=None, trendlines=False):
+        """Matches the plot to ``readings``; ``outliers`` is an (x, y) pair of arrays to ring."""
+        with span('plot.sync'):
+            if len(readings) < len(self.series):
+                self.clear()
+            self._store = readings
+            lengths = readings.lengths
+            ids = [i for i in range(len(self.series)) if lengths[i] != self.series[i].length]
+            ids += range(len(self.series), len(readings))
+            if ids:
+                self._sync(readings, ids)
+        self._outliers = outliers
+        with span('plot.trendlines'):
+            self._set_trendlines(readings, trendlines)
+        self.apply_view()
+
+    def _sync(self, readings, ids):
+        views = [readings.reading(i, "x", "y") for i in ids]
+        fits = fit_flat(*ragged_to_flat([v[0] for v in views], [v[1] for v in views]))
+        rehome = self._widen([np.min([v[0].min() for v in views]), np.max([v[0].max() for v in views]),
+                              np.min([v[1].min() for v in views]), np.max([v[1].max() for v in views])],
+                             keep=ids)
+        buckets = self.buckets()
+        for k, (i, (x_values, y_values)) in enumerate(zip(ids, views)):
+            if i == len(self.series):
+                color = get_color_from_hex(READING_COLORS[i % len(READING_COLORS)])
+                s = _Series(color)
+                self.series.append(s)
+                self._data.add(s.group)
+                self._data.add(s.fit_color)
+                self._data.add(s.fit_mesh)
+            s = self.series[i]
+            x_ends = np.array([x_values.min(), x_values.max()])
+            s.fit_ends = (x_ends, fits.intercepts[k] + fits.slopes[k] * x_ends)
+            grown_in_full = (not rehome and not s.decimated and s.length
+                             and len(x_values) <= POINTS_PER_BUCKET * buckets)
+            if grown_in_full:
+                s.append_vertices(*self._normalize(x_values[s.length:], y_values[s.length:]))
+                s.length = len(x_values)
+            else:
+                self._draw_series(s, x_values, y_values, buckets)
+            self._draw_fit(s)
+
+    def _widen(self, bounds, keep=()):
+        """Grows the data bounds by ``bounds``; returns True when that moved the home frame.
+
+        Every vertex is relative to the home frame, so moving it rewrites every
+        reading except those in ``keep`` (which the caller is about to draw).
+        """
+        # Readings only ever grow, so the bounds only widen
+        if self._bounds is not None:
+            bounds = [min(bounds[0], self._bounds[0]), max(bounds[1], self._bounds[1]),
+                      min(bounds[2], self._bounds[2]), max(bounds[3], self._bounds[3])]
+        self._bounds = bounds
+        home = self._home
+        if home is not None and (home[0] <= bounds[0] and bounds[1] <= home[1]
+                                 and home[2] <= bounds[2] and bounds[3] <= home[3]):
+            return False
+
+        self._home = _padded(bounds[0], bounds[1], HOME_GROWTH) + _padded(bounds[2], bounds[3], HOME_GROWTH)
+        if home is not None and not self.auto:
+            self._view = self._renormalized_view(home)
+        for i, s in enumerate(self.series):
+            if i not in keep:
+                self._draw_series(s, *self._store.reading(i, "x", "y"))
+                self._draw_fit(s)
+        if self._live is not None:
+            self._draw_live()
+        return True
+
+    def set_live(self, x, y, slope=math.nan, intercept=math.nan):
+        """Shows a window of streamed samples with its fit line, or hides it when ``x`` is None.
+
+        The window is drawn sorted by wavelength into one reused vertex buffer.
+        """
+        if x is None:
+            if self.live is not None:
+                for instruction in (self.live.group, self.live.fit_color, self.live.fit_mesh):
+                    self._data.remove(instruction)
+            self.live = self._live = None
+            self._redraw()
+            return
+        if self.live is None:
+            self.live = _Series(get_color_from_hex(LIVE_COLOR))
+            for instruction in (self.live.group, self.live.fit_color, self.live.fit_mesh):
+                self._data.add(instruction)
+        if len(x) == 0:
+            return
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+        x_ends = x[[0, -1]]
+        self.live.fit_ends = (x_ends, intercept + slope * x_ends)
+        self._live = (x, y)
+        if self._widen([x[0], x[-1], y.min(), y.max()]) and self._store is not None:
+            self._set_trendlines(self._store, self._trend_key is not None)  # Redrawn in the new frame
+        self._draw_live()
+        self._redraw()
+
+    def _draw_live(self):
+        self._draw_series(self.live, *self._live)
+        self._draw_fit(self.live)
+
+    def _draw_series(self, s, x_values, y_values, buckets=None):
+        x_shown, y_shown = minmax_decimate(x_values, y_values, buckets or self.buckets())
+        s.decimated = len(x_shown) < len(x_values)
+        s.length = len(x_values)
+        s.set_vertices(*self._normalize(x_shown, y_shown))
+
+    def _draw_fit(self, s):
+        if s.fit_ends is not None and np.all(np.isfinite(s.fit_ends[1])):
+            s.set_fit(*self._normalize(*s.fit_ends))
+
+    def refresh_lod(self, *args):
+        """Re-decimates large readings for the current zoom and width, if either changed."""
+        zoom = 1 / (self._view[1] - self._view[0])
+        self._lod = max(math.ceil(math.log2(zoom) - 1e-9), 0)
+        key = (self._lod, int(self.plot_rect[2]))
+        if key == self._lod_key or self._store is None:
+            return
+        self._lod_key = key
+        with span('plot.lod'):
+            buckets = self.buckets()
+            for i, s in enumerate(self.series):
+                if s.decimated or s.length > POINTS_PER_BUCKET * buckets:
+                    self._draw_series(s, *self._store.reading(i, "x", "y"), buckets)
+        self._redraw()
+
+    def _set_trendlines(self, readings, show):
+        """Fits and draws the pooled trendlines, or hides them; refitted only when points were added."""
+        key = (len(readings), readings.total, self._home) if show and readings.total else None
+        if key == self._trend_key:
+            return
+        for group in self._trend_series:
+            self._data.remove(group)
+        self._trend_series = []
+        self._trend_key = key
+        self.trends = None
+        if key is None:
+            return
+
+        x, y, _ = readings.flat("x", "y")
+        self.trends = fit_trendlines(x, y)
+        x_grid, curves = trendline_curves(self.trends)
+        for curve, color in zip(curves, TRENDLINE_COLORS):
+            group = InstructionGroup()
+            if np.all(np.isfinite(curve)):  # Not enough distinct points for this degree otherwise
+                u, v = self._normalize(x_grid, curve)
+                group.add(Color(*get_color_from_hex(color)))
+                group.add(Mesh(fmt=VERTEX_FORMAT, mode='line_strip',
+                               vertices=np.column_stack([u, v]).astype(np.float32).ravel(),
+                               indices=INDICES[:len(u)]))
+            self._data.add(group)
+            self._trend_series.append(group)
+
+    # View
+
+    def _renormalized_view(self, old):
+        """The current view expressed in the new home frame."""
+        u0, u1, v0, v1 = self._view
+        x0, x1, y0, y1 = old
+        xs = (x0 + u0 * (x1 - x0), x0 + u1 * (x1 - x0))
+        ys = (y0 + v0 * (y1 - y0), y0 + v1 * (y1 - y0))
+        (a, b), (c, d) = self._normalize(np.array(xs), np.array(ys))
+        return (a, b, c, d)
+
+    def data_view(self):
+        """(xmin, xmax, ymin, ymax) currently shown, in data units."""
+        x0, x1, y0, y1 = self._home
+        u0, u1, v0, v1 = self._view
+        return (x0 + u0 * (x1 - x0), x0 + u1 * (x1 - x0),
+                y0 + v0 * (y1 - y0), y0 + v1 * (y1 - y0))
+
+    def reset_view(self):
+        """Fits the view to the data again and lets it follow new data."""
+        self.auto = True
+        self.apply_view()
+        self._relod()
+
+    def pan(self, dx, dy):
+        """Moves the view by (dx, dy) screen pixels."""
+        _, _, width, height = self.plot_rect
+        u0, u1, v0, v1 = self._view
+        du, dv = dx * (u1 - u0) / width, dy * (v1 - v0) / height
+        self.auto = False
+        self._view = (u0 - du, u1 - du, v0 - dv, v1 - dv)
+        self._redraw()
+
+    def zoom(self, factor, pos):
+        """Zooms by ``factor`` (above 1 magnifies) keeping the point under ``pos`` fixed."""
+        px, py, width, height = self.plot_rect
+        u0, u1, v0, v1 = self._view
+        factor = min(factor, (u1 - u0) * MAX_ZOOM, (v1 - v0) * MAX_ZOOM)
+        fx, fy = (pos[0] - px) / width, (pos[1] - py) / height
+        u, v = u0 + fx * (u1 - u0), v0 + fy * (v1 - v0)
+        du, dv = (u1 - u0) / factor, (v1 - v0) / factor
+        self.auto = False
+        self._view = (u - fx * du, u - fx * du + du, v - fy * dv, v - fy * dv + dv)
+        self._redraw()
+
+    def apply_view(self, *args):
+        """Moves the data transform to the current view and redraws the screen-space parts."""
+        px, py, width, height = self.plot_rect
+        self._background.pos, self._background.size = self.pos, self.size
+        self._clip.pos, self._clip.size = (px, py), (width, height)
+        self._unclip.pos, self._unclip.size = (px, py), (width, height)
+        if self._home is not None and self.auto:
+            b = self._bounds
+            (a, c), (d, e) = self._normalize(np.array(_padded(b[0], b[1], VIEW_MARGIN)),
+                                             np.array(_padded(b[2], b[3], VIEW_MARGIN)))
+            self._view = (a, c, d, e)
+        u0, u1, v0, v1 = self._view
+        self._offset.xy = (px, py)
+        self._scale.xyz = (width / (u1 - u0), height / (v1 - v0), 1)
+        self._origin.xy = (-u0, -v0)
+        self._draw_grid()
+        self._draw_outliers()
+
+    def _texture(self, text, size=dp(10), color='#FFFFFF'):
+        key = (text, size, color)
+        texture = self._labels.get(key)
+        if texture is None:
+            if len(self._labels) >= LABEL_CACHE:
+                self._labels.clear()
+            label = CoreLabel(text=text, font_size=size, color=get_color_from_hex(color))
+            label.refresh()
+            texture = self._labels[key] = label.texture
+        return texture
+
+    def _draw_grid(self):
+        px, py, width, height = self.plot_rect
+        self._grid.clear()
+        self._text.clear()
+        self._grid.add(Color(0.5, 0.5, 0.5, 0.7))
+        self._grid.add(Line(rectangle=(px, py, width, height), width=1))
+        if self._home is None:
+            return
+
+        xmin, xmax, ymin, ymax = self.data_view()
+        x_ticks, x_step = nice_ticks(xmin, xmax)
+        y_ticks, y_step = nice_ticks(ymin, ymax)
+        x_texts, x_exponent = tick_labels(x_ticks, x_step)
+        y_texts, y_exponent = tick_labels(y_ticks, y_step)
+        self._text.add(Color(1, 1, 1, 1))
+        for tick, text in zip(x_ticks, x_texts):
+            sx = px + (tick - xmin) / (xmax - xmin) * width
+            self._grid.add(Line(points=[sx, py, sx, py + height], dash_length=4, dash_offset=4))
+            texture = self._texture(text)
+            self._text.add(Rectangle(texture=texture, size=texture.size,
+                                     pos=(sx - texture.width / 2, py - texture.height - dp(3))))
+        for tick, text in zip(y_ticks, y_texts):
+            sy = py + (tick - ymin) / (ymax - ymin) * height
+            self._grid.add(Line(points=[px, sy, px + width, sy], dash_length=4, dash_offset=4))
+            texture = self._texture(text)
+            self._text.add(Rectangle(texture=texture, size=texture.size,
+                                     pos=(px - texture.width - dp(4), sy - texture.height / 2)))
+
+        x_title = 'Wavelength (m)' + (f'  ×1e{x_exponent}' if x_exponent else '')
+        y_title = '1/Frequency (s)' + (f'  ×1e{y_exponent}' if y_exponent else '')
+        texture = self._texture(x_title, dp(11))
+        self._text.add(Rectangle(texture=texture, size=texture.size,
+                                 pos=(px + (width - texture.width) / 2, self.y + dp(2))))
+        texture = self._texture(y_title, dp(11))
+        self._text.add(PushMatrix())
+        self._text.add(Rotate(angle=90, origin=(self.x + dp(10), py + height / 2)))
+        self._text.add(Rectangle(texture=texture, size=texture.size,
+                                 pos=(self.x + dp(10) - texture.width / 2, py + height / 2 - texture.height / 2)))
+        self._text.add(PopMatrix())
+        texture = self._texture('Wavelength vs 1/Frequency', dp(12))
+        self._text.add(Rectangle(texture=texture, size=texture.size,
+                                 pos=(px + (width - texture.width) / 2, py + height + dp(5))))
+        self._draw_legend(px, py + height)
+
+        ratio = self.lod_ratio
+        if ratio > 1:
+            shown = sum(s.count for s in self.series)
+            text = f'LOD 1:{ratio:.0f} ({shown:,} of {sum(s.length for s in self.series):,} points)'
+        else:
+            text = 'LOD full detail'
+        texture = self._texture(text, dp(9), '#808080')
+        self._text.add(Rectangle(texture=texture, size=texture.size,
+                                 pos=(px + width - texture.width - dp(3), py + dp(3))))
+
+    def _draw_legend(self, left, top):
+        entries = [(READING_COLORS[i % len(READING_COLORS)], f'Reading {i + 1}')
+                   for i in range(min(len(self.series), LEGEND_MAX))]
+        if self._live is not None:
+            entries.append((LIVE_COLOR, 'Live stream'))
+        if self.trends is not None:
+            finite = np.isfinite(self.trends.aic)
+            best = self.trends.aic[finite].min() if finite.any() else np.nan
+            for degree, aic, color, group in zip(self.trends.degrees, self.trends.aic,
+                                                 TRENDLINE_COLORS, self._trend_series):
+                if not group.children:
+                    continue
+                label = f'Degree {degree} fit'
+                if np.isfinite(aic):
+                    label += f' (ΔAIC {aic - best:+.1f})'
+                entries.append((color, label))
+        y = top - dp(6)
+        for color, label in entries:
+            texture = self._texture(label, dp(10))
+            y -= texture.height
+            self._text.add(Color(*get_color_from_hex(color)))
+            self._text.add(Line(points=[left + dp(6), y + texture.height / 2,
+                                        left + dp(22), y + texture.height / 2], width=1.5))
+            self._text.add(Color(1, 1, 1, 1))
+            self._text.add(Rectangle(texture=texture, size=texture.size, pos=(left + dp(26), y)))
+
+    def _draw_outliers(self):
+        self._overlay.clear()
+        if self._outliers is None or self._home is None or not len(self._outliers[0]):
+            return
+        px, py, width, height = self.plot_rect
+        xmin, xmax, ymin, ymax = self.data_view()
+        x, y = (np.asarray(values)[:OUTLIER_MAX] for values in self._outliers)
+        sx = px + (x - xmin) * (width / (xmax - xmin))
+        sy = py + (y - ymin) * (height / (ymax - ymin))
+        angles = np.linspace(0, 2 * np.pi, RING_SEGMENTS + 1)
+        # Every ring as RING_SEGMENTS separate segments: vertices (start, end) per segment
+        ends = np.stack([angles[:-1], angles[1:]], axis=1).ravel()
+        radius = dp(5)
+        vertices = np.empty((len(sx), len(ends), 2), np.float32)
+        vertices[..., 0] = sx[:, None] + radius * np.cos(ends)
+        vertices[..., 1] = sy[:, None] + radius * np.sin(ends)
+        self._overlay.add(Color(*get_color_from_hex(OUTLIER_COLOR)))
+        self._overlay.add(Mesh(fmt=VERTEX_FORMAT, mode='lines', vertices=vertices.ravel(),
+                               indices=INDICES[:vertices.shape[0] * vertices.shape[1]]))
+
+    # Touch
+
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            if touch.button in ('scrolldown', 'scrollup'):
+                self.zoom(ZOOM_STEP if touch.button == 'scrolldown' else 1 / ZOOM_STEP, touch.pos)
+                self._relod()
+            return True
+        if touch.is_double_tap:
+            self.reset_view()
+            return True
+        touch.grab(self)
+        self._touches.append(touch)
+        return True
+
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_move(touch)
+        if len(self._touches) == 1:
+            self.pan(touch.dx, touch.dy)
+        elif touch in self._touches[:2]:
+            # Pinch: scale by the change in finger distance, about their midpoint
+            other = self._touches[1] if touch is self._touches[0] else self._touches[0]
+            before = math.dist(touch.ppos, other.pos)
+            after = math.dist(touch.pos, other.pos)
+            if before > 0 and after > 0:
+                self.zoom(after / before, ((touch.x + other.x) / 2, (touch.y + other.y) / 2))
+            self.pan(touch.dx / 2, touch.dy / 2)
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_up(touch)
+        touch.ungrab(self)
+        if touch in self._touches:
+            self._touches.remove(touch)
+        self._relod()
+        return True
@@ -0,0 +1,364 @@
+"""Speed-of-light estimators that work on whole batches of readings at once.
+
+Nothing in here imports Kivy, so the app and any headless caller share it.
+"""
+from collections import namedtuple
+import math
+
+import numpy as np
+
+SPEED_OF_LIGHT = 2.998e8  # Reference value (m/s) used for the error figures
+
+EFFECTIVE_VARIANCE_ROUNDS = 3  # Refits when wavelength errors make the weights depend on the slope
+
+LineFits = namedtuple("LineFits", ["slopes", "intercepts", "speeds", "counts"])
+WeightedFits = namedtuple(
+    "WeightedFits",
+    ["slopes", "intercepts", "speeds", "covariances", "speed_errors", "chi2_dof", "weighted", "counts"]
+)
+SharedFit = namedtuple(
+    "SharedFit",
+    ["slope", "intercepts", "speed", "speed_error", "intercept_errors", "chi2_dof", "weighted", "counts"]
+)
+
+
+def percent_error(speed):
+    """Returns the percentage error of a speed (or array of speeds) against c."""
+    return np.abs((np.asarray(speed) - SPEED_OF_LIGHT) / SPEED_OF_LIGHT) * 100
+
+
+def ragged_to_flat(x_readings, y_readings):
+    """Concatenates ragged readings into flat arrays plus CSR-style offsets."""
+    lengths = [len(x) for x in x_readings]
+    if lengths != [len(y) for y in y_readings]:
+        raise ValueError("Every reading needs as many x values as y values.")
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.empty(0), np.empty(0), offsets
+    x = np.concatenate([np.asarray(v, dtype=np.float64) for v in x_readings])
+    y = np.concatenate([np.asarray(v, dtype=np.float64) for v in y_readings])
+    return x, y, offsets
+
+
+def padded_to_flat(x, y, lengths=None):
+    """Flattens 2-D padded readings (one row per reading) into CSR form.
+
+    Rows are truncated to ``lengths`` when given, otherwise NaN marks padding.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.ndim != 2 or x.shape != y.shape:
+        raise ValueError("Padded readings must be two 2-D arrays of the same shape.")
+    if lengths is None:
+        mask = ~(np.isnan(x) | np.isnan(y))
+    else:
+        lengths = np.asarray(lengths, dtype=np.int64)
+        mask = np.arange(x.shape[1]) < lengths[:, None]
+    offsets = np.zeros(x.shape[0] + 1, dtype=np.int64)
+    np.cumsum(mask.sum(axis=1), out=offsets[1:])
+    return x[mask], y[mask], offsets
+
+
+def segment_sums(values, offsets):
+    """Sums ``values`` over each [offsets[i], offsets[i+1]) segment."""
+    counts = np.diff(offsets)
+    sums = np.zeros(len(counts), dtype=np.float64)
+    nonempty = counts > 0
+    if nonempty.any():
+        # reduceat misbehaves on empty segments, so only feed it the real ones
+        sums[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+    return sums
+
+
+def fit_flat(x, y, offsets):
+    """Least-squares line for every reading of CSR-packed data in one pass.
+
+    Returns a ``LineFits`` of arrays with one entry per reading. Readings with
+    fewer than two points, or with no spread in x, get NaN results.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    segment = np.repeat(np.arange(len(counts)), counts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = segment_sums(x, offsets) / counts
+        mean_y = segment_sums(y, offsets) / counts
+        # Centre each reading first; raw Σx² sums lose everything at λ ~ 1e-7
+        dx = x - mean_x[segment]
+        dy = y - mean_y[segment]
+        sxx = segment_sums(dx * dx, offsets)
+        sxy = segment_sums(dx * dy, offsets)
+
+        slopes = np.where((counts >= 2) & (sxx > 0), sxy / sxx, np.nan)
+        intercepts = mean_y - slopes * mean_x
+        speeds = 1 / slopes  # Speed of light is the inverse of the slope
+    return LineFits(slopes, intercepts, speeds, counts)
+
+
+def _weighted_lines(x, y, w, offsets, segment):
+    """Weighted least-squares sums for every reading: (slopes, intercepts, Σw, x̄w, Sxx, χ²)."""
+    counts = np.diff(offsets)
+    sw = segment_sums(w, offsets)
+    mean_x = segment_sums(w * x, offsets) / sw
+    mean_y = segment_sums(w * y, offsets) / sw
+    dx = x - mean_x[segment]
+    dy = y - mean_y[segment]
+    sxx = segment_sums(w * dx * dx, offsets)
+    sxy = segment_sums(w * dx * dy, offsets)
+    slopes = np.where((counts >= 2) & (sxx > 0), sxy / sxx, np.nan)
+    residuals = dy - slopes[segment] * dx
+    chi2 = segment_sums(w * residuals * residuals, offsets)
+    return slopes, mean_y - slopes * mean_x, sw, mean_x, sxx, chi2
+
+
+def _variances(sigma_x, sigma_y, n):
+    """Per-point (σx², σy², known) from uncertainties that may be None or NaN.
+
+    A missing σ on one axis counts as 0 when the other is known, so a point
+    with only a frequency (or only a wavelength) tolerance is still weighted;
+    ``known`` is False only where neither gives a positive variance.
+    """
+    var_x = np.zeros(n) if sigma_x is None else np.square(np.asarray(sigma_x, dtype=np.float64))
+    var_y = np.zeros(n) if sigma_y is None else np.square(np.asarray(sigma_y, dtype=np.float64))
+    finite_x, finite_y = np.isfinite(var_x), np.isfinite(var_y)
+    var_x = np.where(finite_x, var_x, 0)
+    var_y = np.where(finite_y, var_y, 0)
+    known = (finite_x | finite_y) & (var_x + var_y > 0)
+    return var_x, var_y, known
+
+
+def fit_weighted_flat(x, y, offsets, sigma_x=None, sigma_y=None, rounds=EFFECTIVE_VARIANCE_ROUNDS):
+    """Weighted least-squares line for every reading of CSR-packed data, with its uncertainty.
+
+    ``sigma_x`` and ``sigma_y`` are per-point standard uncertainties (NaN
+    where unknown). Errors in x are folded into the weights by the effective
+    variance method, w = 1/(σy² + b²σx²), refitting ``rounds`` times as the
+    slope b settles. The covariance of (slope, intercept) is analytic:
+
+        var(b) = 1/Sxx,  var(a) = 1/Σw + x̄²/Sxx,  cov(a, b) = -x̄/Sxx
+
+    and σ_c = σ_b / b². A point with only one of σx, σy takes the other as 0;
+    readings where any point has neither are fitted unweighted, with the covariance scaled by the residual variance
+    and χ²/dof left NaN. Returns a ``WeightedFits``; ``covariances`` has
+    shape (readings, 2, 2) in (slope, intercept) order.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    segment = np.repeat(np.arange(len(counts)), counts)
+    var_x, var_y, known = _variances(sigma_x, sigma_y, len(x))
+    weighted = (counts > 0) & (segment_sums((~known).astype(np.float64), offsets) == 0)
+    point_weighted = weighted[segment]
+    var_x = np.where(point_weighted, var_x, 0)
+    var_y = np.where(point_weighted, var_y, 1)  # Unit weights for unweighted readings
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = fit_flat(x, y, offsets).slopes
+        for _ in range(rounds if sigma_x is not None else 1):
+            b = np.nan_to_num(slopes)[segment]
+            w = 1 / (var_y + b * b * var_x)
+            slopes, intercepts, sw, mean_x, sxx, chi2 = _weighted_lines(x, y, w, offsets, segment)
+
+        dof = counts - 2
+        chi2_dof = np.where(dof > 0, chi2 / dof, np.nan)
+        # Without known uncertainties the scatter itself sets the scale
+        scale = np.where(weighted, 1.0, chi2_dof)
+        var_b = scale / sxx
+        var_a = scale * (1 / sw + mean_x * mean_x / sxx)
+        cov_ab = -scale * mean_x / sxx
+        covariances = np.stack([np.stack([var_b, cov_ab], axis=-1),
+                                np.stack([cov_ab, var_a], axis=-1)], axis=-2)
+        speeds = 1 / slopes
+        speed_errors = np.sqrt(var_b) / (slopes * slopes)
+    return WeightedFits(slopes, intercepts, speeds, covariances, speed_errors,
+                        np.where(weighted, chi2_dof, np.nan), weighted, counts)
+
+
+def fit_shared_slope_flat(x, y, offsets, sigma_x=None, sigma_y=None, rounds=EFFECTIVE_VARIANCE_ROUNDS):
+    """One common slope for every reading of CSR-packed data, each with its own intercept.
+
+    The model is y = a_i + b·x for reading i, so offsets between readings
+    are absorbed by the intercepts while every point informs b = 1/c. The
+    normal equations have an arrow shape (a diagonal block for the a_i, one
+    dense row and column for b); eliminating the a_i leaves
+
+        b = Σ_i Sxy_i / Σ_i Sxx_i,   a_i = ȳ_i - b·x̄_i
+
+    with the sums taken about each reading's weighted mean, so the solve is
+    a few segment sums over the points: no design matrix is built. The
+    covariance follows from the same elimination:
+
+        var(b) = 1/ΣSxx,  var(a_i) = 1/Σw_i + x̄_i²/ΣSxx
+
+    Weights and the effective variance refits are as in fit_weighted_flat,
+    except that they apply to all readings or none: if any point has neither
+    σx nor σy every point gets unit weight, the errors are scaled by the
+    residual variance and ``chi2_dof`` is NaN. Empty readings get NaN
+    intercepts. Returns a ``SharedFit``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    segment = np.repeat(np.arange(len(counts)), counts)
+    var_x, var_y, known = _variances(sigma_x, sigma_y, len(x))
+    weighted = bool(len(x)) and bool(np.all(known))
+    if not weighted:
+        var_x, var_y = np.zeros(len(x)), np.ones(len(x))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = 0.0
+        for _ in range(rounds if weighted and sigma_x is not None else 1):
+            w = 1 / (var_y + slope * slope * var_x)
+            sw = segment_sums(w, offsets)
+            mean_x = segment_sums(w * x, offsets) / sw
+            mean_y = segment_sums(w * y, offsets) / sw
+            dx = x - mean_x[segment]
+            dy = y - mean_y[segment]
+            sxx = np.sum(w * dx * dx)  # Pooled over readings: Σ_i Sxx_i
+            slope = np.sum(w * dx * dy) / sxx if sxx > 0 else np.float64(np.nan)
+            if not np.isfinite(slope):
+                break
+
+        residuals = dy - slope * dx
+        chi2 = np.sum(w * residuals * residuals)
+        dof = len(x) - np.count_nonzero(counts) - 1  # One intercept per non-empty reading, one slope
+        chi2_dof = chi2 / dof if dof > 0 else np.float64(np.nan)
+        scale = 1.0 if weighted else chi2_dof  # Without uncertainties the scatter sets the scale
+        var_b = scale / sxx
+        intercepts = mean_y - slope * mean_x
+        intercept_errors = np.sqrt(scale / sw + mean_x * mean_x * var_b)
+        speed = 1 / slope
+        speed_error = np.sqrt(var_b) / (slope * slope)
+    return SharedFit(float(slope), intercepts, float(speed), float(speed_error), intercept_errors,
+                     float(chi2_dof) if weighted else math.nan, weighted, counts)
+
+
+def weighted_mean(values, errors):
+    """Inverse-variance weighted mean of ``values`` and its standard error.
+
+    Entries without a finite value or a positive, finite error are left
+    out; with none left the plain mean of the finite values is returned
+    with a NaN error.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    errors = np.asarray(errors, dtype=np.float64)
+    usable = np.isfinite(values) & np.isfinite(errors) & (errors > 0)
+    if not usable.any():
+        finite = values[np.isfinite(values)]
+        return (float(np.mean(finite)) if len(finite) else float("nan")), float("nan")
+    weights = 1 / np.square(errors[usable])
+    total = weights.sum()
+    return float(weights @ values[usable] / total), float(1 / np.sqrt(total))
+
+
+def fit_readings(x_readings, y_readings, lengths=None):
+    """Fits every reading at once, from ragged sequences or padded 2-D arrays."""
+    padded = isinstance(x_readings, np.ndarray) and x_readings.ndim == 2
+    if lengths is not None or padded:
+        x, y, offsets = padded_to_flat(x_readings, y_readings, lengths)
+    else:
+        x, y, offsets = ragged_to_flat(x_readings, y_readings)
+    return fit_flat(x, y, offsets)
+
+
+class RunningFit:
+    """Streaming least-squares line for one reading.
+
+    Keeps the count, the means and the centred co-moments (Welford/Chan form)
+    instead of raw Σx, Σxy sums, so appending k points costs O(k) and reading
+    off the slope, c or the error costs O(1) at any time.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0  # Σ(x - x̄)²
+        self.sxy = 0.0  # Σ(x - x̄)(y - ȳ)
+        self.syy = 0.0  # Σ(y - ȳ)²
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        """Builds an accumulator already holding the given points."""
+        fit = cls()
+        fit.extend(x, y)
+        return fit
+
+    def add(self, x, y):
+        """Adds a single point."""
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        # Uses the old x̄ deviation and the new ȳ, which keeps sxy exact
+        self.sxx += dx * (x - self.mean_x)
+        self.sxy += dx * (y - self.mean_y)
+        self.syy += dy * (y - self.mean_y)
+
+    def extend(self, x, y):
+        """Adds a batch of points by merging its moments into the running ones."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) != len(y):
+            raise ValueError("x and y must have the same number of points.")
+        if len(x) == 0:
+            return
+        other = RunningFit()
+        other.n = len(x)
+        other.mean_x = float(x.mean())
+        other.mean_y = float(y.mean())
+        dx = x - other.mean_x
+        dy = y - other.mean_y
+        other.sxx = float(dx @ dx)
+        other.sxy = float(dx @ dy)
+        other.syy = float(dy @ dy)
+        self.merge(other)
+
+    def merge(self, other):
+        """Folds another accumulator's points into this one."""
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.mean_x += delta_x * other.n / n
+        self.mean_y += delta_y * other.n / n
+        self.sxx += other.sxx + delta_x * delta_x * weight
+        self.sxy += other.sxy + delta_x * delta_y * weight
+        self.syy += other.syy + delta_y * delta_y * weight
+        self.n = n
+
+    @property
+    def slope(self):
+        if self.n < 2 or self.sxx <= 0:
+            return float("nan")
+        return self.sxy / self.sxx
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def speed(self):
+        slope = self.slope
+        return 1 / slope if slope else float("nan")
+
+    @property
+    def speed_error(self):
+        """Standard error of the speed from the scatter about the line (NaN below three points)."""
+        slope = self.slope
+        if self.n < 3 or not slope:
+            return float("nan")
+        residual = max(self.syy - self.sxy * slope, 0.0) / (self.n - 2)
+        return math.sqrt(residual / self.sxx) / (slope * slope)
+
+    @property
+    def error_percent(self):
+        return float(percent_error(self.speed))
@@ -0,0 +1,250 @@
+"""Long-term history of every reading and its latest result, in SQLite.
+
+    sessions  one row per app session (New Session starts another)
+    readings  one compact row per reading: when, which session, its
+              wavelength range in nm and the latest fitted c (m/s) with
+              its inverse-variance weight
+    samples   the reading's raw values as one float64 blob, kept apart so
+              scans over ``readings`` never page through sample data
+
+Writes are queued and committed by a background thread in batched
+transactions, so adding readings never waits on the disk. Queries use a
+connection per thread (the database runs in WAL mode, so they do not block
+the writer) and aggregate over covering indexes:
+
+    history.aggregate(wavelength=(590, 610), since=semester_start)
+"""
+from collections import namedtuple
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATCH_DELAY = 0.2  # Seconds the writer waits for more work before committing a batch
+BATCH_MAX = 500  # Queued writes committed per transaction at most
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS readings (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    reading_index INTEGER NOT NULL,
+    created REAL NOT NULL,
+    points INTEGER NOT NULL,
+    wavelength_min REAL NOT NULL,
+    wavelength_max REAL NOT NULL,
+    speed REAL,
+    speed_error REAL,
+    weight REAL,
+    method TEXT,
+    UNIQUE (session_id, reading_index)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    reading_id INTEGER PRIMARY KEY REFERENCES readings(id),
+    columns TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+-- Covering indexes: aggregates read only the index, never the table rows
+CREATE INDEX IF NOT EXISTS readings_created
+    ON readings (created, wavelength_max, wavelength_min, speed, weight, points);
+CREATE INDEX IF NOT EXISTS readings_wavelength
+    ON readings (wavelength_max, wavelength_min, speed, weight, points, created);
+'''
+
+Aggregate = namedtuple('Aggregate', ['readings', 'points', 'mean', 'weighted_mean', 'weighted_error',
+                                     'minimum', 'maximum', 'seconds'])
+
+
+class History:
+    """SQLite-backed record of readings and fits across sessions."""
+
+    def __init__(self, path):
+        self.path = path
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        self._local = threading.local()  # One read connection per querying thread
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')  # WAL keeps this crash-safe
+        return connection
+
+    def _reader(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def begin_session(self):
+        """Starts a new session and returns its id (written immediately)."""
+        connection = self._connect()
+        with connection:
+            session_id = connection.execute('INSERT INTO sessions (started) VALUES (?)',
+                                            (time.time(),)).lastrowid
+        connection.close()
+        return session_id
+
+    def stored_readings(self, session_id):
+        """How many readings of ``session_id`` are already recorded (queued writes included)."""
+        self.flush()
+        return self._reader().execute('SELECT COUNT(*) FROM readings WHERE session_id = ?',
+                                      (session_id,)).fetchone()[0]
+
+    def add_readings(self, session_id, store, indices):
+        """Queues the given readings of ``store`` to be recorded under ``session_id``."""
+        now = time.time()
+        rows = []
+        for index in indices:
+            values = store.reading(index)
+            if len(values[0]) == 0:
+                continue
+            wavelengths = values[store.columns.index('x')]
+            rows.append((session_id, int(index), now, len(wavelengths),
+                         float(wavelengths.min()) * 1e9, float(wavelengths.max()) * 1e9,
+                         ','.join(store.columns), np.stack(values).tobytes()))
+        if rows:
+            self._queue.put(('readings', rows))
+
+    def record_fits(self, session_id, speeds, errors=None, method=None):
+        """Queues the latest fitted c (and its standard error) of every reading of the session."""
+        if errors is None:
+            errors = [np.nan] * len(speeds)
+        rows = []
+        for index, (speed, error) in enumerate(zip(speeds, errors)):
+            speed, error = _finite(speed), _finite(error)
+            weight = 1 / (error * error) if speed is not None and error else None
+            rows.append((speed, error, weight, method, session_id, index))
+        self._queue.put(('fits', rows))
+
+    def flush(self):
+        """Blocks until every queued write is committed."""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                self._queue.task_done()
+                break
+            # Gather whatever else arrives shortly, then commit it all at once
+            deadline = time.monotonic() + BATCH_DELAY
+            while len(batch) < BATCH_MAX:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Stop once this batch is in
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                with connection:
+                    for kind, rows in batch:
+                        if kind == 'readings':
+                            self._insert_readings(connection, rows)
+                        else:
+                            connection.executemany(
+                                'UPDATE readings SET speed = ?, speed_error = ?, weight = ?, method = ? '
+                                'WHERE session_id = ? AND reading_index = ?', rows)
+            except sqlite3.Error:
+                logger.exception('History: could not save a batch of %d writes', len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def _insert_readings(self, connection, rows):
+        for session_id, index, created, points, low, high, columns, data in rows:
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO readings (session_id, reading_index, created, points, '
+                'wavelength_min, wavelength_max) VALUES (?, ?, ?, ?, ?, ?)',
+                (session_id, index, created, points, low, high))
+            if cursor.rowcount:
+                connection.execute('INSERT INTO samples (reading_id, columns, data) VALUES (?, ?, ?)',
+                                   (cursor.lastrowid, columns, data))
+
+    def _where(self, session_id=None, since=None, until=None, wavelength=None):
+        """WHERE clause and parameters over ``readings AS r``."""
+        clauses, params = ['r.speed IS NOT NULL'], []
+        if session_id is not None:
+            clauses.append('r.session_id = ?')
+            params.append(session_id)
+        if since is not None:
+            clauses.append('r.created >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('r.created < ?')
+            params.append(until)
+        if wavelength is not None:
+            # Readings overlapping the band; the index ranges over wavelength_max
+            clauses.append('r.wavelength_max >= ? AND r.wavelength_min <= ?')
+            params += [wavelength[0], wavelength[1]]
+        return ' AND '.join(clauses), params
+
+    def aggregate(self, session_id=None, since=None, until=None, wavelength=None):
+        """Summary of the fitted c of every matching reading.
+
+        ``since`` and ``until`` are Unix times, ``wavelength`` a (low, high)
+        band in nm that a reading must overlap. The weighted mean uses the
+        readings with a known standard error.
+        """
+        started = time.perf_counter()
+        where, params = self._where(session_id, since, until, wavelength)
+        count, points, mean, minimum, maximum, weighted_sum, weight = self._reader().execute(
+            'SELECT COUNT(*), SUM(r.points), AVG(r.speed), MIN(r.speed), MAX(r.speed), '
+            f'SUM(r.speed * r.weight), SUM(r.weight) FROM readings AS r WHERE {where}', params).fetchone()
+        if weight:
+            weighted_mean, weighted_error = weighted_sum / weight, weight ** -0.5
+        else:
+            weighted_mean = weighted_error = float('nan')
+        return Aggregate(count, points or 0, _nan(mean), weighted_mean, weighted_error,
+                         _nan(minimum), _nan(maximum), time.perf_counter() - started)
+
+    def by_session(self, session_id=None, since=None, until=None, wavelength=None, limit=200):
+        """Per-session (session id, start time, readings, mean c) rows, newest first."""
+        where, params = self._where(session_id, since, until, wavelength)
+        return self._reader().execute(
+            'SELECT r.session_id, s.started, COUNT(*), AVG(r.speed) '
+            f'FROM readings AS r JOIN sessions AS s ON s.id = r.session_id WHERE {where} '
+            'GROUP BY r.session_id ORDER BY s.started DESC LIMIT ?', params + [limit]).fetchall()
+
+    def samples(self, session_id, reading_index):
+        """The stored values of one reading, as a dict of column name to array."""
+        row = self._reader().execute(
+            'SELECT s.columns, s.data FROM samples AS s JOIN readings AS r ON r.id = s.reading_id '
+            'WHERE r.session_id = ? AND r.reading_index = ?', (session_id, reading_index)).fetchone()
+        if row is None:
+            raise KeyError((session_id, reading_index))
+        columns = row[0].split(',')
+        values = np.frombuffer(row[1], dtype=np.float64).reshape(len(columns), -1)
+        return dict(zip(columns, values))
+
+
+def _finite(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _nan(value):
+    return float('nan') if value is None else value
@@ -0,0 +1,145 @@
+"""Parsing, validation and bulk import of wavelength/frequency data.
+
+Files are read in fixed-size chunks and converted with numpy, so even
+spectrometer exports with hundreds of thousands of rows never sit in memory
+as one Python string. Each row is ``wavelength, frequency`` (nm and THz
+unless another units.Conversion is given, which may also take periods) with
+an optional third column naming the reading the row belongs to.
+"""
+import itertools
+import os
+
+import numpy as np
+
+from units import DEFAULT
+
+CHUNK_ROWS = 65536  # Rows parsed per chunk when streaming a file
+RAW_EXTENSIONS = (".bin", ".f64", ".dat")
+
+
+def parse_values(values_str):
+    """Converts a space-separated string to a float64 array.
+
+    Raises ValueError when a token is not a number.
+    """
+    return np.array(values_str.split(), dtype=np.float64)
+
+
+def all_positive(values):
+    """True when every value is a positive, finite number (NaN and inf count as invalid)."""
+    values = np.asarray(values)
+    return bool(np.all((values > 0) & (values < np.inf)))
+
+
+def _columns(store, x_values, y_values):
+    """The values to store for a slice of x and y; columns beyond those (uncertainties) are unknown."""
+    unknown = [np.full(len(x_values), np.nan)] * (len(store.columns) - 2)
+    return (x_values, y_values, *unknown)
+
+
+def _sniff_csv(path):
+    """Returns (delimiter, header_lines) from the first non-comment line."""
+    with open(path, "r") as f:
+        skipped = 0
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                skipped += 1
+                continue
+            delimiter = "," if "," in stripped else None
+            try:
+                [float(token) for token in stripped.split(delimiter)]
+            except ValueError:
+                return delimiter, skipped + 1  # Header row
+            return delimiter, skipped
+    return None, 0
+
+
+def iter_csv_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yields the rows of a CSV/whitespace text file as 2-D arrays, chunk by chunk."""
+    delimiter, header_lines = _sniff_csv(path)
+    with open(path, "r") as f:
+        for _ in range(header_lines):
+            next(f)
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            try:
+                chunk = np.loadtxt(lines, delimiter=delimiter, ndmin=2, comments="#")
+            except ValueError:
+                raise ValueError(f"{os.path.basename(path)} contains rows that are not numbers.")
+            if chunk.size:
+                yield chunk
+
+
+def iter_npy_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yields slices of a memory-mapped 2-D .npy array."""
+    data = np.load(path, mmap_mode="r")
+    if data.ndim != 2:
+        raise ValueError(f"{os.path.basename(path)} must hold a 2-D array (rows × columns).")
+    for start in range(0, len(data), chunk_rows):
+        yield data[start:start + chunk_rows]
+
+
+def iter_raw_chunks(path, columns=2, chunk_rows=CHUNK_ROWS):
+    """Yields slices of a memory-mapped headerless float64 file with ``columns`` per row."""
+    if os.path.getsize(path) % (8 * columns):
+        raise ValueError(f"{os.path.basename(path)} is not a whole number of {columns}-column float64 rows.")
+    if os.path.getsize(path) == 0:
+        return
+    data = np.memmap(path, dtype="<f8", mode="r").reshape(-1, columns)
+    for start in range(0, len(data), chunk_rows):
+        yield data[start:start + chunk_rows]
+
+
+def iter_file_chunks(path, chunk_rows=CHUNK_ROWS, raw_columns=2):
+    """Picks the chunk reader for ``path`` from its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return iter_npy_chunks(path, chunk_rows)
+    if ext in RAW_EXTENSIONS:
+        return iter_raw_chunks(path, raw_columns, chunk_rows)
+    return iter_csv_chunks(path, chunk_rows)
+
+
+def import_file(store, path, chunk_rows=CHUNK_ROWS, raw_columns=2, conversion=DEFAULT):
+    """Streams a data file into ``store`` and returns the indices of the new readings.
+
+    Without a reading column the whole file becomes one reading. Nothing is
+    added if any row turns out to be invalid. Store columns after x and y
+    (the uncertainties) are filled with NaN, since files do not carry them.
+    Each chunk is copied into the store as read and then converted in place
+    there with ``conversion``, so no converted copy of it is ever made.
+    """
+    first_new = len(store)
+    current_id = None
+    try:
+        for chunk in iter_file_chunks(path, chunk_rows, raw_columns):
+            if chunk.shape[1] not in (2, 3):
+                raise ValueError("Expected wavelength and frequency columns, plus an optional reading column.")
+            if not all_positive(chunk[:, :2]):
+                raise ValueError("Wavelengths and frequencies must be positive numbers.")
+            wavelengths, frequencies = chunk[:, 0], chunk[:, 1]
+            converted = store.total
+
+            if chunk.shape[1] == 2:
+                ids = None
+                bounds = [0, len(chunk)]
+            else:
+                ids = chunk[:, 2]
+                # Start a new reading wherever the reading column changes value
+                bounds = [0, *(np.flatnonzero(ids[1:] != ids[:-1]) + 1), len(chunk)]
+
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                reading_id = None if ids is None else ids[start]
+                if len(store) > first_new and reading_id == current_id:
+                    store.extend(*_columns(store, wavelengths[start:stop], frequencies[start:stop]))
+                else:
+                    store.append(*_columns(store, wavelengths[start:stop], frequencies[start:stop]))
+                current_id = reading_id
+            conversion.apply_in_store(store, converted, ("x", "y"))
+    except Exception:
+        store.truncate(first_new)
+        raise
+    return list(range(first_new, len(store)))
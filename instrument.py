@@ -0,0 +1,98 @@
+"""Named timing spans for the app's pipelines, close to free while switched off.
+
+    from instrument import span
+
+    with span('add.parse'):
+        values = parse_values(text)
+
+While tracing is off, ``span`` hands back one shared do-nothing context
+manager, so an instrumented stage costs a function call and an attribute
+check. While on, every finished span lands in a bounded ring, from which
+the overlay shows the latest ones and ``export`` writes a Chrome trace
+(load it in chrome://tracing or https://ui.perfetto.dev).
+"""
+from collections import deque, namedtuple
+import json
+import os
+import threading
+import time
+
+Span = namedtuple("Span", ["name", "start", "duration", "thread"])
+
+CAPACITY = 2048  # Spans kept; older ones are dropped first
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.tracer.spans.append(Span(self.name, self.start - self.tracer.origin, end - self.start,
+                                      threading.current_thread().name))
+        return False
+
+
+class Tracer:
+    """Collects spans from any thread into a ring of the most recent ``capacity``."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.spans = deque(maxlen=capacity)  # deque.append is atomic, so no lock is needed
+
+    def span(self, name):
+        """Context manager timing the block as ``name`` (a no-op while disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _ActiveSpan(self, name)
+
+    def latest(self, count):
+        """The ``count`` most recently finished spans, newest first."""
+        spans = list(self.spans)
+        return spans[:-count - 1:-1]
+
+    def clear(self):
+        self.spans.clear()
+
+    def export(self, path):
+        """Writes every kept span to ``path`` as a Chrome trace; returns how many."""
+        spans = list(self.spans)
+        threads = {name: i for i, name in enumerate(sorted({s.thread for s in spans}))}
+        events = [
+            {'name': s.name, 'cat': s.name.split('.')[0], 'ph': 'X', 'pid': os.getpid(),
+             'tid': threads[s.thread], 'ts': s.start * 1e6, 'dur': s.duration * 1e6}
+            for s in spans
+        ]
+        events += [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for name, tid in threads.items()
+        ]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(spans)
+
+
+tracer = Tracer()  # Shared by the app and every module it instruments
+span = tracer.span
@@ -0,0 +1,118 @@
+"""Load test for service.py: many concurrent clients against one server.
+
+Each client keeps one HTTP/1.1 connection open and sends requests back to
+back for the given duration; the run reports requests per second and the
+latency percentiles seen by the clients:
+
+    python service.py &
+    python loadtest.py --clients 64 --duration 10
+    python loadtest.py --endpoint batch --readings 20 --points 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def make_reading(points, rng):
+    """A noisy wavelength sweep (nm) and matching frequencies (THz), as JSON-ready lists."""
+    wavelengths = np.sort(rng.uniform(400, 700, points))
+    frequencies = 2.998e5 / wavelengths * (1 + rng.normal(0, 0.01, points))
+    return {"wavelength_nm": wavelengths.tolist(), "frequency_thz": frequencies.tolist()}
+
+
+def make_bodies(endpoint, points, readings, fit, variety, seed=0):
+    """``variety`` distinct request bodies; clients cycle through them."""
+    rng = np.random.default_rng(seed)
+    bodies = []
+    for _ in range(variety):
+        if endpoint == "speed":
+            body = {**make_reading(points, rng), "fit": fit}
+        else:
+            body = {"readings": [make_reading(points, rng) for _ in range(readings)], "fit": fit}
+        bodies.append(json.dumps(body).encode())
+    return bodies
+
+
+async def request(reader, writer, host, path, body):
+    """Sends one POST on an open connection; returns the status code."""
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, path, bodies, offset, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await request(reader, writer, host, path, bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, endpoint, clients, duration, bodies):
+    latencies = []
+    errors = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, f"/{endpoint}", bodies, i, started + duration,
+                                  latencies, errors) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of service.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--endpoint", choices=("speed", "batch"), default="speed")
+    parser.add_argument("--fit", choices=("least-squares", "theil-sen", "ransac"), default="least-squares")
+    parser.add_argument("-c", "--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="seconds to run")
+    parser.add_argument("--points", type=int, default=100, help="points per reading")
+    parser.add_argument("--readings", type=int, default=10, help="readings per batch request")
+    parser.add_argument("--variety", type=int, default=100,
+                        help="distinct request bodies (fewer means more identical requests to coalesce)")
+    args = parser.parse_args(argv)
+
+    bodies = make_bodies(args.endpoint, args.points, args.readings, args.fit, args.variety)
+    try:
+        latencies, errors, elapsed = asyncio.run(
+            run(args.host, args.port, args.endpoint, args.clients, args.duration, bodies))
+    except ConnectionError as e:
+        print(f"Could not reach {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    if not latencies:
+        print("No requests completed.", file=sys.stderr)
+        return 1
+
+    milliseconds = np.percentile(np.array(latencies) * 1e3, PERCENTILES)
+    print(f"{len(latencies)} requests in {elapsed:.2f}s from {args.clients} clients, {len(errors)} errors")
+    print(f"{len(latencies) / elapsed:.1f} requests/s")
+    print("latency " + "  ".join(f"p{p} {ms:.2f} ms" for p, ms in zip(PERCENTILES, milliseconds)))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,82 @@
+from startup import StartupTimer
+
+startup_timer = StartupTimer()  # Started before Kivy so the import phase is measured too
+
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
 from kivy.uix.popup import Popup
-from kivy.uix.image import Image
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.filechooser import FileChooserListView
+from kivy.uix.progressbar import ProgressBar
+from kivy.uix.spinner import Spinner
+from kivy.uix.togglebutton import ToggleButton
+from kivy.animation import Animation
 from kivy.core.window import Window
+from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.utils import get_color_from_hex
-import matplotlib.pyplot as plt
-import numpy as np
+from kivy.logger import Logger
+import math
 import os
 
+from instrument import span, tracer
+from tasks import TaskScheduler
+from widgets import RowList, TimingOverlay, TouchScrollView
+
+# numpy and matplotlib (and the estimator, importer, canvasplot, plotting and
+# readings modules built on them) are imported inside the methods that first
+# need them, so they stay out of the cold start. The plot on screen is drawn
+# by Kivy itself; matplotlib is only loaded to export it, and the slim build
+# leaves it out altogether.
+
+# Fit modes offered by the spinner; the robust ones name robust.robust_fit_flat methods
+FIT_MODES = {
+    'Weighted least squares': 'weighted',
+    'Joint fit (shared slope)': 'joint',
+    'Least squares (bootstrap CI)': 'bootstrap',
+    'Theil–Sen (robust)': 'theil-sen',
+    'RANSAC (robust)': 'ransac',
+}
+
+# Store columns: λ (m), 1/ν (s) and their standard uncertainties (NaN when not given)
+READING_COLUMNS = ("x", "y", "sx", "sy")
+
+# Input units offered above the fields, by their units.py names (units is only
+# imported, with numpy, once something is converted); time units mean periods
+WAVELENGTH_UNIT_CHOICES = ('nm', 'Å', 'µm')
+FREQUENCY_UNIT_CHOICES = ('THz', 'GHz', 'Hz')
+PERIOD_UNIT_CHOICES = ('fs', 'ps', 's')
+
+STREAM_REFRESH_HZ = 5  # Rolling fits per second while streaming
+
+PLOT_FIGSIZE = (6, 5)  # Exported figure, in inches at 100 dpi
+
 # Set dark mode for the app
 Window.clearcolor = get_color_from_hex('#121212')  # Dark background
 
+startup_timer.mark('import')
+
 class MobileSpeedOfLightApp(App):
     def build(self):
         self.title = "Speed of Light Calculator"
-        self.x_readings = []  # Wavelength (λ) in meters
-        self.y_readings = []  # 1/Frequency (1/ν) in seconds
+        self._readings = None  # Created with the first reading, see the readings property
+        self.running_fits = []  # One streaming fit per reading, kept up to date on add
+        self.outliers = None  # (x, y) of the points the last robust fit rejected
+        self.session = None  # On-disk copy of the readings, opened after the first frame
+        self.cache = None  # Fits and rendered plots by content, created with the first store
+        self.digests = None  # Content digest of each reading in the current store
+        self.plot_args = None  # What the plot on screen was drawn from, for export
+        self.exported = None  # (path, plot key, mtime) of the last PNG export
+        self.history = None  # Every reading and result across sessions, opened after the first frame
+        self.history_session = None  # History id of the current session
+        self.stream = None  # StreamReader filling a ring buffer while streaming
+        self.stream_event = None  # Clock event refreshing the rolling fit
+        self.scheduler = TaskScheduler(on_busy=self.set_busy)  # Fits and renders run off the UI thread
 
         # Main layout - ScrollView for mobile devices
-        self.scroll_layout = ScrollView(size_hint=(1, None), size=(Window.width, Window.height))
+        self.scroll_layout = TouchScrollView(size_hint=(1, None), size=(Window.width, Window.height))
         self.main_layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10), size_hint_y=None)
         self.main_layout.bind(minimum_height=self.main_layout.setter('height'))
         
@@ -33,11 +86,30 @@ class MobileSpeedOfLightApp(App):
         self.main_layout.add_widget(header)
 
         # Input section
-        input_section = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None, height=dp(200))
-        
+        input_section = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None, height=dp(370))
+
+        # Units the fields (and imported files and streams) are given in
+        wavelength_unit, frequency_unit = self.saved_units()
+        units_row = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+        units_row.add_widget(Label(text="Units:", size_hint_x=0.3, color=get_color_from_hex('#B3E5FC')))
+        self.wavelength_unit_spinner = Spinner(
+            text=wavelength_unit,
+            values=WAVELENGTH_UNIT_CHOICES,
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        self.frequency_unit_spinner = Spinner(
+            text=frequency_unit,
+            values=FREQUENCY_UNIT_CHOICES + tuple(f"period ({unit})" for unit in PERIOD_UNIT_CHOICES),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        units_row.add_widget(self.wavelength_unit_spinner)
+        units_row.add_widget(self.frequency_unit_spinner)
+
         # Wavelength input
-        wavelength_label = Label(text="Wavelength (nm):", size_hint_y=None, height=dp(20), 
-                               color=get_color_from_hex('#B3E5FC'))
+        self.wavelength_label = Label(size_hint_y=None, height=dp(20),
+                                      color=get_color_from_hex('#B3E5FC'))
         self.wavelength_input = TextInput(
             hint_text="e.g. 400 500 600", 
             multiline=False, 
@@ -48,9 +120,9 @@ class MobileSpeedOfLightApp(App):
             hint_text_color=get_color_from_hex('#BDBDBD')
         )
         
-        # Frequency input
-        frequency_label = Label(text="Frequency (THz):", size_hint_y=None, height=dp(20), 
-                              color=get_color_from_hex('#B3E5FC'))
+        # Frequency (or period) input
+        self.frequency_label = Label(size_hint_y=None, height=dp(20),
+                                     color=get_color_from_hex('#B3E5FC'))
         self.frequency_input = TextInput(
             hint_text="e.g. 750 600 500", 
             multiline=False, 
@@ -61,14 +133,47 @@ class MobileSpeedOfLightApp(App):
             hint_text_color=get_color_from_hex('#BDBDBD')
         )
         
-        input_section.add_widget(wavelength_label)
+        # Optional instrument tolerances: one value for every point, or one per point
+        self.wavelength_error_label = Label(size_hint_y=None, height=dp(20),
+                                            color=get_color_from_hex('#B3E5FC'))
+        self.wavelength_error_input = TextInput(
+            hint_text="e.g. 0.5",
+            multiline=False,
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#424242'),
+            foreground_color=get_color_from_hex('#FFFFFF'),
+            hint_text_color=get_color_from_hex('#BDBDBD')
+        )
+        self.frequency_error_label = Label(size_hint_y=None, height=dp(20),
+                                           color=get_color_from_hex('#B3E5FC'))
+        self.frequency_error_input = TextInput(
+            hint_text="e.g. 1.5 or 1.5 1.2 1.0",
+            multiline=False,
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#424242'),
+            foreground_color=get_color_from_hex('#FFFFFF'),
+            hint_text_color=get_color_from_hex('#BDBDBD')
+        )
+
+        self.label_units()
+        self.wavelength_unit_spinner.bind(text=self.change_units)
+        self.frequency_unit_spinner.bind(text=self.change_units)
+
+        input_section.add_widget(units_row)
+        input_section.add_widget(self.wavelength_label)
         input_section.add_widget(self.wavelength_input)
-        input_section.add_widget(frequency_label)
+        input_section.add_widget(self.frequency_label)
         input_section.add_widget(self.frequency_input)
+        input_section.add_widget(self.wavelength_error_label)
+        input_section.add_widget(self.wavelength_error_input)
+        input_section.add_widget(self.frequency_error_label)
+        input_section.add_widget(self.frequency_error_input)
         self.main_layout.add_widget(input_section)
 
         # Button section
-        button_section = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None, height=dp(150))
+        button_section = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None, height=dp(550))
         
         self.add_button = Button(
             text="Add Reading", 
@@ -77,6 +182,13 @@ class MobileSpeedOfLightApp(App):
             background_color=get_color_from_hex('#0277BD'),
             background_normal=''
         )
+        self.import_button = Button(
+            text="Import File", 
+            size_hint_y=None, 
+            height=dp(40),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
         self.plot_button = Button(
             text="Plot Graph", 
             size_hint_y=None, 
@@ -84,6 +196,28 @@ class MobileSpeedOfLightApp(App):
             background_color=get_color_from_hex('#0288D1'),
             background_normal=''
         )
+        self.trendline_toggle = ToggleButton(
+            text="Show Trendlines (Degree 1-3)",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        self.export_button = Button(
+            text="Export Plot (PNG)", 
+            size_hint_y=None, 
+            height=dp(40),
+            background_color=get_color_from_hex('#0288D1'),
+            background_normal=''
+        )
+        self.fit_mode_spinner = Spinner(
+            text='Weighted least squares',
+            values=list(FIT_MODES),
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
         self.calculate_button = Button(
             text="Calculate Speed", 
             size_hint_y=None, 
@@ -93,54 +227,90 @@ class MobileSpeedOfLightApp(App):
         )
         
         button_section.add_widget(self.add_button)
+        button_section.add_widget(self.import_button)
         button_section.add_widget(self.plot_button)
+        button_section.add_widget(self.trendline_toggle)
+        button_section.add_widget(self.export_button)
+        button_section.add_widget(self.fit_mode_spinner)
         button_section.add_widget(self.calculate_button)
+        self.new_session_button = Button(
+            text="New Session (Clear Readings)",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#424242'),
+            background_normal=''
+        )
+        button_section.add_widget(self.new_session_button)
+        self.history_button = Button(
+            text="History",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        button_section.add_widget(self.history_button)
+        self.stream_toggle = ToggleButton(
+            text="Stream from Instrument",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#0288D1'),
+            background_normal=''
+        )
+        button_section.add_widget(self.stream_toggle)
+        self.timings_toggle = ToggleButton(
+            text="Debug Timings",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#424242'),
+            background_normal=''
+        )
+        button_section.add_widget(self.timings_toggle)
         self.main_layout.add_widget(button_section)
 
+        # Progress indicator, pulses while a fit or render is running in the background
+        self.progress_bar = ProgressBar(max=1, value=0, size_hint_y=None, height=dp(10), opacity=0)
+        self.progress_animation = Animation(value=1, duration=0.6) + Animation(value=0, duration=0.6)
+        self.progress_animation.repeat = True
+        self.main_layout.add_widget(self.progress_bar)
+
+        # Per-stage timings, only collected while this overlay is shown
+        self.timing_overlay = TimingOverlay(tracer, on_export=self.export_trace,
+                                            size_hint_y=None, height=0, opacity=0)
+        self.main_layout.add_widget(self.timing_overlay)
+
         # Results section with scrollable containers
         results_container = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None)
         
-        # Current Readings ScrollView
+        # Current Readings list
         readings_scroll_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(150))
         readings_label = Label(text="Current Readings:", size_hint_y=None, height=dp(20), 
                              color=get_color_from_hex('#B3E5FC'))
         readings_scroll_container.add_widget(readings_label)
         
-        readings_scroll = ScrollView(size_hint=(1, None), height=dp(130))
-        self.input_values_label = Label(
-            text="No readings added yet", 
-            size_hint_y=None, 
-            color=get_color_from_hex('#E1F5FE'),
-            halign='left',
-            valign='top',
-            text_size=(Window.width-dp(20), None)
-        )
-        self.input_values_label.bind(
-            texture_size=lambda instance, size: setattr(self.input_values_label, 'height', size[1])
-        )
-        readings_scroll.add_widget(self.input_values_label)
-        readings_scroll_container.add_widget(readings_scroll)
+        # Virtualized list: one row per reading, only visible rows are rendered
+        self.readings_list = RowList(row_height=dp(60), size_hint=(1, None), height=dp(130))
+        self.readings_list.data = [{'text': "No readings added yet", 'height': dp(60)}]
+        readings_scroll_container.add_widget(self.readings_list)
         
-        # Speed Results ScrollView
-        speed_scroll_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(150))
+        # Speed Results list, with the average pinned above it
+        speed_scroll_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(230))
         speed_label = Label(text="Speed Results:", size_hint_y=None, height=dp(20), 
                           color=get_color_from_hex('#B3E5FC'))
         speed_scroll_container.add_widget(speed_label)
         
-        speed_scroll = ScrollView(size_hint=(1, None), height=dp(130))
-        self.speed_result_label = Label(
+        self.average_label = Label(
             text="Speed will appear here", 
             size_hint_y=None, 
+            height=dp(60),
             color=get_color_from_hex('#E1F5FE'),
             halign='left',
             valign='top',
             text_size=(Window.width-dp(20), None)
         )
-        self.speed_result_label.bind(
-            texture_size=lambda instance, size: setattr(self.speed_result_label, 'height', size[1])
-        )
-        speed_scroll.add_widget(self.speed_result_label)
-        speed_scroll_container.add_widget(speed_scroll)
+        speed_scroll_container.add_widget(self.average_label)
+        
+        self.results_list = RowList(row_height=dp(60), size_hint=(1, None), height=dp(150))
+        speed_scroll_container.add_widget(self.results_list)
         
         # Add both scroll containers to results
         results_container.add_widget(readings_scroll_container)
@@ -150,54 +320,276 @@ class MobileSpeedOfLightApp(App):
         results_container.bind(minimum_height=results_container.setter('height'))
         self.main_layout.add_widget(results_container)
 
-        # Image widget for displaying the plot - Fixed height
-        self.plot_image = Image(
-            size_hint_y=None, 
-            height=dp(300),
-            allow_stretch=True,
-            keep_ratio=True
+        # Rolling estimate while streaming; takes no space otherwise
+        self.stream_label = Label(
+            text="",
+            size_hint_y=None,
+            height=0,
+            opacity=0,
+            color=get_color_from_hex('#B2FF59'),
+            halign='left',
+            valign='top',
+            text_size=(Window.width-dp(20), None)
         )
-        # Initially hide the plot image
-        self.plot_image.opacity = 0
-        self.main_layout.add_widget(self.plot_image)
+        self.main_layout.add_widget(self.stream_label)
+
+        # Holder for the plot - Fixed height; the CanvasPlot is created on the first plot
+        self.plot_area = BoxLayout(size_hint_y=None, height=dp(300))
+        self.plot_area.opacity = 0  # Initially hidden
+        self.main_layout.add_widget(self.plot_area)
+        self.scroll_layout.touch_widgets.append(self.plot_area)  # Drags on the plot pan it
+        self.plot_view = None
+        self.plot_controller = None  # matplotlib figure for exports, created on the first export
 
         # Add main layout to scroll view
         self.scroll_layout.add_widget(self.main_layout)
 
         # Bind buttons to functions
         self.add_button.bind(on_press=self.add_reading)
+        self.import_button.bind(on_press=self.show_import_chooser)
         self.plot_button.bind(on_press=self.plot_graph)
+        self.trendline_toggle.bind(state=self.toggle_trendlines)
+        self.export_button.bind(on_press=self.export_plot)
         self.calculate_button.bind(on_press=self.calculate_speed_of_light)
+        self.timings_toggle.bind(state=self.toggle_timings)
+        self.new_session_button.bind(on_press=self.new_session)
+        self.history_button.bind(on_press=self.show_history)
+        self.stream_toggle.bind(state=self.toggle_stream)
 
+        startup_timer.mark('build')
         return self.scroll_layout
 
+    def on_start(self):
+        Window.bind(on_flip=self.on_first_frame)
+
+    def on_first_frame(self, window):
+        """Closes the startup timer once the first frame has been shown."""
+        window.unbind(on_flip=self.on_first_frame)
+        startup_timer.mark('first_frame')
+        for phase, (seconds, limit) in startup_timer.over_budget().items():
+            Logger.warning(f"Startup: {phase} took {seconds:.3f}s, budget is {limit:.3f}s")
+        Logger.info(f"Startup: {startup_timer.total:.3f}s to first frame {startup_timer.phases}")
+        try:
+            startup_timer.save(os.path.join(self.user_data_dir, "startup_times.jsonl"))
+        except OSError as e:
+            Logger.warning(f"Startup: could not save the timings: {e}")
+        # Resume the saved session now that something is on screen
+        Clock.schedule_once(self.resume_session)
+
+    def resume_session(self, dt=None):
+        """Maps the readings saved by the previous run back into the store."""
+        from estimator import RunningFit
+        from session import Session
+
+        self.session = Session(os.path.join(self.user_data_dir, "session"), READING_COLUMNS)
+        try:
+            with span('session.load'):
+                store = self.session.load()
+        except OSError as e:
+            Logger.warning(f"Session: could not resume: {e}")
+        else:
+            if len(store):
+                self.use_store(store)
+                self.running_fits = [RunningFit.from_arrays(*store.reading(i, "x", "y"))
+                                     for i in range(len(store))]
+                self.update_readings_display(range(len(store)))
+                Logger.info(f"Session: resumed {len(store)} readings, {store.total} points")
+        self.open_history()
+
+    def open_history(self):
+        """Opens the history database and picks up the session the saved readings belong to."""
+        try:
+            import sqlite3
+            from history import History
+        except ImportError as e:
+            # A build without the sqlite3 recipe: run without the history
+            Logger.warning(f"History: unavailable: {e}")
+            self.history = None
+            return
+
+        try:
+            self.history = History(os.path.join(self.user_data_dir, "history.sqlite3"))
+            try:
+                with open(self.history_session_path()) as f:
+                    self.history_session = int(f.read())
+            except (OSError, ValueError):
+                self.start_history_session()
+            # Readings added before the history was open, or by a version without it
+            stored = self.history.stored_readings(self.history_session)
+            if self._readings is not None and len(self._readings) > stored:
+                self.history.add_readings(self.history_session, self._readings,
+                                          range(stored, len(self._readings)))
+        except (OSError, sqlite3.Error) as e:
+            Logger.warning(f"History: could not open: {e}")
+            self.history = None
+
+    def history_session_path(self):
+        return os.path.join(self.user_data_dir, "session", "history_session")
+
+    def start_history_session(self):
+        """Starts a new history session and remembers it next to the session files."""
+        self.history_session = self.history.begin_session()
+        os.makedirs(os.path.dirname(self.history_session_path()), exist_ok=True)
+        with open(self.history_session_path(), 'w') as f:
+            f.write(str(self.history_session))
+
+    def save_readings(self, indices):
+        """Appends new readings to the session files, so a crash cannot lose them, and to the history."""
+        if self.history is not None:
+            self.history.add_readings(self.history_session, self.readings, indices)  # Queued, not written here
+        if self.session is None:
+            return
+        try:
+            with span('session.save'):
+                self.session.append(self.readings, indices)
+        except OSError as e:
+            Logger.warning(f"Session: could not save readings: {e}")
+
+    def record_results(self, speeds, errors=None, method=None):
+        """Queues the latest fitted speeds for the history."""
+        if self.history is not None:
+            self.history.record_fits(self.history_session, speeds, errors, method)
+
+    def new_session(self, instance):
+        """Clears every reading, on screen and on disk."""
+        self.scheduler.cancel('fit')
+        self.scheduler.cancel('export')
+        if self.session is not None:
+            self.session.reset()
+        if self.history is not None:
+            import sqlite3
+
+            try:
+                self.start_history_session()
+            except (OSError, sqlite3.Error) as e:
+                Logger.warning(f"History: could not start a new session: {e}")
+                self.history = None
+        # A new store: snapshots on workers keep the old one's buffers
+        self._readings = None
+        self.running_fits = []
+        self.outliers = None
+        self.plot_args = None
+        self.readings_list.data = [{'text': "No readings added yet", 'height': dp(60)}]
+        self.results_list.data = []
+        self.average_label.text = "Speed will appear here"
+        self.plot_area.opacity = 0
+        if self.plot_view is not None:
+            self.plot_view.clear()
+        self.plot_controller = None  # A fresh figure; an in-flight export keeps the old one
+
+    @property
+    def readings(self):
+        """Columnar store: "x" is wavelength (λ) in meters, "y" is 1/frequency (1/ν) in seconds,
+        "sx" and "sy" their uncertainties (NaN when not given)."""
+        if self._readings is None:
+            from readings import ReadingStore
+            self.use_store(ReadingStore(columns=READING_COLUMNS))
+        return self._readings
+
+    def use_store(self, store):
+        """Makes ``store`` the current readings; cached results stay valid, they are keyed by content."""
+        from memo import ContentCache, ReadingDigests
+
+        self._readings = store
+        self.digests = ReadingDigests(store.columns)  # Digests are tracked per store
+        if self.cache is None:
+            self.cache = ContentCache()
+
     def format_scientific(self, number):
         """Formats a number in scientific notation (e.g., 3.00 × 10^8)."""
         if number == 0:
             return "0"
-        exponent = int(np.floor(np.log10(abs(number))))
+        if not math.isfinite(number):
+            return "undefined"  # e.g. a reading whose wavelengths are all equal
+        exponent = int(math.floor(math.log10(abs(number))))
         coefficient = number / (10 ** exponent)
         return f"{coefficient:.2f} × 10^{exponent}"
 
+    def input_units(self):
+        """(wavelength unit, frequency or period unit) chosen above the fields."""
+        second = self.frequency_unit_spinner.text
+        if second.startswith("period ("):
+            second = second[len("period ("):-1]
+        return self.wavelength_unit_spinner.text, second
+
+    def conversion(self):
+        """The units.Conversion shared by typed readings, imports and streams."""
+        from units import Conversion
+
+        return Conversion(*self.input_units())
+
+    def label_units(self):
+        """Names the chosen units in the input labels."""
+        wavelength_unit, second = self.input_units()
+        quantity = "Period" if second in PERIOD_UNIT_CHOICES else "Frequency"
+        self.wavelength_label.text = f"Wavelength ({wavelength_unit}):"
+        self.frequency_label.text = f"{quantity} ({second}):"
+        self.wavelength_error_label.text = f"Wavelength uncertainty ({wavelength_unit}, optional):"
+        self.frequency_error_label.text = f"{quantity} uncertainty ({second}, optional):"
+
+    def change_units(self, *args):
+        self.label_units()
+        try:
+            with open(self.units_path(), "w", encoding="utf-8") as f:
+                f.write(self.wavelength_unit_spinner.text + "\n" + self.frequency_unit_spinner.text)
+        except OSError as e:
+            Logger.warning(f"Units: could not remember the choice: {e}")
+
+    def units_path(self):
+        return os.path.join(self.user_data_dir, "units")
+
+    def saved_units(self):
+        """The spinner texts chosen last time, or nm and THz."""
+        try:
+            with open(self.units_path(), encoding="utf-8") as f:
+                wavelength_unit, second = f.read().split("\n")
+        except (OSError, ValueError):
+            return WAVELENGTH_UNIT_CHOICES[0], FREQUENCY_UNIT_CHOICES[0]
+        if wavelength_unit not in WAVELENGTH_UNIT_CHOICES:
+            wavelength_unit = WAVELENGTH_UNIT_CHOICES[0]
+        if second not in FREQUENCY_UNIT_CHOICES and second[len("period ("):-1] not in PERIOD_UNIT_CHOICES:
+            second = FREQUENCY_UNIT_CHOICES[0]
+        return wavelength_unit, second
+
     def validate_input(self, values_str):
-        """Validates and converts input string to a list of floats."""
+        """Validates and converts input string to an array of floats."""
+        from importer import all_positive, parse_values
+
         try:
-            values = list(map(float, values_str.split()))
-            if any(val <= 0 for val in values):  # Ensure values are positive
-                self.show_popup("Invalid Input", "Values must be positive numbers.")
-                return None
-            return values
+            values = parse_values(values_str)
         except ValueError:
             self.show_popup("Invalid Input", "Please enter numbers separated by spaces.")
             return None
+        if not all_positive(values):  # Ensure values are positive
+            self.show_popup("Invalid Input", "Values must be positive, finite numbers.")
+            return None
+        return values
+
+    def read_uncertainties(self, text, count):
+        """Parses an optional uncertainty field into ``count`` values (NaN when left empty).
+
+        One value applies to every point. Returns None after telling the user when invalid.
+        """
+        import numpy as np
+
+        if not text.strip():
+            return np.full(count, np.nan)
+        values = self.validate_input(text)
+        if values is None:
+            return None
+        if len(values) not in (1, count):
+            self.show_popup("Input Error", "Give one uncertainty for every point, or a single one for all of them.")
+            return None
+        return np.broadcast_to(values, (count,)).astype(np.float64)
 
     def add_reading(self, instance):
         """Adds wavelength and frequency readings to the lists."""
         x_input = self.wavelength_input.text
         y_input = self.frequency_input.text
 
-        x_values = self.validate_input(x_input)
-        y_values = self.validate_input(y_input)
+        with span('add.parse'):
+            x_values = self.validate_input(x_input)
+            y_values = self.validate_input(y_input)
 
         if x_values is None or y_values is None:
             return
@@ -206,87 +598,663 @@ class MobileSpeedOfLightApp(App):
             self.show_popup("Input Error", "The number of wavelength and frequency values should be the same.")
             return
 
-        # Convert wavelength from nm to meters and frequency from THz to Hz
-        x_values = [x * 1e-9 for x in x_values]  # Convert nm to meters
-        y_values = [y * 1e12 for y in y_values]  # Convert THz to Hz
+        with span('add.parse'):
+            x_errors = self.read_uncertainties(self.wavelength_error_input.text, len(x_values))
+            y_errors = self.read_uncertainties(self.frequency_error_input.text, len(y_values))
+        if x_errors is None or y_errors is None:
+            return
 
-        # Convert frequency to 1/frequency
-        y_values = [1 / y for y in y_values]  # Convert frequency to 1/frequency
+        from estimator import RunningFit
 
-        # Add the readings to the lists
-        self.x_readings.append(x_values)
-        self.y_readings.append(y_values)
+        # Add the reading as typed, then convert it to λ (m) and 1/ν (s) in place in the store
+        with span('add.store'):
+            index = self.readings.append(x_values, y_values, x_errors, y_errors)
+        with span('add.convert'):
+            self.conversion().apply_in_store(self.readings, int(self.readings.offsets[index]))
+        with span('add.store'):
+            self.running_fits.append(RunningFit.from_arrays(*self.readings.reading(index, "x", "y")))
+        self.save_readings([index])
 
-        # Display the input values in the label
-        display_text = ""
-        for i, (x_vals, y_vals) in enumerate(zip(self.x_readings, self.y_readings)):
-            display_text += f"\nReading {i+1}:\n"
-            display_text += f"λ (m): {', '.join([f'{x:.2e}' for x in x_vals])}\n"
-            display_text += f"1/ν (s): {', '.join([f'{y:.2e}' for y in y_vals])}\n"
-        
-        self.input_values_label.text = display_text.strip()
-        self.input_values_label.texture_update()
+        with span('add.display'):
+            self.update_readings_display([index])
+
+    def show_import_chooser(self, instance):
+        """Opens a file chooser for importing CSV, .npy or raw float64 data files."""
+        chooser = FileChooserListView(
+            path=os.path.expanduser('~'),
+            filters=['*.csv', '*.txt', '*.npy', '*.bin', '*.f64', '*.dat']
+        )
+        popup = Popup(
+            title="Import Readings",
+            content=chooser,
+            size_hint=(0.9, 0.9),
+            title_color=get_color_from_hex('#4FC3F7'),
+            separator_color=get_color_from_hex('#0288D1')
+        )
+
+        def on_submit(chooser, selection, touch=None):
+            popup.dismiss()
+            if selection:
+                self.import_readings(selection[0])
+
+        chooser.bind(on_submit=on_submit)
+        popup.open()
+
+    def import_readings(self, path):
+        """Streams a data file into the readings store."""
+        from estimator import RunningFit
+        from importer import import_file
+
+        try:
+            new_indices = import_file(self.readings, path, conversion=self.conversion())
+        except (OSError, ValueError) as e:
+            self.show_popup("Import Error", str(e))
+            return
+
+        for index in new_indices:
+            self.running_fits.append(RunningFit.from_arrays(*self.readings.reading(index, "x", "y")))
+        self.save_readings(new_indices)
+        self.update_readings_display(new_indices)
+
+    def format_values(self, values, limit=10):
+        """Formats the first few values of a reading, noting how many were left out."""
+        text = ', '.join(f'{v:.2e}' for v in values[:limit])
+        if len(values) > limit:
+            text += f", … ({len(values)} points)"
+        return text
+
+    def update_readings_display(self, new_indices):
+        """Adds list rows for new readings and refreshes the live results."""
+        if len(self.readings) == len(new_indices):
+            self.readings_list.data = []  # Drop the placeholder row
+
+        for index in new_indices:
+            x_vals, y_vals = self.readings.reading(index, "x", "y")
+            self.readings_list.set_row(
+                index,
+                f"Reading {index+1}:\nλ (m): {self.format_values(x_vals)}\n"
+                f"1/ν (s): {self.format_values(y_vals)}"
+            )
+            # Results come straight from the running fits, no refit needed
+            fit = self.running_fits[index]
+            self.results_list.set_row(index, self.format_result(index, fit.speed, error=fit.speed_error))
+        self.readings_list.scroll_to_end()
+        self.show_average([fit.speed for fit in self.running_fits],
+                          errors=[fit.speed_error for fit in self.running_fits])
+
+        # A plot on show follows the new data; only the new points are uploaded
+        if self.plot_args is not None:
+            self.plot_graph(None)
 
     def plot_graph(self, instance):
-        """Plots the wavelength vs 1/frequency graph and displays it in the Image widget."""
-        if not self.x_readings or not self.y_readings:
+        """Plots the wavelength vs 1/frequency graph in the native plot widget."""
+        if not self.running_fits:
             self.show_popup("No Data", "No readings to plot. Please add readings first.")
             return
 
-        # Create a figure and plot the graph with dark mode
-        with plt.style.context('dark_background'):
-            fig, ax = plt.subplots(figsize=(6, 5))  # Smaller size for mobile
-            for x_values, y_values in zip(self.x_readings, self.y_readings):
-                ax.plot(x_values, y_values, marker='o', linestyle='-', label=f'Reading {self.x_readings.index(x_values) + 1}')
+        # Vertex buffers are updated in place, so this is cheap enough for the UI thread
+        show_trendlines = self.trendline_toggle.state == 'down'
+        with span('plot.update'):
+            self.show_plot_view().update(self.readings, self.outliers, show_trendlines)
+        self.plot_args = (self.readings.snapshot(), self.digests, self.outliers, show_trendlines)
+
+    def show_plot_view(self):
+        """The plot widget, created the first time and made visible."""
+        if self.plot_view is None:
+            from canvasplot import CanvasPlot
+
+            self.plot_view = CanvasPlot()
+            self.plot_area.add_widget(self.plot_view)
+        self.plot_area.opacity = 1
+        return self.plot_view
+
+    def toggle_trendlines(self, instance, state):
+        """Redraws a visible plot with the trendlines shown or hidden."""
+        if self.plot_args is not None:
+            self.plot_graph(None)
 
-            ax.set_xlabel('Wavelength (m)', color='white')
-            ax.set_ylabel('1/Frequency (s)', color='white')
-            ax.set_title('Wavelength vs 1/Frequency', color='white')
-            ax.grid(True, linestyle='--', alpha=0.7, color='gray')
-            ax.legend()
+    def plot_cache_key(self, readings, digests, outliers, trendlines):
+        """Content key of the figure write_plot exports for these arguments."""
+        from memo import digest
 
-        # Save the plot as an image
-        plot_filename = "plot.png"
-        fig.savefig(plot_filename, bbox_inches='tight', facecolor='#121212', dpi=100)
-        plt.close(fig)
+        return digest('plot', PLOT_FIGSIZE, trendlines, *digests.keys(readings),
+                      *(outliers if outliers is not None else ()))
 
-        # Load the image into the Kivy Image widget
-        self.plot_image.source = plot_filename
-        self.plot_image.reload()
-        self.plot_image.opacity = 1  # Make the image visible
+    def export_plot(self, instance):
+        """Saves the current plot as a PNG in the app's data directory."""
+        import importlib.util
+
+        if self.plot_args is None:
+            self.show_popup("No Plot", "Plot the graph before exporting it.")
+            return
+        if importlib.util.find_spec('matplotlib') is None:
+            self.show_popup("Export Unavailable", "This build leaves out matplotlib, which PNG export needs.")
+            return
+
+        plot_filename = os.path.join(self.user_data_dir, "plot.png")
+        self.scheduler.submit(
+            'export', self.write_plot, plot_filename, self.plot_args, cancellable=True,
+            on_done=lambda written: self.show_popup(
+                "Plot Exported", f"Saved to {plot_filename}" if written else f"Already saved to {plot_filename}"),
+            on_error=self.show_task_error
+        )
+
+    def write_plot(self, path, plot_args, token=None):
+        """Draws the plot with matplotlib and writes it to ``path`` (off the UI thread).
+
+        Returns False when the file already holds exactly this plot.
+        """
+        from plotting import PlotController  # First export pays for the matplotlib import
+
+        readings, _, outliers, trendlines = plot_args
+        key = self.plot_cache_key(*plot_args)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self.exported == (path, key, mtime):
+            return False
+
+        # Keep one figure for the whole session and only draw what changed between exports.
+        # Read the attribute once: New Session may drop it while this runs.
+        controller = self.plot_controller
+        if controller is None:
+            controller = self.plot_controller = PlotController(figsize=PLOT_FIGSIZE)
+        with span('plot.render'):
+            controller.render(readings, None, outliers, trendlines)
+        if token is not None:
+            token.check()  # A newer export replaces this one: skip the PNG encode
+        controller.export_png(path)
+        self.exported = (path, key, os.stat(path).st_mtime_ns)
+        return True
 
     def calculate_speed_of_light(self, instance):
         """Calculates the speed of light using the slope of λ vs. 1/ν."""
-        if not self.x_readings or not self.y_readings:
+        if not self.running_fits:
             self.show_popup("No Data", "No readings to calculate. Please add readings first.")
             return
 
-        speeds_of_light = []
-        for i, (x_values, y_values) in enumerate(zip(self.x_readings, self.y_readings)):
-            if len(x_values) < 2 or len(y_values) < 2:
-                self.show_popup("Insufficient Data", "At least two points are required to calculate the slope.")
-                return
-            slope, _ = np.polyfit(x_values, y_values, 1)
-            speed_of_light = 1 / slope  # Speed of light is the inverse of the slope
-            speeds_of_light.append(speed_of_light)
-
-        # Format the results
-        result_text = ""
-        for i, speed in enumerate(speeds_of_light):
-            formatted_speed = self.format_scientific(speed)
-            error_percent = abs((speed - 2.998e8) / 2.998e8) * 100
-            result_text += f"\nReading {i+1}: {formatted_speed} m/s\n"
-            result_text += f"Error: {error_percent:.2f}%\n"
-        
-        # Add average if multiple readings
-        if len(speeds_of_light) > 1:
-            avg_speed = np.mean(speeds_of_light)
-            avg_error = abs((avg_speed - 2.998e8) / 2.998e8) * 100
-            result_text += f"\nAverage: {self.format_scientific(avg_speed)} m/s\n"
-            result_text += f"Avg Error: {avg_error:.2f}%"
-        
-        self.speed_result_label.text = result_text.strip()
-        self.speed_result_label.texture_update()
+        if (self.readings.lengths < 2).any():
+            self.show_popup("Insufficient Data", "At least two points are required to calculate the slope.")
+            return
+
+        method = FIT_MODES[self.fit_mode_spinner.text]
+        if method == 'weighted':
+            # Every reading in one vectorized pass, with analytic errors from the uncertainties
+            self.scheduler.submit('fit', self.fit_weighted, self.readings.snapshot(), self.digests,
+                                  on_done=self.show_weighted_results, on_error=self.show_task_error,
+                                  cancellable=True)
+        elif method == 'joint':
+            # One slope through every reading at once, each reading keeping its own offset
+            self.scheduler.submit('fit', self.fit_joint, self.readings.snapshot(), self.digests,
+                                  on_done=self.show_joint_results, on_error=self.show_task_error,
+                                  cancellable=True)
+        elif method == 'bootstrap':
+            # Fit every reading in one vectorized pass, plus bootstrap intervals, on a worker
+            self.scheduler.submit('fit', self.fit_with_intervals, self.readings.snapshot(), self.digests,
+                                  on_done=self.show_speed_results, on_error=self.show_task_error,
+                                  cancellable=True)
+        else:
+            self.scheduler.submit('fit', self.fit_robust, self.readings.snapshot(), self.digests, method,
+                                  on_done=self.show_robust_results, on_error=self.show_task_error,
+                                  cancellable=True)
+
+    def fit_weighted(self, readings, digests, token=None):
+        """Weighted least-squares fit of every reading, with σ_c and χ²/dof."""
+        from estimator import fit_weighted_flat
+        from memo import digest
+
+        key = digest('weighted', *digests.keys(readings))
+        result = self.cache.get(key)
+        if result is None:
+            x, y, sx, sy, offsets = readings.flat("x", "y", "sx", "sy")
+            if token is not None:
+                token.check()
+            with span('fit.weighted'):
+                result = fit_weighted_flat(x, y, offsets, sx, sy)
+            self.cache.put(key, result)
+        return result
+
+    def fit_joint(self, readings, digests, token=None):
+        """Joint fit of all readings: one shared c, one intercept per reading."""
+        from estimator import fit_shared_slope_flat
+        from memo import digest
+
+        key = digest('joint', *digests.keys(readings))
+        result = self.cache.get(key)
+        if result is None:
+            x, y, sx, sy, offsets = readings.flat("x", "y", "sx", "sy")
+            if token is not None:
+                token.check()
+            with span('fit.joint'):
+                result = fit_shared_slope_flat(x, y, offsets, sx, sy)
+            self.cache.put(key, result)
+        return result
+
+    def fit_with_intervals(self, readings, digests, token=None):
+        """Fits every reading with 95% confidence intervals for c (bootstrap, or jackknife when large).
+
+        Unchanged readings reuse their cached bootstrap replicates, and an
+        unchanged set of readings reuses the whole result.
+        """
+        from memo import digest
+        from uncertainty import speed_intervals
+
+        keys = digests.keys(readings)
+        key = digest('intervals', 2000, *keys)
+        result = self.cache.get(key)
+        if result is None:
+            # workers=1: forking the running Kivy process for a process pool is not safe
+            with span('fit.intervals'):
+                result = speed_intervals(*readings.flat("x", "y"), n_resamples=2000, workers=1,
+                                         cache=self.cache, keys=keys, check=token and token.check)
+            self.cache.put(key, result)
+        return result
+
+    def fit_robust(self, readings, digests, method, token=None):
+        """Robust fit of every reading; returns the fits and the (x, y) of their outliers."""
+        import numpy as np
+        from memo import digest
+        from robust import robust_fit_flat
+
+        keys = digests.keys(readings)
+        key = digest('robust', method, *keys)
+        result = self.cache.get(key)
+        if result is None:
+            x, y, offsets = readings.flat("x", "y")
+            with span('fit.robust'):
+                fits = robust_fit_flat(x, y, offsets, method, cache=self.cache, keys=keys,
+                                       check=token and token.check)
+            rejected = np.concatenate([fit.outliers for fit in fits])
+            result = (fits, (x[rejected], y[rejected]))
+            self.cache.put(key, result)
+        return result
+
+    def set_busy(self, busy):
+        """Shows the progress indicator while background jobs are running."""
+        if busy and self.progress_bar.opacity == 0:
+            self.progress_bar.opacity = 1
+            self.progress_animation.start(self.progress_bar)
+        elif not busy:
+            self.progress_animation.cancel(self.progress_bar)
+            self.progress_bar.opacity = 0
+            self.progress_bar.value = 0
+
+    def show_task_error(self, error):
+        """Reports a failed background job."""
+        self.show_popup("Error", str(error))
+
+    def format_interval(self, low, high):
+        """Formats a confidence interval, or nothing when the bootstrap could not give one."""
+        if not (math.isfinite(low) and math.isfinite(high)):
+            return ""
+        return f"\n95% CI: {self.format_scientific(low)} – {self.format_scientific(high)} m/s"
+
+    def format_speed(self, speed, error=math.nan):
+        """Formats a speed in m/s, with its standard uncertainty when known."""
+        if math.isfinite(error):
+            return f"{self.format_scientific(speed)} ± {self.format_scientific(error)} m/s"
+        return f"{self.format_scientific(speed)} m/s"
+
+    def format_result(self, index, speed, low=math.nan, high=math.nan, error=math.nan):
+        """Formats one reading's speed, error and (once calculated) interval for the results list."""
+        from estimator import percent_error
+
+        if not math.isfinite(speed):
+            return f"Reading {index+1}: needs at least two distinct wavelengths"
+        return (f"Reading {index+1}: {self.format_speed(speed, error)}\nError: {percent_error(speed):.2f}%"
+                + self.format_interval(low, high))
+
+    def show_weighted_results(self, fits):
+        """Fills the results list from weighted fits: c ± σ_c and, where uncertainties were given, χ²/dof."""
+        with span('fit.display'):
+            rows = []
+            for i, (speed, error, chi2_dof) in enumerate(zip(fits.speeds, fits.speed_errors, fits.chi2_dof)):
+                text = self.format_result(i, speed, error=error)
+                if math.isfinite(speed) and math.isfinite(chi2_dof):
+                    text += f"\nχ²/dof: {chi2_dof:.2f}"
+                rows.append({'text': text, 'height': self.results_list.row_height})
+            self.results_list.data = rows
+            self.show_average(fits.speeds, errors=fits.speed_errors)
+        self.record_results(fits.speeds, fits.speed_errors, 'weighted')
+        self.show_outliers(None)
+
+    def show_joint_results(self, fit):
+        """Shows the shared c of a joint fit, with every reading's fitted offset in the results list."""
+        from estimator import percent_error
+
+        with span('fit.display'):
+            self.results_list.data = [
+                {'text': f"Reading {i+1}: offset {self.format_scientific(intercept)}"
+                         + (f" ± {self.format_scientific(error)}" if math.isfinite(error) else "") + " s",
+                 'height': self.results_list.row_height}
+                for i, (intercept, error) in enumerate(zip(fit.intercepts, fit.intercept_errors))
+            ]
+            if not math.isfinite(fit.speed):
+                self.average_label.text = "Joint fit needs at least two distinct wavelengths in one reading"
+            else:
+                text = (f"Joint fit: {self.format_speed(fit.speed, fit.speed_error)}\n"
+                        f"Error: {percent_error(fit.speed):.2f}%")
+                if math.isfinite(fit.chi2_dof):
+                    text += f"\nχ²/dof: {fit.chi2_dof:.2f}"
+                self.average_label.text = text
+        # No per-reading speeds to put in the history: the one c belongs to the whole set
+        self.show_outliers(None)
+
+    def show_speed_results(self, intervals):
+        """Fills the results list with every reading's speed, error and interval, plus the average."""
+        with span('fit.display'):
+            self.results_list.data = [
+                {'text': self.format_result(i, speed, low, high), 'height': self.results_list.row_height}
+                for i, (speed, low, high) in enumerate(zip(intervals.speeds, intervals.low, intervals.high))
+            ]
+            self.show_average(intervals.speeds, intervals.average_low, intervals.average_high)
+        self.record_results(intervals.speeds, method='least-squares')
+        self.show_outliers(None)
+
+    def show_robust_results(self, result):
+        """Fills the results list from robust fits and highlights their outliers on the plot."""
+        fits, outliers = result
+        with span('fit.display'):
+            self.results_list.data = [
+                {'text': self.format_result(i, fit.speed) + f"\nOutliers: {fit.outliers.sum()}",
+                 'height': self.results_list.row_height}
+                for i, fit in enumerate(fits)
+            ]
+            self.show_average([fit.speed for fit in fits])
+        self.record_results([fit.speed for fit in fits], method=fits[0].method if fits else None)
+        self.show_outliers(outliers)
+
+    def show_outliers(self, outliers):
+        """Remembers the points to highlight and redraws the plot if one is showing."""
+        if outliers is None and self.outliers is None:
+            return
+        self.outliers = outliers
+        if self.plot_args is not None:
+            self.plot_graph(None)
+
+    def show_average(self, speeds_of_light, low=math.nan, high=math.nan, errors=None):
+        """Shows the average speed, its error and (once calculated) its interval.
+
+        With per-reading standard ``errors`` the average is the inverse-variance
+        weighted mean, shown with its own standard error.
+        """
+        from estimator import percent_error, weighted_mean
+
+        valid_speeds = [speed for speed in speeds_of_light if math.isfinite(speed)]
+        if len(valid_speeds) > 1:
+            if errors is not None:
+                avg_speed, avg_sigma = weighted_mean(speeds_of_light, errors)
+            else:
+                avg_speed, avg_sigma = math.fsum(valid_speeds) / len(valid_speeds), math.nan
+            avg_error = percent_error(avg_speed)
+            self.average_label.text = (f"Average: {self.format_speed(avg_speed, avg_sigma)}\n"
+                                       f"Avg Error: {avg_error:.2f}%" + self.format_interval(low, high))
+        elif valid_speeds:
+            self.average_label.text = "Add another reading to see the average"
+
+    def show_history(self, instance):
+        """Opens the history screen: filters over every stored reading and the average c they give."""
+        if self.history is None:
+            self.show_popup("History Unavailable", "The history database could not be opened.")
+            return
+
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(8))
+        fields = {}
+        for name, text, hint in (('low', "From wavelength (nm):", "e.g. 590"),
+                                 ('high', "To wavelength (nm):", "e.g. 610"),
+                                 ('since', "Since (YYYY-MM-DD):", "e.g. 2026-09-01")):
+            row = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(8))
+            row.add_widget(Label(text=text, color=get_color_from_hex('#B3E5FC'), size_hint_x=0.5))
+            fields[name] = TextInput(
+                hint_text=hint,
+                multiline=False,
+                background_color=get_color_from_hex('#424242'),
+                foreground_color=get_color_from_hex('#FFFFFF'),
+                hint_text_color=get_color_from_hex('#BDBDBD')
+            )
+            row.add_widget(fields[name])
+            layout.add_widget(row)
+        this_session = ToggleButton(
+            text="This session only",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        query_button = Button(
+            text="Query",
+            size_hint_y=None,
+            height=dp(40),
+            background_color=get_color_from_hex('#039BE5'),
+            background_normal=''
+        )
+        summary = Label(text="", size_hint_y=None, height=dp(110), color=get_color_from_hex('#E1F5FE'),
+                        halign='left', valign='top')
+        summary.bind(size=summary.setter('text_size'))
+        sessions = RowList(row_height=dp(40))
+        for widget in (this_session, query_button, summary, sessions):
+            layout.add_widget(widget)
+
+        def run_query(*args):
+            filters = self.history_filters(fields, this_session.state == 'down')
+            if filters is not None:
+                self.scheduler.submit(
+                    'history', self.query_history, filters,
+                    on_done=lambda result: self.show_history_results(result, summary, sessions),
+                    on_error=self.show_task_error
+                )
+
+        query_button.bind(on_press=run_query)
+        popup = Popup(
+            title="History",
+            content=layout,
+            size_hint=(0.95, 0.9),
+            title_color=get_color_from_hex('#4FC3F7'),
+            separator_color=get_color_from_hex('#0288D1')
+        )
+        popup.open()
+        run_query()
+
+    def history_filters(self, fields, this_session):
+        """Reads the history screen's fields into query filters, or None after reporting a mistake."""
+        from datetime import datetime
+
+        filters = {'session_id': self.history_session if this_session else None}
+        low, high = fields['low'].text.strip(), fields['high'].text.strip()
+        try:
+            if low or high:
+                filters['wavelength'] = (float(low) if low else 0.0, float(high) if high else math.inf)
+        except ValueError:
+            self.show_popup("Invalid Input", "Wavelengths must be numbers in nm.")
+            return None
+        since = fields['since'].text.strip()
+        if since:
+            try:
+                filters['since'] = datetime.strptime(since, '%Y-%m-%d').timestamp()
+            except ValueError:
+                self.show_popup("Invalid Input", "Enter the date as YYYY-MM-DD.")
+                return None
+        return filters
+
+    def query_history(self, filters):
+        """Aggregates the matching history (worker thread); returns (Aggregate, per-session rows)."""
+        self.history.flush()  # Include results still waiting to be written
+        with span('history.query'):
+            return self.history.aggregate(**filters), self.history.by_session(**filters)
+
+    def show_history_results(self, result, summary, sessions):
+        """Shows a history query's aggregate and its per-session breakdown."""
+        from datetime import datetime
+        from estimator import percent_error
+
+        aggregate, rows = result
+        if not aggregate.readings:
+            summary.text = "No fitted readings match."
+        else:
+            summary.text = (
+                f"{aggregate.readings} fitted readings, {aggregate.points} points, {len(rows)} sessions\n"
+                f"Mean: {self.format_scientific(aggregate.mean)} m/s "
+                f"(error {percent_error(aggregate.mean):.2f}%)\n"
+                f"Weighted mean: {self.format_speed(aggregate.weighted_mean, aggregate.weighted_error)}\n"
+                f"Range: {self.format_scientific(aggregate.minimum)} – {self.format_scientific(aggregate.maximum)} m/s\n"
+                f"Query: {aggregate.seconds * 1e3:.1f} ms"
+            )
+        sessions.data = [
+            {'text': f"Session {session_id}, {datetime.fromtimestamp(started):%Y-%m-%d %H:%M}: "
+                     f"{count} readings, {self.format_scientific(mean)} m/s",
+             'height': sessions.row_height}
+            for session_id, started, count, mean in rows
+        ]
+
+    def toggle_stream(self, instance, state):
+        """Asks for a source and starts streaming, or stops the running stream."""
+        if state == 'normal':
+            self.stop_stream()
+            return
+        if self.stream is not None:
+            return
+
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
+        content.add_widget(Label(
+            text="Source: simulate, serial:PORT[:BAUD], pipe:PATH, tcp:HOST:PORT or unix:PATH\n"
+                 "One \"wavelength frequency\" pair per line, in the units chosen above the fields.",
+            color=get_color_from_hex('#E1F5FE'),
+            size_hint_y=None,
+            height=dp(60)
+        ))
+        source_input = TextInput(text=self.last_stream_source(), multiline=False, size_hint_y=None, height=dp(40))
+        content.add_widget(source_input)
+        buttons = BoxLayout(spacing=dp(10), size_hint_y=None, height=dp(40))
+        start_button = Button(text="Start", background_color=get_color_from_hex('#0277BD'), background_normal='')
+        cancel_button = Button(text="Cancel", background_color=get_color_from_hex('#424242'), background_normal='')
+        buttons.add_widget(start_button)
+        buttons.add_widget(cancel_button)
+        content.add_widget(buttons)
+        popup = Popup(
+            title="Stream from Instrument",
+            content=content,
+            size_hint=(0.9, None),
+            height=dp(260),
+            auto_dismiss=False,
+            title_color=get_color_from_hex('#4FC3F7'),
+            separator_color=get_color_from_hex('#0288D1')
+        )
+
+        def start(*args):
+            popup.dismiss()
+            self.start_stream(source_input.text)
+
+        def cancel(*args):
+            popup.dismiss()
+            self.stream_toggle.state = 'normal'
+
+        start_button.bind(on_press=start)
+        cancel_button.bind(on_press=cancel)
+        popup.open()
+
+    def last_stream_source(self):
+        """The stream source used last time, or the simulated one."""
+        try:
+            with open(os.path.join(self.user_data_dir, "stream_source")) as f:
+                return f.read().strip() or "simulate"
+        except OSError:
+            return "simulate"
+
+    def start_stream(self, spec):
+        """Opens the source and refreshes the rolling fit STREAM_REFRESH_HZ times a second."""
+        from stream import RingBuffer, StreamReader, open_source
+
+        conversion = self.conversion()
+        try:
+            source = open_source(spec, conversion)
+        except (OSError, ValueError) as e:
+            self.show_popup("Stream Error", str(e))
+            self.stream_toggle.state = 'normal'
+            return
+        try:
+            with open(os.path.join(self.user_data_dir, "stream_source"), "w") as f:
+                f.write(spec.strip())
+        except OSError as e:
+            Logger.warning(f"Stream: could not remember the source: {e}")  # The stream itself is fine
+
+        self.stream = StreamReader(source, RingBuffer(), conversion)
+        self.stream_label.text = f"Streaming from {spec.strip()}: waiting for samples…"
+        self.stream_label.height = dp(50)
+        self.stream_label.opacity = 1
+        self.show_plot_view()
+        self.stream_event = Clock.schedule_interval(self.refresh_stream, 1 / STREAM_REFRESH_HZ)
+
+    def refresh_stream(self, dt=None):
+        """Fits the newest window on a worker; a refresh still running absorbs this one."""
+        from stream import rolling_fit
+
+        if self.stream.error is not None:
+            error = self.stream.error
+            self.stream_toggle.state = 'normal'  # Stops the stream
+            self.show_popup("Stream Stopped", str(error) or type(error).__name__)
+            return
+        if self.stream.buffer.total:
+            self.scheduler.submit('stream', rolling_fit, self.stream.buffer,
+                                  on_done=self.show_stream_fit, on_error=self.show_task_error)
+
+    def show_stream_fit(self, result):
+        """Shows the rolling estimate and the window it came from (UI thread only)."""
+        from estimator import percent_error
+
+        if self.stream is None:
+            return  # Stopped while this fit ran
+        x, y, total, fits = result
+        speed, error = fits.speeds[0], fits.speed_errors[0]
+        status = f"{len(x):,} samples in window, {total:,} received, {self.stream.rate():,.0f}/s"
+        if self.stream.parser.rejected:
+            status += f", {self.stream.parser.rejected:,} bad lines"
+        if math.isfinite(speed):
+            self.stream_label.text = (f"Live: {self.format_speed(speed, error)}  "
+                                      f"Error: {percent_error(speed):.2f}%\n{status}")
+        else:
+            self.stream_label.text = f"Live: needs two distinct wavelengths\n{status}"
+        with span('plot.live'):
+            self.show_plot_view().set_live(x, y, fits.slopes[0], fits.intercepts[0])
+
+    def stop_stream(self):
+        """Stops reading; the last estimate stays on screen."""
+        if self.stream is None:
+            return
+        self.stream_event.cancel()
+        self.scheduler.cancel('stream')
+        self.stream.stop(wait=False)  # The reader closes the source within one read timeout
+        self.stream = self.stream_event = None
+        self.stream_label.text = self.stream_label.text.replace("Live:", "Last live estimate:", 1)
+
+    def toggle_timings(self, instance, state):
+        """Shows the timing overlay and starts collecting spans, or hides and stops it."""
+        if state == 'down':
+            self.timing_overlay.height = dp(220)
+            self.timing_overlay.opacity = 1
+            self.timing_overlay.start()
+        else:
+            self.timing_overlay.stop()
+            self.timing_overlay.height = 0
+            self.timing_overlay.opacity = 0
+
+    def export_trace(self, instance):
+        """Writes the collected spans as a Chrome trace JSON file."""
+        trace_filename = os.path.join(self.user_data_dir, "trace.json")
+        try:
+            count = tracer.export(trace_filename)
+        except OSError as e:
+            self.show_popup("Export Error", str(e))
+            return
+        self.show_popup("Trace Exported", f"{count} spans saved to {trace_filename}")
+
+    def on_stop(self):
+        self.stop_stream()
+        self.scheduler.shutdown()
+        if self.session is not None:
+            self.session.close()
+        if self.history is not None:
+            self.history.close()
 
     def show_popup(self, title, message):
         """Displays a popup with the given title and message."""
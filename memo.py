@@ -0,0 +1,125 @@
+"""Content-addressed memoization for fits and rendered plots.
+
+Entries are keyed by a BLAKE2b digest of the data they were computed from
+together with the parameters of the computation, so an entry can never go
+stale: a reading that changed simply has a new key, and readings that did
+not change keep hitting theirs. The cache evicts the least recently used
+entries once their total size passes its byte budget.
+
+    cache = ContentCache()
+    keys = ReadingDigests().keys(store)        # one digest per reading
+    key = digest("intervals", 2000, *keys)     # a whole-result key
+"""
+from collections import OrderedDict
+import hashlib
+import struct
+import sys
+import threading
+
+import numpy as np
+
+DIGEST_SIZE = 16
+MAX_BYTES = 64 * 2 ** 20  # Default budget: a few hundred plots or a million cached replicates
+
+
+def digest(*parts):
+    """BLAKE2b digest of a sequence of arrays, byte strings and plain values."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            header = repr((part.dtype.str, part.shape)).encode()
+            h.update(b'a' + struct.pack('<Q', len(header)) + header)
+            h.update(np.ascontiguousarray(part))
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(b'b' + struct.pack('<Q', len(part)))
+            h.update(part)
+        else:
+            text = repr(part).encode()
+            h.update(b'r' + struct.pack('<Q', len(text)) + text)
+    return h.digest()
+
+
+def sizeof(value):
+    """Approximate bytes held by a cached value (arrays, buffers and tuples of them)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) + 33
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ContentCache:
+    """Thread-safe LRU mapping bounded by the total size of its values."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Key -> (value, size), least recently used first
+        self._lock = threading.Lock()  # Fits and renders look things up from worker threads
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """The value stored under ``key`` (now the most recently used), or ``default``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        """Stores ``value`` under ``key``, evicting old entries to stay within budget."""
+        size = sizeof(value) if nbytes is None else nbytes
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class ReadingDigests:
+    """Content digest of every reading in one ReadingStore, each hashed once.
+
+    A store only changes by appending readings, growing its last reading
+    and truncating, so (start, stop) identifies a reading's content for as
+    long as the store lives. Use a fresh instance for every new store.
+    """
+
+    def __init__(self, columns=("x", "y")):
+        self.columns = tuple(columns)
+        self._digests = []  # (start, stop, digest) per reading index
+        self._lock = threading.Lock()  # Plot and fit jobs may ask at the same time
+
+    def keys(self, readings):
+        """One digest per reading of ``readings`` (the store or a snapshot of it)."""
+        offsets = readings.offsets
+        with self._lock:
+            for i in range(len(readings)):
+                start, stop = int(offsets[i]), int(offsets[i + 1])
+                if i < len(self._digests) and self._digests[i][:2] == (start, stop):
+                    continue
+                entry = (start, stop, digest(*readings.reading(i, *self.columns)))
+                if i < len(self._digests):
+                    self._digests[i] = entry
+                else:
+                    self._digests.append(entry)
+            return [entry[2] for entry in self._digests[:len(readings)]]
@@ -0,0 +1,56 @@
+"""Colours, limits and decimation shared by the plot on screen and the PNG export.
+
+canvasplot draws with Kivy and plotting exports with matplotlib; both take
+their look and their min/max decimation from here, so neither has to import
+the other. Nothing in here imports Kivy or matplotlib.
+"""
+import numpy as np
+
+BACKGROUND = '#121212'
+LEGEND_MAX = 10  # Readings named in the legend; beyond this it would hide the data
+POINTS_PER_BUCKET = 4  # first, min, max and last point kept per pixel column
+OUTLIER_COLOR = '#FF5252'
+TRENDLINE_COLORS = ('#FF6B6B', '#4ECDC4', '#45B7D1')  # Red, teal, blue, as in graph.py
+# matplotlib's dark_background cycle, so exported PNGs use the same colours
+READING_COLORS = ('#8dd3c7', '#feffb3', '#bfbbd9', '#fa8174', '#81b1d2',
+                  '#fdb462', '#b3de69', '#bc82bd', '#ccebc4', '#ffed6f')
+
+
+def _run_extremes(values, starts, runs):
+    """Index of the first minimum and first maximum in every run of ``values``."""
+    positions = np.arange(len(values))
+    sentinel = len(values)
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    first_min = np.minimum.reduceat(np.where(values == mins[runs], positions, sentinel), starts)
+    first_max = np.minimum.reduceat(np.where(values == maxs[runs], positions, sentinel), starts)
+    return first_min, first_max
+
+
+def minmax_decimate(x, y, buckets):
+    """Reduces a reading to at most ~4 points per x bucket (first, min, max, last).
+
+    Buckets split the reading's own x span, so with ``buckets`` set to the
+    on-screen width in pixels every pixel column keeps its vertical extent and
+    the overall extremes survive. Returns the original arrays when the reading
+    is already small enough.
+    """
+    n = len(x)
+    if n <= POINTS_PER_BUCKET * buckets:
+        return x, y
+    if not np.all(x[1:] >= x[:-1]):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+
+    span = x[-1] - x[0]
+    if span > 0:
+        columns = np.minimum(((x - x[0]) * (buckets / span)).astype(np.int64), buckets - 1)
+    else:
+        columns = np.zeros(n, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    runs = np.cumsum(np.r_[False, columns[1:] != columns[:-1]])
+    first_min, first_max = _run_extremes(y, starts, runs)
+    lasts = np.r_[starts[1:] - 1, n - 1]
+
+    keep = np.unique(np.concatenate([starts, first_min, first_max, lasts]))
+    return x[keep], y[keep]
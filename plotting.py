@@ -0,0 +1,292 @@
+"""High-quality PNG export of the plot through matplotlib.
+
+The plot on screen is canvasplot.CanvasPlot; this module is only imported
+to export, so builds without matplotlib lose nothing but the Export button.
+"""
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import matplotlib.style
+import numpy as np
+import threading
+
+from estimator import fit_flat, ragged_to_flat
+from instrument import span
+from plotstyle import BACKGROUND, LEGEND_MAX, OUTLIER_COLOR, TRENDLINE_COLORS, minmax_decimate
+from trendlines import fit_trendlines, trendline_curves
+
+TRENDLINE_STYLES = tuple(zip(TRENDLINE_COLORS, ('-', '--', ':')))  # Colour and dash per degree, as in graph.py
+
+
+def new_figure(figsize=(6, 5), dpi=100):
+    """Creates a dark-mode figure attached to an Agg canvas (no pyplot state involved)."""
+    with matplotlib.style.context('dark_background'):
+        fig = Figure(figsize=figsize, dpi=dpi, facecolor=BACKGROUND, layout='tight')
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+    return fig, ax
+
+
+class PlotController:
+    """Keeps one long-lived figure with one Line2D per reading.
+
+    Reading lines and the legend are animated artists, so ``canvas.draw()`` only
+    paints the static axes. Two snapshots are kept: the bare axes and the axes
+    with every line. Adding a reading restores the second snapshot and draws
+    just the new line; the axes are only repainted when the view limits move.
+
+    Readings with more points than the image has pixels are drawn from a
+    min/max decimation; the dashed fit lines always use the full data.
+    Points a robust fit flagged as outliers are ringed on top of the lines.
+    Optional degree 1–3 trendlines run through all readings pooled together,
+    as graph.py drew them.
+    """
+
+    def __init__(self, figsize=(6, 5), dpi=100):
+        self.fig, self.ax = new_figure(figsize=figsize, dpi=dpi)
+        self.canvas = self.fig.canvas
+        self.lines = []
+        self.fit_lines = []
+        self.legend = None
+        self._lengths = []  # Full-resolution points behind each line
+        self._shown = []  # Points actually drawn for each line
+        self._buckets = None
+        self._background = None  # Axes without any data
+        self._layer = None  # Axes plus every reading line, before the legend
+        self._view = None
+        self._lock = threading.Lock()  # Renders may run on a worker thread
+
+        with matplotlib.style.context('dark_background'):
+            self.ax.set_xlabel('Wavelength (m)', color='white')
+            self.ax.set_ylabel('1/Frequency (s)', color='white')
+            self.ax.set_title('Wavelength vs 1/Frequency', color='white')
+            self.ax.grid(True, linestyle='--', alpha=0.7, color='gray')
+            self.lod_text = self.ax.text(0.99, 0.01, '', transform=self.ax.transAxes,
+                                         ha='right', va='bottom', fontsize=8,
+                                         color='gray', animated=True)
+            self.outlier_points, = self.ax.plot([], [], linestyle='', marker='o', markersize=9,
+                                                markerfacecolor='none', markeredgecolor=OUTLIER_COLOR,
+                                                label='_nolegend_', animated=True)
+        self._outliers = None
+        self.trend_lines = []
+        self.trends = None  # Trendlines behind trend_lines, for their residual and AIC figures
+        self._trend_key = None
+
+    def reset(self):
+        """Removes every reading line."""
+        for line in self.lines + self.fit_lines:
+            line.remove()
+        self.lines = []
+        self.fit_lines = []
+        self._lengths = []
+        self._shown = []
+        self._clear_trendlines()
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        self.ax.dataLim.set_points([[float('inf')] * 2, [float('-inf')] * 2])
+        self.ax.ignore_existing_data_limits = True
+        self._layer = None
+
+    @property
+    def lod_ratio(self):
+        """Full-resolution points per drawn point (1 means nothing was decimated)."""
+        shown = sum(self._shown)
+        return sum(self._lengths) / shown if shown else 1.0
+
+    def bucket_count(self, display_width=None):
+        """Pixel columns of the texture once it is scaled down to ``display_width``.
+
+        The whole figure width is used rather than the axes' so the count does
+        not shift whenever tight layout moves the axes.
+        """
+        width = self.canvas.get_width_height()[0]
+        if display_width:
+            width = min(width, display_width)
+        return max(int(width), 1)
+
+    def sync(self, readings, buckets):
+        """Matches the artists to a ReadingStore; returns the (new, changed) artists."""
+        if len(readings) < len(self.lines):
+            self.reset()
+        redo_all = buckets != self._buckets
+        self._buckets = buckets
+
+        lengths = readings.lengths
+        changed_ids = [i for i in range(len(self.lines)) if redo_all or lengths[i] != self._lengths[i]]
+        new_ids = list(range(len(self.lines), len(readings)))
+        ids = changed_ids + new_ids
+        if not ids:
+            return [], []
+
+        # Fit lines come from the full-resolution data, all touched readings in one pass
+        views = [readings.reading(i, "x", "y") for i in ids]
+        fits = fit_flat(*ragged_to_flat([v[0] for v in views], [v[1] for v in views]))
+
+        changed, new = [], []
+        with matplotlib.style.context('dark_background'):
+            for k, (i, (x_values, y_values)) in enumerate(zip(ids, views)):
+                x_shown, y_shown = minmax_decimate(x_values, y_values, buckets)
+                marker = 'o' if len(x_shown) == len(x_values) else ''
+                x_ends = np.array([x_values.min(), x_values.max()])
+                y_ends = fits.intercepts[k] + fits.slopes[k] * x_ends
+
+                if i < len(self.lines):
+                    line, fit_line = self.lines[i], self.fit_lines[i]
+                    line.set_data(x_shown, y_shown)
+                    line.set_marker(marker)
+                    fit_line.set_data(x_ends, y_ends)
+                    self._lengths[i] = len(x_values)
+                    self._shown[i] = len(x_shown)
+                    changed += [line, fit_line]
+                else:
+                    label = f'Reading {i + 1}' if i < LEGEND_MAX else '_nolegend_'
+                    line, = self.ax.plot(x_shown, y_shown, marker=marker, linestyle='-',
+                                         label=label, animated=True)
+                    fit_line, = self.ax.plot(x_ends, y_ends, linestyle='--', linewidth=1,
+                                             color=line.get_color(), alpha=0.8, animated=True)
+                    self.lines.append(line)
+                    self.fit_lines.append(fit_line)
+                    self._lengths.append(len(x_values))
+                    self._shown.append(len(x_shown))
+                    new += [line, fit_line]
+                # Readings only ever grow, so widening the limits by the drawn points is enough
+                self.ax.update_datalim(np.column_stack([x_shown, y_shown]))
+        return new, changed
+
+    def set_outliers(self, outliers):
+        """Rings the given (x, y) points, or none when ``outliers`` is None.
+
+        Returns True when this changed what is shown.
+        """
+        if outliers is self._outliers:
+            return False
+        self._outliers = outliers
+        if outliers is None:
+            self.outlier_points.set_data([], [])
+        else:
+            self.outlier_points.set_data(*outliers)
+        return True
+
+    def set_trendlines(self, readings, show=True):
+        """Fits and draws the trendlines through every point, or hides them.
+
+        The fit is redone only when points were added. Returns True when this
+        changed what is shown.
+        """
+        key = (len(readings), readings.total) if show and readings.total else None
+        if key == self._trend_key:
+            return False
+        self._clear_trendlines()
+        self._trend_key = key
+        if key is None:
+            return True
+
+        x, y, _ = readings.flat("x", "y")
+        self.trends = fit_trendlines(x, y)
+        x_grid, curves = trendline_curves(self.trends)
+        finite = np.isfinite(self.trends.aic)
+        best = self.trends.aic[finite].min() if finite.any() else np.nan
+        with matplotlib.style.context('dark_background'):
+            for degree, curve, aic, (color, style) in zip(self.trends.degrees, curves,
+                                                          self.trends.aic, TRENDLINE_STYLES):
+                if not np.all(np.isfinite(curve)):
+                    continue  # Not enough distinct points for this degree
+                label = f'Degree {degree} fit'
+                if np.isfinite(aic):
+                    label += f' (ΔAIC {aic - best:+.1f})'
+                line, = self.ax.plot(x_grid, curve, color=color, linestyle=style, linewidth=2,
+                                     label=label, animated=True)
+                self.trend_lines.append(line)
+        return True
+
+    def _clear_trendlines(self):
+        for line in self.trend_lines:
+            line.remove()
+        self.trend_lines = []
+        self.trends = None
+        self._trend_key = None
+
+    def render(self, readings, display_width=None, outliers=None, trendlines=False):
+        """Brings the figure up to date, ready for ``export_png``.
+
+        ``display_width`` is the on-screen width of the image in pixels; it sets
+        how far large readings are decimated. ``outliers`` is an (x, y) pair of
+        arrays of points to highlight; ``trendlines`` turns on the polynomial
+        trendlines.
+        """
+        with self._lock:
+            self._render(readings, display_width, outliers, trendlines)
+
+    def _render(self, readings, display_width, outliers, trendlines):
+        before = len(self.lines)
+        with span('plot.sync'):
+            new, changed = self.sync(readings, self.bucket_count(display_width))
+        # Highlights and trendlines sit under the newest lines, so any change redraws them all
+        repaint = self.set_outliers(outliers)
+        with span('plot.trendlines'):
+            trends_changed = self.set_trendlines(readings, trendlines)
+        if trends_changed:
+            repaint = True
+            self._update_legend()  # Trendlines are named in the legend
+        elif len(self.lines) > before and before < LEGEND_MAX:
+            self._update_legend()  # Some of the new lines are named in the legend
+
+        self.ax.autoscale_view()
+        view = tuple(self.ax.viewLim.bounds) + tuple(self.canvas.get_width_height())
+        if view != self._view or self._background is None:
+            # Limits moved: repaint the axes, then every line on top
+            with span('plot.axes'):
+                self.canvas.draw()
+            self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+            self._view = view
+            self._draw_lines(self.lines + self.fit_lines + self.trend_lines + [self.outlier_points])
+        elif changed or repaint or self._layer is None:
+            self.canvas.restore_region(self._background)
+            self._draw_lines(self.lines + self.fit_lines + self.trend_lines + [self.outlier_points])
+        else:
+            # Same view: start from the previous lines and only add the new ones
+            self.canvas.restore_region(self._layer)
+            self._draw_lines(new)
+
+        ratio = self.lod_ratio
+        if ratio > 1:
+            self.lod_text.set_text(f'LOD 1:{ratio:.0f} ({sum(self._shown):,} of {sum(self._lengths):,} points)')
+        else:
+            self.lod_text.set_text('LOD full detail')
+        self.ax.draw_artist(self.lod_text)
+        if self.legend is not None:
+            self.ax.draw_artist(self.legend)
+
+    def export_png(self, path):
+        """Writes the current plot, lines included, to a PNG file."""
+        animated = self.lines + self.fit_lines + self.trend_lines + [self.outlier_points, self.lod_text]
+        if self.legend is not None:
+            animated.append(self.legend)
+        with self._lock:
+            for artist in animated:
+                artist.set_animated(False)
+            try:
+                export_png(self.fig, path)
+            finally:
+                for artist in animated:
+                    artist.set_animated(True)
+                self._view = None  # savefig repainted the canvas
+
+    def _draw_lines(self, lines):
+        with span('plot.lines'):
+            for line in lines:
+                self.ax.draw_artist(line)
+        self._layer = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _update_legend(self):
+        with matplotlib.style.context('dark_background'):
+            # A fixed corner: 'best' would scan every data point on each redraw.
+            # λ vs 1/ν rises to the right, so the upper left stays clear.
+            self.legend = self.ax.legend(loc='upper left')
+        self.legend.set_animated(True)
+
+
+def export_png(fig, path):
+    """Writes the figure to a PNG file; only used for explicit exports."""
+    with span('plot.savefig'):
+        fig.savefig(path, facecolor=BACKGROUND, dpi=fig.dpi)
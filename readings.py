@@ -0,0 +1,163 @@
+"""Compact columnar storage for experiment readings."""
+import numpy as np
+
+
+class ReadingStore:
+    """Holds every reading in one contiguous float64 buffer per quantity.
+
+    Reading ``i`` occupies ``[offsets[i], offsets[i+1])`` of each column (CSR
+    layout). Buffers grow by doubling, so appends are amortized O(1) per value,
+    and ``reading()``/``flat()`` hand out numpy views rather than copies.
+
+    A view keeps pointing at the buffer it came from: after the store grows it
+    no longer sees points added later, but the points it covers never change.
+    ``truncate`` and ``clear`` move the store onto fresh buffers for the same
+    reason, so points written after them never show through older views.
+    """
+
+    def __init__(self, columns=("x", "y"), capacity=1024):
+        self.columns = tuple(columns)
+        self._data = {name: np.empty(capacity, dtype=np.float64) for name in self.columns}
+        self._offsets = np.zeros(64, dtype=np.int64)
+        self._count = 0  # Number of readings
+        self._size = 0  # Number of points across all readings
+
+    @classmethod
+    def from_arrays(cls, columns, offsets):
+        """Wraps existing arrays (e.g. memory maps) as a store without copying them.
+
+        ``columns`` maps each column name to its flat float64 values and
+        ``offsets`` are the CSR offsets into them. The arrays become the
+        store's buffers; the first append that needs more room copies them
+        into memory.
+        """
+        store = cls.__new__(cls)
+        store.columns = tuple(columns)
+        store._data = dict(columns)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        store._offsets = np.zeros(max(64, len(offsets)), dtype=np.int64)
+        store._offsets[:len(offsets)] = offsets
+        store._count = len(offsets) - 1
+        store._size = int(offsets[-1])
+        return store
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.reading(i)
+
+    @property
+    def total(self):
+        """Total number of points stored."""
+        return self._size
+
+    @property
+    def offsets(self):
+        """CSR offsets, one more entry than there are readings."""
+        return self._offsets[:self._count + 1]
+
+    @property
+    def lengths(self):
+        """Number of points in each reading."""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the buffers, including spare capacity."""
+        return sum(buf.nbytes for buf in self._data.values()) + self._offsets.nbytes
+
+    def column(self, name):
+        """View of one quantity across all readings."""
+        return self._data[name][:self._size]
+
+    def flat(self, *names):
+        """Views of the requested columns (all by default) followed by the offsets."""
+        names = names or self.columns
+        return tuple(self.column(name) for name in names) + (self.offsets,)
+
+    def reading(self, index, *names):
+        """Views of one reading's columns (all by default)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("reading index out of range")
+        start, stop = self._offsets[index], self._offsets[index + 1]
+        names = names or self.columns
+        return tuple(self._data[name][start:stop] for name in names)
+
+    def snapshot(self):
+        """Read-only copy of the current readings that shares the value buffers.
+
+        Only the offsets are copied, so it is cheap to take and safe to hand to
+        a worker thread while this store keeps receiving readings.
+        """
+        snap = ReadingStore.__new__(ReadingStore)
+        snap.columns = self.columns
+        snap._data = {name: self.column(name) for name in self.columns}
+        snap._offsets = self.offsets.copy()
+        snap._count = self._count
+        snap._size = self._size
+        return snap
+
+    def append(self, *values):
+        """Stores a new reading, one array per column, and returns its index."""
+        if self._count + 2 > len(self._offsets):
+            self._offsets = self._grow(self._offsets, self._count + 2)
+        self._offsets[self._count + 1] = self._size
+        self._count += 1
+        self.extend(*values)
+        return self._count - 1
+
+    def extend(self, *values):
+        """Adds points to the last reading."""
+        if self._count == 0:
+            raise IndexError("no reading to extend; append one first")
+        if len(values) != len(self.columns):
+            raise ValueError(f"expected {len(self.columns)} columns, got {len(values)}")
+        values = [np.asarray(v, dtype=np.float64).ravel() for v in values]
+        added = len(values[0])
+        if any(len(v) != added for v in values):
+            raise ValueError("every column needs the same number of values")
+
+        end = self._size + added
+        for name, v in zip(self.columns, values):
+            buf = self._data[name]
+            if end > len(buf):
+                buf = self._data[name] = self._grow(buf, end)
+            buf[self._size:end] = v
+        self._size = end
+        self._offsets[self._count] = end
+
+    def truncate(self, count):
+        """Drops every reading from index ``count`` onwards."""
+        if not 0 <= count <= self._count:
+            raise IndexError("truncate count out of range")
+        if count < self._count:
+            self._detach(int(self._offsets[count]))
+        self._count = count
+        self._size = int(self._offsets[count])
+
+    def clear(self):
+        """Forgets every reading, moving to fresh buffers of the same capacity.
+
+        Views and snapshots handed out before clearing keep the old values.
+        """
+        self._detach(0)
+        self._count = 0
+        self._size = 0
+
+    def _detach(self, keep):
+        """Replaces the buffers with new ones holding only their first ``keep`` points."""
+        for name, buf in self._data.items():
+            fresh = np.empty(len(buf), dtype=np.float64)
+            fresh[:keep] = buf[:keep]
+            self._data[name] = fresh
+
+    def _grow(self, buf, needed):
+        """Returns a copy of ``buf`` with room for at least ``needed`` entries."""
+        capacity = max(needed, 2 * len(buf))
+        grown = np.empty(capacity, dtype=buf.dtype)
+        grown[:len(buf)] = buf
+        return grown
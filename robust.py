@@ -0,0 +1,278 @@
+"""Outlier-resistant line fits: Theil–Sen median of slopes and RANSAC.
+
+Both return the same ``RobustFit`` per reading, including a mask of the
+points flagged as outliers so the plot can highlight them. Like the
+estimator module, nothing in here imports Kivy.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+RobustFit = namedtuple("RobustFit", ["slope", "intercept", "speed", "outliers", "method"])
+
+ENUMERATE_PAIRS = 1 << 18  # Up to this many slopes are simply listed and selected from
+ENUMERATE_SLOPES = 16  # Per point: brackets this small are listed rather than narrowed further
+MAX_ROUNDS = 32  # Bracketing rounds before listing whatever the bracket holds
+OUTLIER_SIGMAS = 3  # Residuals beyond this many robust sigmas count as outliers
+MAD_SIGMA = 1.4826  # MAD of a normal distribution, in sigmas
+MAX_CELLS = 1 << 22  # Residuals held at once while scoring RANSAC hypotheses
+
+
+def _inversion_levels(values, strict=True):
+    """Bottom-up merge sort of ``values`` that yields every level's inversions.
+
+    An inversion is a pair of positions i < j with values[i] > values[j]
+    (values[i] >= values[j] when ``strict`` is False). Each level yields
+    ``(left_ids, right_ids, hits, greater)``: right element r is inverted
+    with ``left_ids[hits[r]:hits[r] + greater[r]]``. The values are replaced
+    by dense ranks and every level is one vectorized pass, so the whole
+    sweep costs O(n log n).
+    """
+    n = len(values)
+    ranks = np.unique(values, return_inverse=True)[1].astype(np.int64).ravel()
+    ids = np.arange(n)
+    side = "right" if strict else "left"
+    width = 1
+    while width < n:
+        block = np.arange(n) // width
+        pair = block >> 1
+        is_right = (block & 1).astype(bool)
+        # Offsetting by pair number makes all the left runs one sorted array
+        keys = pair * n + ranks
+        right_pair = pair[is_right]
+        hits = np.searchsorted(keys[~is_right], keys[is_right], side)
+        greater = (right_pair + 1) * width - hits  # Left runs before a right run are always full
+        yield ids[~is_right], ids[is_right], hits, greater
+
+        order = np.argsort(keys, kind="stable")  # Merges pairs of sorted runs
+        ranks = ranks[order]
+        ids = ids[order]
+        width *= 2
+
+
+def _count_inversions(values, strict=True):
+    return int(sum(greater.sum() for _, _, _, greater in _inversion_levels(values, strict)))
+
+
+def _expand(left_ids, right_ids, hits, greater, picks=None):
+    """Turns level inversions into (first, second) id arrays, all or only ``picks``."""
+    starts = np.cumsum(greater) - greater
+    if picks is None:
+        rows = np.repeat(np.arange(len(greater)), greater)
+        within = np.arange(len(rows)) - starts[rows]
+    else:
+        rows = np.searchsorted(starts + greater, picks, "right")
+        within = picks - starts[rows]
+    return left_ids[hits[rows] + within], right_ids[rows]
+
+
+def _bracket_pairs(x, y, t_lo, t_hi, sample=None, rng=None):
+    """Pairs of points whose slope lies (up to ties) in [t_lo, t_hi].
+
+    Ordered by y - t_lo·x, exactly those pairs appear as inversions of
+    y - t_hi·x. Returns every such pair, or ``sample`` of them drawn
+    uniformly, as two arrays of point indices.
+    """
+    # Infinite bounds order the points by x alone
+    r_lo = y - t_lo * x if np.isfinite(t_lo) else x
+    r_hi = y - t_hi * x if np.isfinite(t_hi) else -x
+    order = np.lexsort((-r_hi, r_lo))
+    levels = list(_inversion_levels(r_hi[order], strict=False))
+    if sample is None:
+        pairs = [_expand(*level) for level in levels]
+    else:
+        totals = np.array([level[3].sum() for level in levels])
+        ends = np.cumsum(totals)
+        if ends[-1] == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        picks = np.sort(rng.integers(0, ends[-1], sample))
+        bounds = np.searchsorted(picks, ends - totals)
+        bounds = np.r_[bounds, len(picks)]
+        pairs = [_expand(*level, picks=picks[a:b] - start)
+                 for level, a, b, start in zip(levels, bounds[:-1], bounds[1:], ends - totals)]
+    first = np.concatenate([p[0] for p in pairs])
+    second = np.concatenate([p[1] for p in pairs])
+    return order[first], order[second]
+
+
+def _count_slopes(x, y, t, inclusive=False, x_order=None):
+    """Number of pairs with distinct x whose slope is below (or at most) ``t``.
+
+    ``x_order`` may pass in argsort(x) when x has no repeated values.
+    """
+    r = y - t * x
+    order = x_order if x_order is not None else np.lexsort((r, x))  # Equal x sorted by r never count
+    count = _count_inversions(r[order], strict=not inclusive)
+    if inclusive:
+        # Identical points tie in both x and r but have no slope at all
+        same = (np.diff(x[order]) == 0) & (np.diff(r[order]) == 0)
+        runs = np.diff(np.flatnonzero(np.r_[True, ~same, True]))
+        count -= int(np.sum(runs * (runs - 1) // 2))
+    return count
+
+
+def _pair_slopes(x, y, first, second):
+    dx = x[second] - x[first]
+    keep = dx != 0
+    return (y[second] - y[first])[keep] / dx[keep]
+
+
+def theil_sen_slope(x, y, seed=None):
+    """Median of the slopes through every pair of points with distinct x.
+
+    Small readings list all pairs. Larger ones use randomized slope
+    selection: slopes sampled from the current bracket pin the median
+    between two sample slopes, inversion counts (O(n log n)) confirm the
+    bracket, and once it holds about n slopes they are listed and the
+    median picked from them. Each round shrinks the bracket by a factor of
+    about √n, so a handful of rounds is enough.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    ties = np.unique(x, return_counts=True)[1]
+    total = n * (n - 1) // 2 - int(np.sum(ties * (ties - 1) // 2))
+    if total == 0:
+        return np.nan
+    # Both middle ranks, so even counts average the two middle slopes
+    ranks = ((total - 1) // 2, total // 2)
+
+    if n * (n - 1) // 2 <= ENUMERATE_PAIRS:
+        first, second = np.triu_indices(n, 1)
+        slopes = _pair_slopes(x, y, first, second)
+        return np.mean(np.partition(slopes, ranks)[list(ranks)])
+
+    rng = np.random.default_rng(seed)
+    x_order = np.argsort(x) if len(ties) == n else None
+    sample = 2 * n
+    spread = 3 * np.sqrt(sample)
+    t_lo, t_hi = -np.inf, np.inf
+    below, inside = 0, total  # Slopes below t_lo, and within [t_lo, t_hi]
+    for _ in range(MAX_ROUNDS):
+        if inside <= ENUMERATE_SLOPES * n or t_lo == t_hi:
+            break
+        if np.isinf(t_lo) and np.isinf(t_hi):
+            pairs = rng.integers(0, n, (2, sample))  # Any pair is in the first bracket
+        else:
+            pairs = _bracket_pairs(x, y, t_lo, t_hi, sample, rng)
+        slopes = np.sort(_pair_slopes(x, y, *pairs))
+        if len(slopes) == 0:
+            break
+        scale = len(slopes) / inside
+        low = int((ranks[0] - below) * scale - spread)
+        high = int((ranks[1] - below) * scale + spread)
+        new_lo = slopes[min(low, len(slopes) - 1)] if low >= 0 else t_lo
+        new_hi = slopes[max(high, 0)] if high < len(slopes) else t_hi
+        new_below = _count_slopes(x, y, new_lo, x_order=x_order) if np.isfinite(new_lo) else 0
+        new_upto = (_count_slopes(x, y, new_hi, inclusive=True, x_order=x_order)
+                    if np.isfinite(new_hi) else total)
+        if new_below <= ranks[0] and ranks[1] < new_upto:
+            t_lo, t_hi = new_lo, new_hi
+            below, inside = new_below, new_upto - new_below
+        else:
+            spread *= 2  # Unlucky sample missed the median; retry wider
+    if t_lo == t_hi:
+        return t_lo  # Both middle slopes are this exact value
+
+    slopes = _pair_slopes(x, y, *_bracket_pairs(x, y, t_lo, t_hi))
+    slopes = np.sort(slopes[(slopes >= t_lo) & (slopes <= t_hi)])
+    picks = np.clip(np.array(ranks) - below, 0, len(slopes) - 1)
+    return np.mean(slopes[picks])
+
+
+def _flag_outliers(x, y, slope, intercept):
+    """Marks points whose residual is beyond OUTLIER_SIGMAS robust sigmas."""
+    residuals = np.abs(y - (intercept + slope * x))
+    sigma = MAD_SIGMA * np.median(residuals)
+    if sigma == 0:
+        # More than half the points sit exactly on the line
+        sigma = np.finfo(np.float64).eps * np.max(np.abs(y))
+    return residuals > OUTLIER_SIGMAS * sigma
+
+
+def theil_sen(x, y, seed=None):
+    """Theil–Sen line through one reading, with outliers flagged by residual MAD."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    slope = theil_sen_slope(x, y, seed)
+    if not np.isfinite(slope):
+        return RobustFit(np.nan, np.nan, np.nan, np.zeros(len(x), dtype=bool), "theil-sen")
+    intercept = np.median(y - slope * x)
+    return RobustFit(slope, intercept, 1 / slope if slope != 0 else np.nan,
+                     _flag_outliers(x, y, slope, intercept), "theil-sen")
+
+
+def ransac(x, y, n_hypotheses=256, threshold=None, seed=None):
+    """RANSAC line through one reading, scoring every hypothesis in batch.
+
+    Hypotheses are lines through random pairs of points. Residuals for a
+    block of hypotheses are one matrix; the inlier threshold is
+    ``threshold`` or, when None, OUTLIER_SIGMAS robust sigmas of the best
+    hypothesis (least median of squares). The line is refit by least
+    squares on the inliers of the best hypothesis.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, n, n_hypotheses) if n else np.empty(0, dtype=np.int64)
+    second = rng.integers(0, n, n_hypotheses) if n else np.empty(0, dtype=np.int64)
+    dx = x[second] - x[first]
+    keep = dx != 0
+    if not keep.any():
+        return RobustFit(np.nan, np.nan, np.nan, np.zeros(n, dtype=bool), "ransac")
+    slopes = (y[second] - y[first])[keep] / dx[keep]
+    intercepts = y[first][keep] - slopes * x[first][keep]
+
+    block = max(1, MAX_CELLS // n)
+    median = len(x) // 2
+    medians = np.empty(len(slopes))
+    for a in range(0, len(slopes), block):
+        residuals = np.abs(y - (intercepts[a:a + block, None] + slopes[a:a + block, None] * x))
+        medians[a:a + block] = np.partition(residuals, median, axis=1)[:, median]
+    if threshold is None:
+        threshold = max(OUTLIER_SIGMAS * MAD_SIGMA * medians.min(),
+                        np.finfo(np.float64).eps * np.max(np.abs(y)))
+
+    counts = np.empty(len(slopes), dtype=np.int64)
+    for a in range(0, len(slopes), block):
+        residuals = np.abs(y - (intercepts[a:a + block, None] + slopes[a:a + block, None] * x))
+        counts[a:a + block] = np.count_nonzero(residuals <= threshold, axis=1)
+    # Most inliers wins; the smaller median residual breaks ties
+    best = np.lexsort((medians, -counts))[0]
+    inliers = np.abs(y - (intercepts[best] + slopes[best] * x)) <= threshold
+
+    xi, yi = x[inliers], y[inliers]
+    dxi = xi - xi.mean()
+    sxx = np.dot(dxi, dxi)
+    slope = np.dot(dxi, yi - yi.mean()) / sxx if sxx > 0 else slopes[best]
+    intercept = yi.mean() - slope * xi.mean()
+    return RobustFit(slope, intercept, 1 / slope if slope != 0 else np.nan, ~inliers, "ransac")
+
+
+def robust_fit_flat(x, y, offsets, method="theil-sen", seed=None, cache=None, keys=None, check=None):
+    """Robust fit of every reading of CSR-packed data; returns a list of RobustFit.
+
+    Given a ``cache`` (memo.ContentCache) and each reading's content digest
+    in ``keys``, fits of readings seen before are taken from the cache.
+    ``check``, if given, is called before each reading is fitted; raising
+    from it abandons the rest.
+    """
+    fit = {"theil-sen": theil_sen, "ransac": ransac}[method]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    seeds = np.random.SeedSequence(seed).spawn(len(offsets) - 1)
+    if keys is None:
+        keys = [None] * len(seeds)
+
+    fits = []
+    for a, b, s, key in zip(offsets[:-1], offsets[1:], seeds, keys):
+        result = None if cache is None else cache.get((key, method, seed))
+        if result is None:
+            if check is not None:
+                check()
+            result = fit(x[a:b], y[a:b], seed=s)
+            if cache is not None:
+                cache.put((key, method, seed), result)
+        fits.append(result)
+    return fits
@@ -0,0 +1,337 @@
+"""Lab-wide HTTP service: workstations POST readings, the service answers with c.
+
+Runs on asyncio with nothing outside the standard library and numpy:
+
+    python service.py --host 0.0.0.0 --port 8080
+
+Endpoints (JSON in, JSON out):
+
+    POST /speed   {"wavelength_nm": [...], "frequency_thz": [...], "fit": "least-squares"}
+    POST /batch   {"readings": [{"wavelength_nm": [...], "frequency_thz": [...]}, ...]}
+    GET  /health
+
+The conversion and fit are the app's own (units.DEFAULT, estimator.fit_flat
+and robust.robust_fit_flat). Requests are coalesced twice over: identical
+readings already being computed share one result, and least-squares
+readings that arrive within a few milliseconds of each other are fitted
+together in one vectorized fit_flat call. Robust fits and large batches run
+on a process pool so the event loop keeps accepting connections.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from estimator import fit_flat, percent_error, ragged_to_flat
+from importer import all_positive
+from units import DEFAULT
+
+MAX_BODY = 64 * 2 ** 20  # Bytes accepted per request
+COALESCE_WINDOW = 0.002  # Seconds a least-squares reading waits for others to share its fit
+COALESCE_MAX = 256  # Readings per coalesced fit
+INLINE_POINTS = 20000  # Coalesced fits up to this many points run on the event loop itself
+FITS = ("least-squares", "theil-sen", "ransac")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """A client mistake, reported back as a 4xx response."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_reading(reading):
+    """Validates one reading the way add_reading does; returns (x, y) in SI units."""
+    try:
+        wavelengths = np.asarray(reading["wavelength_nm"], dtype=np.float64)
+        frequencies = np.asarray(reading["frequency_thz"], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(400, "Each reading needs numeric 'wavelength_nm' and 'frequency_thz' lists.")
+    if wavelengths.ndim != 1 or wavelengths.shape != frequencies.shape:
+        raise RequestError(400, "The number of wavelength and frequency values should be the same.")
+    if not (all_positive(wavelengths) and all_positive(frequencies)):
+        raise RequestError(400, "Values must be positive, finite numbers.")  # JSON 1e400 parses as inf
+    return DEFAULT.apply(wavelengths, frequencies, out=(wavelengths, frequencies))
+
+
+def content_length(headers):
+    """The body length a request announces; RequestError unless it is a whole number within MAX_BODY."""
+    value = headers.get("content-length", "").strip() or "0"
+    if not (value.isascii() and value.isdigit()):
+        raise RequestError(400, "Content-Length must be a non-negative whole number.")
+    length = int(value)
+    if length > MAX_BODY:
+        raise RequestError(413, "Request body too large.")
+    return length
+
+
+def reading_key(x, y, fit):
+    """Content hash of a reading plus the fit applied to it."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(fit.encode())
+    digest.update(np.int64(len(x)).tobytes())
+    digest.update(x.tobytes())
+    digest.update(y.tobytes())
+    return digest.hexdigest()
+
+
+def result_dict(points, speed, slope, intercept, fit, outliers=None):
+    finite = math.isfinite(speed)
+    result = {
+        "points": int(points),
+        "fit": fit,
+        "speed": float(speed) if finite else None,
+        "error_percent": float(percent_error(speed)) if finite else None,
+        "slope": float(slope) if math.isfinite(slope) else None,
+        "intercept": float(intercept) if math.isfinite(intercept) else None,
+    }
+    if not finite:
+        result["error"] = "At least two distinct wavelengths are required to calculate the slope."
+    if outliers is not None:
+        result["outliers"] = int(outliers)
+    return result
+
+
+def fit_readings(readings, fit="least-squares"):
+    """Fits a list of (x, y) readings together; returns one result dict per reading."""
+    x, y, offsets = ragged_to_flat([r[0] for r in readings], [r[1] for r in readings])
+    if fit == "least-squares":
+        fits = fit_flat(x, y, offsets)
+        return [result_dict(n, s, m, b, fit)
+                for n, s, m, b in zip(fits.counts, fits.speeds, fits.slopes, fits.intercepts)]
+
+    from robust import robust_fit_flat
+
+    return [result_dict(len(f.outliers), f.speed, f.slope, f.intercept, fit, f.outliers.sum())
+            for f in robust_fit_flat(x, y, offsets, fit)]
+
+
+def summarize(results):
+    """Average of the valid speeds in a batch, as the app's average label shows it."""
+    speeds = [r["speed"] for r in results if r["speed"] is not None]
+    if not speeds:
+        return {"average": None, "average_error_percent": None}
+    average = math.fsum(speeds) / len(speeds)
+    return {"average": average, "average_error_percent": float(percent_error(average))}
+
+
+class Coalescer:
+    """Shares work between concurrent requests.
+
+    ``submit`` returns the result for one reading. A reading identical to
+    one still being computed waits on that computation instead of starting
+    its own. Least-squares readings are queued briefly and fitted in
+    groups; other fits go straight to the pool.
+    """
+
+    def __init__(self, pool, window=COALESCE_WINDOW, max_batch=COALESCE_MAX):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.in_flight = {}  # Content key -> future of its result
+        self._queue = []  # (reading, future) waiting for the next group fit
+        self._flush_handle = None
+        self.stats = {"readings": 0, "shared": 0, "fits": 0}
+
+    async def submit(self, reading, fit):
+        loop = asyncio.get_running_loop()
+        self.stats["readings"] += 1
+        key = reading_key(*reading, fit)
+        if key in self.in_flight:
+            self.stats["shared"] += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        future = loop.create_future()
+        self.in_flight[key] = future
+        future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        if fit == "least-squares":
+            self._queue.append((reading, future))
+            if len(self._queue) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+        else:
+            self.stats["fits"] += 1
+            asyncio.ensure_future(self._run(fit_readings, [reading], fit, futures=[future]))
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+        self.stats["fits"] += 1
+        readings = [reading for reading, _ in queue]
+        futures = [future for _, future in queue]
+        if sum(len(x) for x, _ in readings) <= INLINE_POINTS:
+            # Small enough that shipping it to another process would cost more than the fit
+            self._deliver(futures, lambda: fit_readings(readings))
+        else:
+            asyncio.ensure_future(self._run(fit_readings, readings, futures=futures))
+
+    async def _run(self, fn, *args, futures):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, fn, *args)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._deliver(futures, lambda: results)
+
+    def _deliver(self, futures, compute):
+        try:
+            results = compute()
+        except Exception as e:
+            results = [e] * len(futures)
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class SpeedService:
+    """The HTTP front end: a minimal HTTP/1.1 server with keep-alive."""
+
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.coalescer = Coalescer(self.pool)
+        self.requests = 0
+
+    async def handle_speed(self, body):
+        fit = body.get("fit", "least-squares")
+        if fit not in FITS:
+            raise RequestError(400, f"Unknown fit {fit!r}; use one of {', '.join(FITS)}.")
+        return await self.coalescer.submit(parse_reading(body), fit)
+
+    async def handle_batch(self, body):
+        fit = body.get("fit", "least-squares")
+        if fit not in FITS:
+            raise RequestError(400, f"Unknown fit {fit!r}; use one of {', '.join(FITS)}.")
+        readings = body.get("readings")
+        if not isinstance(readings, list) or not readings:
+            raise RequestError(400, "'readings' must be a non-empty list.")
+        parsed = [parse_reading(reading) for reading in readings]
+        results = await asyncio.gather(*(self.coalescer.submit(r, fit) for r in parsed))
+        return {"results": list(results), **summarize(results)}
+
+    async def handle_health(self, body):
+        return {"status": "ok", "requests": self.requests, **self.coalescer.stats}
+
+    ROUTES = {
+        ("POST", "/speed"): handle_speed,
+        ("POST", "/batch"): handle_batch,
+        ("GET", "/health"): handle_health,
+    }
+
+    async def dispatch(self, method, path, raw):
+        handler = self.ROUTES.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.ROUTES):
+                raise RequestError(405, f"{method} is not allowed on {path}.")
+            raise RequestError(404, f"No endpoint at {path}.")
+        body = {}
+        if raw:
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                raise RequestError(400, "The request body is not valid JSON.")
+            if not isinstance(body, dict):
+                raise RequestError(400, "The request body must be a JSON object.")
+        return await handler(self, body)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line."}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                try:
+                    length = content_length(headers)
+                except RequestError as e:
+                    # The body cannot be skipped reliably, so the connection ends here
+                    await self._respond(writer, e.status, {"error": str(e)}, False)
+                    break
+                raw = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                try:
+                    status, payload = 200, await self.dispatch(method, target.split("?")[0], raw)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve speed-of-light fits over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="processes for robust fits and large batches")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(SpeedService(args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Crash-safe session files, so readings survive the app being killed.
+
+A session directory holds one raw float64 file per column plus a journal:
+
+    x.f64, y.f64   every reading's values back to back, native byte order
+    journal.bin    8-byte header, then one 24-byte record per reading:
+                   start point, point count, CRC-32 of the reading's values,
+                   CRC-32 of the record itself
+
+A reading is written column data first, fsynced, then its journal record,
+fsynced. A reading only exists once its record is complete, so a crash at
+any moment loses at most the reading being written. Loading memory-maps
+the column files straight into a ReadingStore; there is nothing to parse.
+
+New columns are only ever added after the existing ones. A session written
+with fewer columns gets the missing ones filled with NaN (unknown) when it
+is first opened.
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from readings import ReadingStore
+
+MAGIC = b'SOLJ'
+HEADER = struct.Struct('<4sI')  # Magic, number of columns
+RECORD = struct.Struct('<qqI')  # Start, count, data CRC; followed by the CRC of these bytes
+RECORD_SIZE = RECORD.size + 4
+ITEM = np.dtype(np.float64).itemsize
+FILL_CHUNK = 1 << 16  # Values written per call when filling a new column
+
+
+def _data_crc(arrays):
+    crc = 0
+    for values in arrays:
+        crc = zlib.crc32(np.ascontiguousarray(values), crc)
+    return crc
+
+
+class Session:
+    """Append-only on-disk copy of a ReadingStore."""
+
+    def __init__(self, directory, columns=("x", "y")):
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.journal_path = os.path.join(directory, 'journal.bin')
+        self.column_paths = {name: os.path.join(directory, f'{name}.f64') for name in self.columns}
+        self._journal = None
+        self._files = {}
+        self._size = 0  # Points recorded in the journal
+
+    def exists(self):
+        """True if a journal with at least one reading is on disk (no numpy work involved)."""
+        try:
+            return os.path.getsize(self.journal_path) >= HEADER.size + RECORD_SIZE
+        except OSError:
+            return False
+
+    def load(self):
+        """Recovers the saved readings as a ReadingStore backed by memory maps.
+
+        Torn or unreadable tails (from a crash mid-write) are cut off the
+        files so later appends continue from the last complete reading.
+        """
+        starts = self._recover()
+        total = starts[-1]
+        if total == 0:
+            return ReadingStore(self.columns)
+        # Copy-on-write maps: the store may write into its buffers, the files never change
+        columns = {name: np.memmap(path, dtype=np.float64, mode='c', shape=(total,))
+                   for name, path in self.column_paths.items()}
+        return ReadingStore.from_arrays(columns, starts)
+
+    def append(self, store, indices):
+        """Saves the given readings of ``store`` (an index or a list of them)."""
+        if isinstance(indices, (int, np.integer)):
+            indices = [indices]
+        if self._journal is None:
+            self._recover()
+
+        records = []
+        for index in indices:
+            values = store.reading(index, *self.columns)
+            for name, column in zip(self.columns, values):
+                self._files[name].write(np.ascontiguousarray(column))
+            records.append((self._size, len(values[0]), _data_crc(values)))
+            self._size += len(values[0])
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The records go last: until they are on disk the values above do not count
+        for record in records:
+            body = RECORD.pack(*record)
+            self._journal.write(body + struct.pack('<I', zlib.crc32(body)))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def reset(self):
+        """Deletes every saved reading and starts an empty session.
+
+        The files are unlinked rather than truncated, so stores and snapshots
+        still mapping them keep valid (if orphaned) pages.
+        """
+        self.close()
+        for path in [self.journal_path, *self.column_paths.values()]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
+        self._recover()
+
+    def close(self):
+        for f in [self._journal, *self._files.values()]:
+            if f is not None:
+                f.close()
+        self._journal = None
+        self._files = {}
+
+    def _recover(self):
+        """Cuts every file back to the journal's last good reading; returns the CSR offsets."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.close()
+        records, stored = self._read_journal()
+        if records and stored < len(self.columns):
+            self._add_columns(records, stored)
+        starts = [0]
+        for start, count, _ in records:
+            starts.append(start + count)
+
+        with open(self.journal_path, 'ab') as f:
+            f.truncate(HEADER.size + RECORD_SIZE * len(records) if records else 0)
+        for path in self.column_paths.values():
+            with open(path, 'ab') as f:
+                f.truncate(starts[-1] * ITEM)
+        self._size = starts[-1]
+        self._open_for_append()
+        return starts
+
+    def _open_for_append(self):
+        self._journal = open(self.journal_path, 'ab')
+        if self._journal.tell() == 0:
+            self._journal.write(HEADER.pack(MAGIC, len(self.columns)))
+            self._journal.flush()
+        self._files = {name: open(path, 'ab') for name, path in self.column_paths.items()}
+
+    def _add_columns(self, records, stored):
+        """Upgrades a session written with only the first ``stored`` columns.
+
+        The new column files are written in full first; the journal is then
+        rewritten with the wider header and CRCs and swapped in atomically,
+        so a crash part way leaves the old session to be upgraded next time.
+        """
+        total = records[-1][0] + records[-1][1]
+        chunk = np.full(FILL_CHUNK, np.nan)
+        for name in self.columns[stored:]:
+            with open(self.column_paths[name], 'wb') as f:
+                for start in range(0, total, FILL_CHUNK):
+                    chunk[:min(FILL_CHUNK, total - start)].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        old = [np.memmap(self.column_paths[name], dtype=np.float64, mode='r', shape=(total,))
+               for name in self.columns[:stored]] if total else []
+        temporary = self.journal_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.columns)))
+            for start, count, _ in records:
+                values = [column[start:start + count] for column in old]
+                values += [np.full(count, np.nan)] * (len(self.columns) - stored)
+                body = RECORD.pack(start, count, _data_crc(values))
+                f.write(body + struct.pack('<I', zlib.crc32(body)))
+            f.flush()
+            os.fsync(f.fileno())
+        del old
+        os.replace(temporary, self.journal_path)
+
+    def _read_journal(self):
+        """Complete, consistent records from the start of the journal.
+
+        Returns the records, (start, count, crc) each, and how many of the
+        columns the journal was written with.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return [], len(self.columns)
+        if len(raw) < HEADER.size:
+            return [], len(self.columns)
+        magic, stored = HEADER.unpack_from(raw)
+        if magic != MAGIC or not 0 < stored <= len(self.columns):
+            return [], len(self.columns)
+        paths = [self.column_paths[name] for name in self.columns[:stored]]
+        sizes = {path: os.path.getsize(path) // ITEM if os.path.exists(path) else 0 for path in paths}
+
+        records = []
+        expected = 0
+        for position in range(HEADER.size, len(raw) - RECORD_SIZE + 1, RECORD_SIZE):
+            body = raw[position:position + RECORD.size]
+            start, count, crc = RECORD.unpack(body)
+            record_crc, = struct.unpack_from('<I', raw, position + RECORD.size)
+            if (zlib.crc32(body) != record_crc or start != expected or count < 0
+                    or any(size < start + count for size in sizes.values())):
+                break
+            records.append((start, count, crc))
+            expected = start + count
+
+        # Earlier readings were fsynced before the next record was written;
+        # only the newest one can have been cut short
+        if records:
+            start, count, crc = records[-1]
+            values = [np.fromfile(path, dtype=np.float64, count=count, offset=start * ITEM)
+                      for path in paths]
+            if _data_crc(values) != crc:
+                records.pop()
+        return records, stored
@@ -0,0 +1,66 @@
+"""Cold-start timing for the app, checked against a per-phase budget.
+
+Import this module before anything heavy so its clock starts as close to
+process launch as possible.
+"""
+import json
+import os
+import time
+
+# Seconds allowed for each phase on a mid-range arm64 phone. A phase that runs
+# over is logged as a warning and flagged in the saved history.
+BUDGET = {
+    'import': 1.5,  # Module imports, up to the App class being defined
+    'build': 0.5,  # MobileSpeedOfLightApp.build()
+    'first_frame': 1.0,  # From the end of build() to the first buffer swap
+}
+
+
+class StartupTimer:
+    """Records how long each startup phase took, in the order they finish."""
+
+    def __init__(self, budget=BUDGET):
+        self.budget = dict(budget)
+        self.phases = {}
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def mark(self, phase):
+        """Ends ``phase`` now and returns its duration in seconds."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+        return self.phases[phase]
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def over_budget(self):
+        """Phases that took longer than their budget, as {phase: (seconds, limit)}."""
+        return {
+            phase: (seconds, self.budget[phase])
+            for phase, seconds in self.phases.items()
+            if phase in self.budget and seconds > self.budget[phase]
+        }
+
+    def save(self, path):
+        """Appends this launch's timings as one JSON line to ``path``."""
+        record = {
+            'time': time.time(),
+            'phases': self.phases,
+            'total': self.total,
+            'over_budget': sorted(self.over_budget()),
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        return record
+
+
+def load_history(path):
+    """Reads every saved launch record from ``path``."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
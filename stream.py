@@ -0,0 +1,304 @@
+"""Live readings from an instrument stream, kept in a fixed-size ring buffer.
+
+The instrument sends one "wavelength frequency" pair per line (commas work
+too), in the units the app's input fields are set to (a units.Conversion;
+nm and THz by default). Sources are
+named by a short spec:
+
+    simulate              made-up readings, 2000 per second
+    simulate:5000         ... at another rate
+    serial:/dev/ttyUSB0   a serial port (needs pyserial), 115200 baud
+    serial:COM3:9600      ... at another baud rate
+    pipe:/tmp/laser       a named pipe
+    tcp:127.0.0.1:5025    a TCP socket
+    unix:/tmp/laser.sock  a Unix domain socket
+
+A StreamReader thread reads the source in chunks, parses whole chunks with
+numpy and appends the converted (λ, 1/ν) pairs to a RingBuffer. Readers
+take the latest window whenever they like. Nothing in here imports Kivy.
+"""
+import os
+import select
+import socket
+import threading
+import time
+
+import numpy as np
+
+from estimator import SPEED_OF_LIGHT, fit_weighted_flat
+from units import DEFAULT
+
+CAPACITY = 10000  # Samples the ring buffer keeps
+CHUNK_BYTES = 65536  # Read at most this much per call
+READ_TIMEOUT = 0.2  # Seconds a read waits before checking for stop
+SIMULATED_RATE = 2000  # Samples per second
+SERIAL_BAUD = 115200
+
+
+class RingBuffer:
+    """Fixed-size, thread-safe buffer of the latest (x, y) samples."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._data = np.empty((capacity, 2))
+        self._end = 0  # Next slot to write
+        self.total = 0  # Samples ever written
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def extend(self, x, y):
+        """Appends samples, overwriting the oldest once full."""
+        n = len(x)
+        if n > self.capacity:
+            x, y = x[-self.capacity:], y[-self.capacity:]
+        with self._lock:
+            # At most two runs: up to the end of the array, then from its start
+            stop = self._end + len(x)
+            first = min(stop, self.capacity) - self._end
+            self._data[self._end:self._end + first, 0] = x[:first]
+            self._data[self._end:self._end + first, 1] = y[:first]
+            rest = len(x) - first
+            self._data[:rest, 0] = x[first:]
+            self._data[:rest, 1] = y[first:]
+            self._end = stop % self.capacity
+            self.total += n
+
+    def latest(self, n=None):
+        """Copies of the newest ``n`` (default: all kept) samples as (x, y), oldest first."""
+        with self._lock:
+            n = len(self) if n is None else min(n, len(self))
+            start = self._end - n
+            if start >= 0:
+                window = self._data[start:self._end].copy()
+            else:
+                window = np.concatenate([self._data[start:], self._data[:self._end]])
+            return window[:, 0], window[:, 1], self.total
+
+    def clear(self):
+        with self._lock:
+            self._end = 0
+            self.total = 0
+
+
+class LineParser:
+    """Turns arbitrary byte chunks into (wavelength, frequency) arrays.
+
+    A line split across chunks is kept until its end arrives. Lines that are
+    not two positive numbers are counted in ``rejected`` and skipped.
+    """
+
+    def __init__(self):
+        self._partial = b''
+        self.rejected = 0
+
+    def feed(self, data):
+        data = self._partial + data
+        cut = data.rfind(b'\n') + 1
+        self._partial, data = data[cut:], data[:cut]
+        if not data:
+            return np.empty(0), np.empty(0)
+        text = data.replace(b',', b' ').replace(b'\r', b'')
+        try:
+            values = np.array(text.split(), dtype=np.float64)
+            if len(values) != 2 * text.count(b'\n'):
+                raise ValueError  # A short, long or blank line somewhere
+            values = values.reshape(-1, 2)
+        except ValueError:
+            # Something malformed in this chunk: fall back to a line at a time
+            values = self._slow(text.splitlines())
+        good = np.all(values > 0, axis=1)  # Also drops NaN
+        self.rejected += int(len(values) - good.sum())
+        values = values[good]
+        return values[:, 0], values[:, 1]
+
+    def _slow(self, lines):
+        rows = []
+        for line in lines:
+            fields = line.split()
+            if not fields:
+                continue
+            try:
+                rows.append((float(fields[0]), float(fields[1])) if len(fields) == 2 else None)
+            except ValueError:
+                rows.append(None)
+            if rows[-1] is None:
+                rows.pop()
+                self.rejected += 1
+        return np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+
+class SimulatedSource:
+    """Instrument stand-in: noisy λ, ν pairs at ``rate`` lines per second.
+
+    The lines are written in the units of ``conversion``, as a real
+    instrument set up for them would send them.
+    """
+
+    def __init__(self, rate=SIMULATED_RATE, seed=None, conversion=DEFAULT):
+        self.rate = rate
+        self.conversion = conversion
+        self._rng = np.random.default_rng(seed)
+        self._last = time.monotonic()
+
+    def read(self, size):
+        time.sleep(0.01)
+        now = time.monotonic()
+        n = min(int((now - self._last) * self.rate), size // 24)
+        if n <= 0:
+            return b''
+        self._last += n / self.rate
+        x = self._rng.uniform(400e-9, 700e-9, n)
+        y = x / SPEED_OF_LIGHT * (1 + self._rng.normal(0, 0.01, n))
+        wavelengths, seconds_column = self.conversion.to_input(x, y)
+        return ''.join(f'{w:.7g} {s:.7g}\n' for w, s in zip(wavelengths, seconds_column)).encode()
+
+    def close(self):
+        pass
+
+
+class FileSource:
+    """A named pipe read without blocking past the timeout; writers may come and go."""
+
+    def __init__(self, path):
+        self._fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    def read(self, size):
+        ready, _, _ = select.select([self._fd], [], [], READ_TIMEOUT)
+        if not ready:
+            return b''
+        try:
+            data = os.read(self._fd, size)
+        except BlockingIOError:
+            return b''
+        if not data:
+            # No writer at the moment (not started yet, or restarting): wait for the next one
+            time.sleep(READ_TIMEOUT)
+        return data
+
+    def close(self):
+        os.close(self._fd)
+
+
+class SocketSource:
+    """A connected TCP or Unix domain socket."""
+
+    def __init__(self, family, address):
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(5)
+        self._socket.connect(address)
+        self._socket.settimeout(READ_TIMEOUT)
+
+    def read(self, size):
+        try:
+            data = self._socket.recv(size)
+        except socket.timeout:
+            return b''
+        if not data:
+            raise EOFError('The instrument closed the connection.')
+        return data
+
+    def close(self):
+        self._socket.close()
+
+
+class SerialSource:
+    """A serial port through pyserial, which is only needed for this source."""
+
+    def __init__(self, port, baud=SERIAL_BAUD):
+        try:
+            import serial
+        except ImportError:
+            raise ValueError('Reading a serial port needs the pyserial package.')
+        self._port = serial.Serial(port, baud, timeout=READ_TIMEOUT)
+
+    def read(self, size):
+        return self._port.read(min(max(self._port.in_waiting, 1), size))
+
+    def close(self):
+        self._port.close()
+
+
+def open_source(spec, conversion=DEFAULT):
+    """Opens the source named by ``spec`` (see the module docstring).
+
+    ``conversion`` only matters to the simulated source, which sends its
+    lines in those units; real instruments send whatever they are set to.
+    """
+    kind, _, target = spec.strip().partition(':')
+    kind = kind.lower()
+    if kind == 'simulate':
+        return SimulatedSource(float(target) if target else SIMULATED_RATE, conversion=conversion)
+    if kind == 'serial':
+        port, _, baud = target.rpartition(':')
+        if not baud.isdigit():
+            port, baud = target, SERIAL_BAUD
+        return SerialSource(port, int(baud))
+    if kind == 'pipe':
+        return FileSource(target)
+    if kind == 'tcp':
+        host, _, port = target.rpartition(':')
+        if not port.isdigit():
+            raise ValueError(f'Expected tcp:HOST:PORT, got {spec!r}.')
+        return SocketSource(socket.AF_INET, (host or '127.0.0.1', int(port)))
+    if kind == 'unix':
+        return SocketSource(socket.AF_UNIX, target)
+    raise ValueError(f'Unknown stream source {spec!r}; use simulate, serial:, pipe:, tcp: or unix:.')
+
+
+class StreamReader:
+    """Background thread moving samples from a source into a RingBuffer.
+
+    ``error`` holds whatever ended the stream early (a closed connection,
+    an unplugged port); the owner checks it when it next refreshes.
+    """
+
+    def __init__(self, source, buffer, conversion=DEFAULT):
+        self.source = source
+        self.buffer = buffer
+        self.conversion = conversion
+        self.parser = LineParser()
+        self.error = None
+        self._stop = threading.Event()
+        self._rate = (time.monotonic(), 0)  # (time, buffer total) at the last rate query
+        self._thread = threading.Thread(target=self._run, name='stream-reader', daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def rate(self):
+        """Samples per second since the previous call."""
+        now, total = time.monotonic(), self.buffer.total
+        then, before = self._rate
+        self._rate = (now, total)
+        return (total - before) / (now - then) if now > then else 0.0
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait:
+            self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                data = self.source.read(CHUNK_BYTES)
+                if data:
+                    wavelengths, frequencies = self.parser.feed(data)
+                    if len(wavelengths):
+                        # The parsed arrays are ours: convert them where they are
+                        self.buffer.extend(*self.conversion.apply(
+                            wavelengths, frequencies, out=(wavelengths, frequencies)))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.source.close()
+
+
+def rolling_fit(buffer, window=None):
+    """Fit of the newest ``window`` samples: (x, y, total, fits) with one-reading WeightedFits."""
+    x, y, total = buffer.latest(window)
+    fits = fit_weighted_flat(x, y, np.array([0, len(x)]))
+    return x, y, total, fits
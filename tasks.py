@@ -0,0 +1,132 @@
+"""Background execution of fitting and rendering jobs for the Kivy app."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+
+class Cancelled(Exception):
+    """Raised by CancelToken.check in a job that has been superseded."""
+
+
+class CancelToken:
+    """Tells a running job whether its result is still wanted."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        """Raises Cancelled once the job has been superseded or cancelled."""
+        if self._event.is_set():
+            raise Cancelled()
+
+
+class TaskScheduler:
+    """Runs keyed jobs on a thread pool and delivers results on the Kivy clock.
+
+    At most one job per key runs at a time. Submitting while a job with the
+    same key is running queues the new one, replacing anything already queued,
+    so rapid repeated presses collapse into a single follow-up run. A job
+    whose key was resubmitted or cancelled while it ran is stale: its result
+    is dropped instead of being delivered.
+
+    Jobs submitted with ``cancellable=True`` also get a ``token`` keyword, a
+    CancelToken that turns stale at the same moment. Long jobs call
+    ``token.check()`` between their stages, so superseded work stops at the
+    next check instead of holding a worker until it finishes.
+    """
+
+    def __init__(self, max_workers=2, on_busy=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='worker')
+        self._lock = threading.Lock()
+        self._generation = {}  # key -> number of the newest submission
+        self._running = {}  # key -> generation of the job on the pool
+        self._queued = {}  # key -> job waiting for the running one to finish
+        self._tokens = {}  # key -> CancelToken of the running job
+        self.on_busy = on_busy  # Called on the UI thread with True/False
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def is_active(self, key):
+        """True while a job for ``key`` is running or queued."""
+        return key in self._running or key in self._queued
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, cancellable=False):
+        """Schedules ``fn(*args)``; ``on_done(result)`` runs on the UI thread if still current.
+
+        With ``cancellable`` the call is ``fn(*args, token=CancelToken)``.
+        """
+        with self._lock:
+            generation = self._generation.get(key, 0) + 1
+            self._generation[key] = generation
+            job = (generation, fn, args, on_done, on_error, cancellable)
+            if key in self._running:
+                self._queued[key] = job
+                self._tokens[key].cancel()
+                return
+            self._start(key, job)
+        self._notify_busy()
+
+    def cancel(self, key):
+        """Drops the queued job for ``key`` and stops or discards the running one."""
+        with self._lock:
+            self._generation[key] = self._generation.get(key, 0) + 1
+            self._queued.pop(key, None)
+            if key in self._tokens:
+                self._tokens[key].cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, key, job):
+        # Called with the lock held
+        generation, fn, args, on_done, on_error, cancellable = job
+        token = self._tokens[key] = CancelToken()
+        self._running[key] = generation
+        if cancellable:
+            future = self._executor.submit(fn, *args, token=token)
+        else:
+            future = self._executor.submit(fn, *args)
+        future.add_done_callback(
+            lambda future: Clock.schedule_once(lambda dt: self._deliver(key, job, future))
+        )
+
+    def _deliver(self, key, job, future):
+        generation, fn, args, on_done, on_error, cancellable = job
+        with self._lock:
+            current = self._generation.get(key) == generation
+        try:
+            error = future.exception()
+            if not current or isinstance(error, Cancelled):
+                pass  # Superseded while running
+            elif error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    Logger.exception(f"Tasks: {key} job failed", exc_info=error)
+            elif on_done is not None:
+                on_done(future.result())
+        finally:
+            # The next job only starts once this result has been consumed, so a
+            # job may hand back buffers that the following run will overwrite.
+            with self._lock:
+                del self._running[key]
+                del self._tokens[key]
+                queued = self._queued.pop(key, None)
+                if queued is not None:
+                    self._start(key, queued)
+            self._notify_busy()
+
+    def _notify_busy(self):
+        if self.on_busy is not None:
+            self.on_busy(self.busy)
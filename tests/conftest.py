@@ -0,0 +1,15 @@
+"""The app's modules live at the top of the repository, not in a package.
+
+Kivy is configured for an offscreen window before anything imports it, the
+same way bench.py runs the app headless.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_FILELOG', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('MPLBACKEND', 'Agg')
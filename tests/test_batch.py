@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from batch import FIELDS, SummaryWriter, analyse_file, find_files, run
+
+C_NM_THZ = 299792.458  # c in nm·THz
+
+
+def write_reading_file(path, readings):
+    rows = [f"{w},{C_NM_THZ / w * scale},{i}" for i, (wavelengths, scale) in enumerate(readings)
+            for w in wavelengths]
+    path.write_text("\n".join(rows) + "\n")
+
+
+def test_analyse_file_rows(tmp_path):
+    path = tmp_path / "run.csv"
+    write_reading_file(path, [([400, 500, 600], 1.0), ([450, 650], 1.0), ([500], 1.0)])
+    rows = analyse_file(str(path))
+    assert [row["reading"] for row in rows] == [1, 2, 3, "all"]
+    assert [row["points"] for row in rows] == [3, 2, 1, 6]
+    assert rows[0]["speed"] == pytest.approx(2.99792458e8, rel=1e-9)
+    assert rows[2]["speed"] is None and rows[2]["status"] == "needs two distinct wavelengths"
+    assert rows[3]["speed"] == pytest.approx(np.mean([rows[0]["speed"], rows[1]["speed"]]))
+
+
+def test_analyse_file_reports_a_bad_file(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("400,749\n500,abc\n")
+    (row,) = analyse_file(str(path))
+    assert row["reading"] == "all" and row["status"].startswith("error:")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "json"])
+def test_summary_writer(fmt):
+    rows = [{field: i for field in FIELDS} for i in range(3)]
+    stream = io.StringIO()
+    writer = SummaryWriter(stream, fmt)
+    writer.write(rows[:2])
+    writer.write(rows[2:])
+    writer.close()
+    if fmt == "csv":
+        read = [{k: int(v) for k, v in row.items()} for row in csv.DictReader(io.StringIO(stream.getvalue()))]
+    else:
+        read = json.loads(stream.getvalue())
+    assert read == rows
+
+
+def test_run_walks_directories(tmp_path):
+    (tmp_path / "lab" / "sub").mkdir(parents=True)
+    write_reading_file(tmp_path / "lab" / "a.csv", [([400, 600], 1.0)])
+    write_reading_file(tmp_path / "lab" / "sub" / "b.txt", [([400, 600], 1.0)])
+    (tmp_path / "lab" / "notes.md").write_text("not data")
+    assert find_files([str(tmp_path / "lab")]) == [str(tmp_path / "lab" / "a.csv"),
+                                                   str(tmp_path / "lab" / "sub" / "b.txt")]
+    output = tmp_path / "summary.json"
+    assert run([str(tmp_path / "lab")], str(output), workers=1) == 2
+    assert len(json.loads(output.read_text())) == 4
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from estimator import (RunningFit, fit_flat, fit_shared_slope_flat, fit_weighted_flat,
+                       ragged_to_flat)
+
+
+def make_readings(lengths, seed=0):
+    """Noisy λ (m) against 1/ν (s) readings, one per length."""
+    rng = np.random.default_rng(seed)
+    xs, ys = [], []
+    for n in lengths:
+        x = rng.uniform(400e-9, 700e-9, n)
+        xs.append(x)
+        ys.append(x / 2.998e8 * (1 + rng.normal(0, 0.01, n)) + rng.normal(0, 1e-18))
+    return xs, ys
+
+
+def test_fit_flat_matches_polyfit():
+    xs, ys = make_readings([2, 5, 50, 1000])
+    fits = fit_flat(*ragged_to_flat(xs, ys))
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        slope, intercept = np.polyfit(x, y, 1)
+        assert fits.slopes[i] == pytest.approx(slope, rel=1e-9)
+        assert fits.intercepts[i] == pytest.approx(intercept, rel=1e-6, abs=1e-24)
+        assert fits.speeds[i] == pytest.approx(1 / slope, rel=1e-9)
+
+
+def test_fit_flat_gives_nan_without_a_line():
+    x, y, offsets = ragged_to_flat([[5e-7], [], [4e-7, 4e-7]], [[1e-15], [], [1e-15, 2e-15]])
+    assert np.isnan(fit_flat(x, y, offsets).slopes).all()
+
+
+def test_running_fit_merge_matches_batch():
+    (x,), (y,) = make_readings([300], seed=1)
+    batch = RunningFit.from_arrays(x, y)
+    merged = RunningFit.from_arrays(x[:100], y[:100])
+    other = RunningFit()
+    for xi, yi in zip(x[100:], y[100:]):
+        other.add(xi, yi)
+    merged.merge(other)
+    assert merged.n == batch.n
+    assert merged.slope == pytest.approx(batch.slope, rel=1e-10)
+    assert merged.speed_error == pytest.approx(batch.speed_error, rel=1e-8)
+    assert merged.slope == pytest.approx(np.polyfit(x, y, 1)[0], rel=1e-9)
+
+
+def test_weighted_fit_matches_polyfit_with_weights():
+    (x,), (y,) = make_readings([40], seed=2)
+    sigma_y = np.linspace(1, 3, 40) * 1e-18
+    fit = fit_weighted_flat(x, y, [0, 40], sigma_y=sigma_y)
+    assert fit.weighted[0]
+    assert fit.slopes[0] == pytest.approx(np.polyfit(x, y, 1, w=1 / sigma_y)[0], rel=1e-9)
+
+
+def test_weighted_fit_uses_a_frequency_tolerance_without_a_wavelength_one():
+    # A blank wavelength field is stored as NaN; σy alone must still weight the fit
+    (x,), (y,) = make_readings([20], seed=3)
+    sigma_y = np.full(20, 2e-18)
+    fit = fit_weighted_flat(x, y, [0, 20], np.full(20, np.nan), sigma_y)
+    assert fit.weighted[0]
+    assert np.isfinite(fit.chi2_dof[0])
+    # The mirror case: only σx known
+    fit = fit_weighted_flat(x, y, [0, 20], np.full(20, 1e-10), np.full(20, np.nan))
+    assert fit.weighted[0]
+    # Neither known: unweighted, with the scatter setting the error
+    fit = fit_weighted_flat(x, y, [0, 20], np.full(20, np.nan), np.full(20, np.nan))
+    assert not fit.weighted[0]
+    assert np.isnan(fit.chi2_dof[0])
+
+
+def test_shared_slope_matches_dense_least_squares():
+    xs, ys = make_readings([5, 8, 13], seed=4)
+    ys = [y + offset for y, offset in zip(ys, (0, 3e-17, -2e-17))]
+    x, y, offsets = ragged_to_flat(xs, ys)
+    fit = fit_shared_slope_flat(x, y, offsets)
+
+    design = np.zeros((len(x), 4))
+    design[:, 0] = x
+    for i in range(3):
+        design[offsets[i]:offsets[i + 1], i + 1] = 1
+    scale = np.abs(design).max(axis=0)
+    solution = np.linalg.lstsq(design / scale, y, rcond=None)[0] / scale
+    assert fit.slope == pytest.approx(solution[0], rel=1e-8)
+    np.testing.assert_allclose(fit.intercepts, solution[1:], rtol=1e-6, atol=1e-24)
+
+
+def test_shared_slope_stays_weighted_with_one_sided_uncertainties():
+    xs, ys = make_readings([6, 6], seed=5)
+    x, y, offsets = ragged_to_flat(xs, ys)
+    fit = fit_shared_slope_flat(x, y, offsets, np.full(12, np.nan), np.full(12, 2e-18))
+    assert fit.weighted
+    assert np.isfinite(fit.chi2_dof)
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from history import History
+from readings import ReadingStore
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History(str(tmp_path / 'history.sqlite'))
+    yield history
+    history.close()
+
+
+def make_store(*wavelength_ranges):
+    store = ReadingStore()
+    for low, high in wavelength_ranges:
+        x = np.linspace(low, high, 4) * 1e-9
+        store.append(x, x / 3e8)
+    return store
+
+
+def test_aggregate_over_sessions_and_bands(history):
+    first, second = history.begin_session(), history.begin_session()
+    history.add_readings(first, make_store((400, 500), (550, 650)), [0, 1])
+    history.record_fits(first, [2.9e8, 3.1e8], [1e6, 2e6], 'least-squares')
+    history.add_readings(second, make_store((600, 700)), [0])
+    history.record_fits(second, [3.0e8], method='least-squares')  # No error: unweighted
+    history.flush()
+
+    everything = history.aggregate()
+    assert (everything.readings, everything.points) == (3, 12)
+    assert everything.mean == pytest.approx(3.0e8)
+    assert (everything.minimum, everything.maximum) == (2.9e8, 3.1e8)
+    weights = np.array([1e-12, 0.25e-12])
+    assert everything.weighted_mean == pytest.approx(np.dot(weights, [2.9e8, 3.1e8]) / weights.sum())
+    assert everything.weighted_error == pytest.approx(weights.sum() ** -0.5)
+
+    assert history.aggregate(session_id=second).readings == 1
+    assert math.isnan(history.aggregate(session_id=second).weighted_mean)
+    assert history.aggregate(wavelength=(590, 610)).readings == 2
+    assert history.aggregate(wavelength=(450, 460)).mean == pytest.approx(2.9e8)
+    assert history.aggregate(since=0, until=1).readings == 0
+    assert sorted((row[0], row[2]) for row in history.by_session()) == [(first, 2), (second, 1)]
+
+
+def test_readings_are_stored_once_with_their_samples(history):
+    session = history.begin_session()
+    store = make_store((400, 700))
+    history.add_readings(session, store, [0])
+    history.add_readings(session, store, [0])  # Already recorded: ignored
+    assert history.stored_readings(session) == 1
+    samples = history.samples(session, 0)
+    np.testing.assert_array_equal(samples['x'], store.reading(0)[0])
+    with pytest.raises(KeyError):
+        history.samples(session, 1)
+    assert math.isnan(history.aggregate().mean)  # Not fitted yet
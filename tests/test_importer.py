@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from importer import import_file, parse_values
+from readings import ReadingStore
+from units import DEFAULT
+
+ROWS = np.array([[400.0, 749.48, 1], [500.0, 599.58, 1], [600.0, 499.65, 2],
+                 [650.0, 461.22, 2], [700.0, 428.27, 3]])
+
+
+def expected(rows):
+    return DEFAULT.apply(rows[:, 0], rows[:, 1])
+
+
+def test_parse_values():
+    np.testing.assert_array_equal(parse_values(" 1 2.5\t3e2 "), [1, 2.5, 300])
+    with pytest.raises(ValueError):
+        parse_values("1 two")
+
+
+def test_csv_with_header_and_comments(tmp_path):
+    path = tmp_path / "data.csv"
+    lines = ["# spectrometer export", "wavelength,frequency"]
+    lines += [f"{w},{f}" for w, f, _ in ROWS]
+    path.write_text("\n".join(lines) + "\n")
+    store = ReadingStore()
+    assert import_file(store, str(path)) == [0]
+    x, y = expected(ROWS)
+    np.testing.assert_allclose(store.column("x"), x)
+    np.testing.assert_allclose(store.column("y"), y)
+
+
+def test_reading_column_splits_readings_across_chunks(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("".join(f"{w} {f} {i:g}\n" for w, f, i in ROWS))
+    store = ReadingStore()
+    store.append([1.0], [1.0])
+    assert import_file(store, str(path), chunk_rows=2) == [1, 2, 3]
+    np.testing.assert_array_equal(store.lengths, [1, 2, 2, 1])
+    np.testing.assert_allclose(store.column("x")[1:], expected(ROWS)[0])
+
+
+@pytest.mark.parametrize("suffix", [".npy", ".f64"])
+def test_binary_formats(tmp_path, suffix):
+    path = tmp_path / f"data{suffix}"
+    if suffix == ".npy":
+        np.save(path, ROWS)
+    else:
+        ROWS[:, :2].astype("<f8").tofile(path)
+    store = ReadingStore(("x", "y", "sx", "sy"))
+    import_file(store, str(path), chunk_rows=2)
+    assert len(store) == (3 if suffix == ".npy" else 1)
+    np.testing.assert_allclose(store.column("y"), expected(ROWS)[1])
+    assert np.isnan(store.column("sx")).all()
+
+
+def test_invalid_row_rolls_back_the_import(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("400,749\n500,599\n600,-1\n")
+    store = ReadingStore()
+    store.append([1.0], [2.0])
+    with pytest.raises(ValueError):
+        import_file(store, str(path), chunk_rows=2)
+    assert len(store) == 1 and store.total == 1
+
+    path.write_text("400,749\n500,abc\n")
+    with pytest.raises(ValueError):
+        import_file(store, str(path))
+    assert len(store) == 1
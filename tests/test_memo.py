@@ -0,0 +1,45 @@
+import numpy as np
+
+from memo import ContentCache, ReadingDigests, digest
+from readings import ReadingStore
+
+
+def test_digest_tells_parts_apart():
+    a = np.array([1.0, 2.0])
+    assert digest("fit", a) == digest("fit", a.copy())
+    assert digest("fit", a) != digest("fit", a.astype(np.float32))
+    assert digest("fit", a) != digest("fit", a.reshape(2, 1))
+    assert digest(b"ab", b"c") != digest(b"a", b"bc")
+    assert digest(1) != digest("1")
+
+
+def test_cache_evicts_least_recently_used_within_its_budget():
+    cache = ContentCache(max_bytes=300)
+    for key in "abc":
+        cache.put(key, key, nbytes=100)
+    assert cache.get("a") == "a"  # b is now the oldest
+    cache.put("d", "d", nbytes=100)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert cache.nbytes == 300 and len(cache) == 3
+    cache.put("a", "A", nbytes=50)  # Replacing an entry frees its old size
+    assert cache.nbytes == 250 and cache.get("a") == "A"
+    cache.put("huge", "x", nbytes=301)
+    assert cache.get("huge") is None and len(cache) == 3
+    assert cache.hits == 5 and cache.misses == 2
+
+
+def test_reading_digests_follow_the_store():
+    store = ReadingStore()
+    digests = ReadingDigests()
+    store.append([1.0, 2.0], [3.0, 4.0])
+    store.append([5.0], [6.0])
+    first = digests.keys(store)
+    snapshot = store.snapshot()
+    store.extend([7.0], [8.0])
+    second = digests.keys(store)
+    assert second[0] == first[0] and second[1] != first[1]
+    assert digests.keys(snapshot) == first  # A snapshot still gets its own contents' digests
+    store.truncate(1)
+    store.append([5.0], [6.0])
+    assert digests.keys(store) == first
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from readings import ReadingStore
+
+
+def test_append_and_extend_pack_readings_contiguously():
+    store = ReadingStore(capacity=2)
+    store.append([1.0, 2.0], [3.0, 4.0])
+    store.append([5.0], [6.0])
+    store.extend([7.0, 8.0], [9.0, 10.0])  # Grows past the initial capacity
+    assert len(store) == 2 and store.total == 5
+    np.testing.assert_array_equal(store.offsets, [0, 2, 5])
+    np.testing.assert_array_equal(store.lengths, [2, 3])
+    x, y = store.reading(-1)
+    np.testing.assert_array_equal(x, [5.0, 7.0, 8.0])
+    np.testing.assert_array_equal(y, [6.0, 9.0, 10.0])
+    np.testing.assert_array_equal(store.flat("y")[0], [3.0, 4.0, 6.0, 9.0, 10.0])
+
+
+def test_rejects_mismatched_columns():
+    store = ReadingStore()
+    with pytest.raises(IndexError):
+        store.extend([1.0], [2.0])
+    store.append([1.0], [2.0])
+    with pytest.raises(ValueError):
+        store.extend([1.0, 2.0], [3.0])
+    with pytest.raises(ValueError):
+        store.extend([1.0])
+    with pytest.raises(IndexError):
+        store.reading(1)
+
+
+def test_snapshot_survives_clear():
+    store = ReadingStore()
+    store.append([1.0, 2.0], [3.0, 4.0])
+    snapshot = store.snapshot()
+    store.clear()
+    store.append([9.0, 9.0], [9.0, 9.0])
+    np.testing.assert_array_equal(snapshot.flat()[0], [1.0, 2.0])
+
+
+def test_snapshot_survives_truncate():
+    store = ReadingStore()
+    store.append([1.0], [2.0])
+    store.append([3.0], [4.0])
+    snapshot = store.snapshot()
+    store.truncate(1)
+    store.append([7.0], [8.0])
+    np.testing.assert_array_equal(snapshot.flat()[0], [1.0, 3.0])
+    np.testing.assert_array_equal(store.flat()[0], [1.0, 7.0])
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import robust
+from robust import robust_fit_flat, theil_sen_slope
+
+
+def brute_force_median(x, y):
+    first, second = np.triu_indices(len(x), 1)
+    dx = x[second] - x[first]
+    keep = dx != 0
+    return np.median((y[second] - y[first])[keep] / dx[keep])
+
+
+@pytest.mark.parametrize("n", [2, 7, 40, 301])
+def test_theil_sen_matches_the_median_of_all_pair_slopes(n):
+    rng = np.random.default_rng(n)
+    x = rng.uniform(400e-9, 700e-9, n)
+    y = x / 2.998e8 * (1 + rng.normal(0, 0.01, n))
+    assert theil_sen_slope(x, y) == pytest.approx(brute_force_median(x, y), rel=1e-12)
+
+
+def test_theil_sen_selection_matches_listing(monkeypatch):
+    # Force the randomized selection path on a size the brute force can still check
+    monkeypatch.setattr(robust, "ENUMERATE_PAIRS", 100)
+    rng = np.random.default_rng(3)
+    x = np.round(rng.uniform(400, 700, 800)) * 1e-9  # Some tied wavelengths too
+    y = x / 2.998e8 * (1 + rng.normal(0, 0.01, 800))
+    assert theil_sen_slope(x, y, seed=4) == pytest.approx(brute_force_median(x, y), rel=1e-12)
+
+
+def test_robust_fit_flags_an_outlier():
+    x = np.linspace(400e-9, 700e-9, 20)
+    y = x / 2.998e8
+    y[7] *= 1.5
+    fit, = robust_fit_flat(x, y, [0, 20], "theil-sen")
+    assert fit.speed == pytest.approx(2.998e8, rel=1e-9)
+    assert np.flatnonzero(fit.outliers).tolist() == [7]
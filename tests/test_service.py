@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from service import MAX_BODY, Coalescer, RequestError, content_length, parse_reading
+
+
+def reading(wavelengths, frequencies):
+    return {"wavelength_nm": wavelengths, "frequency_thz": frequencies}
+
+
+def test_parse_reading_converts_to_si():
+    x, y = parse_reading(reading([400, 500], [749.48, 599.58]))
+    np.testing.assert_allclose(x, [4e-7, 5e-7])
+    np.testing.assert_allclose(y, [1 / 749.48e12, 1 / 599.58e12])
+
+
+@pytest.mark.parametrize("values", [[400, -1], [400, 0], [400, float("nan")], [400, float("inf")]])
+def test_parse_reading_rejects_invalid_values(values):
+    with pytest.raises(RequestError) as e:
+        parse_reading(reading(values, [700, 600]))
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize("body", [{}, reading("abc", [1]), reading([1, 2], [1]), reading([[1]], [[1]])])
+def test_parse_reading_rejects_malformed(body):
+    with pytest.raises(RequestError) as e:
+        parse_reading(body)
+    assert e.value.status == 400
+
+
+def test_content_length():
+    assert content_length({}) == 0
+    assert content_length({"content-length": " 12 "}) == 12
+    for value in ("-1", "1.5", "abc", "١٢"):
+        with pytest.raises(RequestError) as e:
+            content_length({"content-length": value})
+        assert e.value.status == 400
+    with pytest.raises(RequestError) as e:
+        content_length({"content-length": str(MAX_BODY + 1)})
+    assert e.value.status == 413
+
+
+def test_coalescer_shares_identical_readings_and_groups_fits():
+    a = parse_reading(reading([400, 500, 600], [749.48, 599.58, 499.65]))
+    b = parse_reading(reading([450, 650], [666.2, 461.2]))
+
+    async def run():
+        coalescer = Coalescer(pool=None)  # Small least-squares groups never reach the pool
+        results = await asyncio.gather(*(coalescer.submit(r, "least-squares") for r in (a, a, b)))
+        return coalescer, results
+
+    coalescer, results = asyncio.run(run())
+    assert coalescer.stats == {"readings": 3, "shared": 1, "fits": 1}
+    assert coalescer.in_flight == {}
+    assert results[0] == results[1]
+    assert results[0]["points"] == 3 and results[2]["points"] == 2
+    assert results[0]["speed"] == pytest.approx(2.998e8, rel=1e-3)
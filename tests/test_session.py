@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+
+from readings import ReadingStore
+from session import HEADER, RECORD_SIZE, Session
+
+
+def saved_session(directory, readings):
+    store = ReadingStore(("x", "y"))
+    for x, y in readings:
+        store.append(x, y)
+    session = Session(directory, ("x", "y"))
+    session.append(store, list(range(len(store))))
+    session.close()
+    return session
+
+
+def test_load_round_trips(tmp_path):
+    saved_session(tmp_path, [([1.0, 2.0], [3.0, 4.0]), ([5.0], [6.0])])
+    store = Session(tmp_path, ("x", "y")).load()
+    assert len(store) == 2
+    np.testing.assert_array_equal(store.reading(0)[0], [1.0, 2.0])
+    np.testing.assert_array_equal(store.reading(1)[1], [6.0])
+
+
+def test_torn_journal_record_is_cut_off(tmp_path):
+    session = saved_session(tmp_path, [([1.0, 2.0], [3.0, 4.0]), ([5.0], [6.0])])
+    with open(session.journal_path, "r+b") as f:
+        f.truncate(HEADER.size + RECORD_SIZE + RECORD_SIZE // 2)  # Crash mid-record
+
+    reopened = Session(tmp_path, ("x", "y"))
+    store = reopened.load()
+    assert len(store) == 1
+    np.testing.assert_array_equal(store.reading(0)[1], [3.0, 4.0])
+    assert os.path.getsize(reopened.column_paths["x"]) == 2 * 8  # Torn values cut too
+
+    # Appends carry on from the last complete reading
+    more = ReadingStore(("x", "y"))
+    more.append([7.0], [8.0])
+    reopened.append(more, 0)
+    reopened.close()
+    store = Session(tmp_path, ("x", "y")).load()
+    assert len(store) == 2
+    np.testing.assert_array_equal(store.reading(1)[0], [7.0])
+
+
+def test_torn_column_data_drops_the_reading(tmp_path):
+    session = saved_session(tmp_path, [([1.0], [2.0]), ([3.0, 4.0], [5.0, 6.0])])
+    with open(session.column_paths["y"], "r+b") as f:
+        f.seek(2 * 8)
+        f.write(np.float64(9.0).tobytes())  # Value changed behind the journal's CRC
+    store = Session(tmp_path, ("x", "y")).load()
+    assert len(store) == 1
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+from startup import StartupTimer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports main and builds the app in a fresh process, so the import phase is a real cold start
+COLD_START = '''
+import json, sys
+import main
+app = main.MobileSpeedOfLightApp()
+app.build()
+timer = main.startup_timer
+print(json.dumps({"phases": timer.phases, "over_budget": timer.over_budget(),
+                  "deferred": [name for name in ("numpy", "matplotlib") if name in sys.modules]}))
+'''
+
+
+def test_over_budget_names_the_slow_phases():
+    timer = StartupTimer(budget={'import': 1.0, 'build': 0.5})
+    timer.phases = {'import': 0.4, 'build': 0.7, 'other': 9.0}
+    assert timer.over_budget() == {'build': (0.7, 0.5)}
+
+
+def test_cold_start_stays_within_budget():
+    result = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, env=dict(os.environ),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert set(report['phases']) == {'import', 'build'}
+    assert report['over_budget'] == {}
+    assert report['deferred'] == []  # numpy and matplotlib stay out of the cold start
@@ -0,0 +1,47 @@
+import numpy as np
+
+from stream import LineParser, RingBuffer, rolling_fit
+
+
+def test_ring_buffer_keeps_the_newest_samples_in_order():
+    buffer = RingBuffer(capacity=5)
+    buffer.extend(np.arange(3.0), -np.arange(3.0))
+    buffer.extend(np.arange(3.0, 7.0), -np.arange(3.0, 7.0))  # Wraps around
+    x, y, total = buffer.latest()
+    np.testing.assert_array_equal(x, [2, 3, 4, 5, 6])
+    np.testing.assert_array_equal(y, -x)
+    assert total == 7 and len(buffer) == 5
+    np.testing.assert_array_equal(buffer.latest(2)[0], [5, 6])
+
+    buffer.extend(np.arange(10.0, 22.0), np.zeros(12))  # More than it holds
+    np.testing.assert_array_equal(buffer.latest()[0], np.arange(17.0, 22.0))
+    assert buffer.total == 19
+    buffer.clear()
+    assert len(buffer) == 0 and len(buffer.latest()[0]) == 0
+
+
+def test_line_parser_joins_lines_split_across_chunks():
+    parser = LineParser()
+    x, y = parser.feed(b'400 749.5\n500,59')
+    np.testing.assert_array_equal(x, [400])
+    x, y = parser.feed(b'9.6\r\n600 499.7\n')
+    np.testing.assert_array_equal(x, [500, 600])
+    np.testing.assert_array_equal(y, [599.6, 499.7])
+    assert parser.rejected == 0
+
+
+def test_line_parser_skips_bad_lines():
+    parser = LineParser()
+    x, y = parser.feed(b'400 749.5\nabc 1\n\n-5 3\n500 nan\n1 2 3\n600 499.7\n')
+    np.testing.assert_array_equal(x, [400, 600])
+    assert parser.rejected == 4
+
+
+def test_rolling_fit_uses_the_newest_window():
+    buffer = RingBuffer(capacity=100)
+    x = np.linspace(400e-9, 700e-9, 50)
+    buffer.extend(x, x / 1e8)  # An old run at the wrong speed
+    buffer.extend(x, x / 3e8)
+    _, _, total, fits = rolling_fit(buffer, window=50)
+    assert total == 100
+    assert abs(fits.speeds[0] / 3e8 - 1) < 1e-9
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from kivy.clock import Clock
+import pytest
+
+from tasks import CancelToken, Cancelled, TaskScheduler
+
+
+def settle(scheduler, timeout=5):
+    """Ticks the Kivy clock until every job has been delivered."""
+    deadline = time.monotonic() + timeout
+    while scheduler.busy:
+        assert time.monotonic() < deadline, 'jobs never finished'
+        Clock.tick()
+        time.sleep(0.001)
+
+
+def test_resubmitting_drops_the_stale_result_and_keeps_only_the_newest():
+    scheduler = TaskScheduler()
+    release = threading.Event()
+    runs, results = [], []
+
+    def job(value):
+        runs.append(value)
+        if value == 1:
+            release.wait(5)
+        return value
+
+    for value in (1, 2, 3):
+        scheduler.submit('fit', job, value, on_done=results.append)
+    assert scheduler.is_active('fit')
+    release.set()
+    settle(scheduler)
+    scheduler.shutdown()
+    assert runs == [1, 3]  # 2 was replaced in the queue before it could start
+    assert results == [3]  # 1 finished after being superseded
+    assert not scheduler.is_active('fit')
+
+
+def test_cancel_stops_a_cancellable_job_at_its_next_check():
+    scheduler = TaskScheduler()
+    started = threading.Event()
+    stages, results, errors = [], [], []
+
+    def job(token):
+        started.set()
+        for stage in range(500):
+            token.check()
+            stages.append(stage)
+            time.sleep(0.001)
+        return 'finished'
+
+    scheduler.submit('export', job, on_done=results.append, on_error=errors.append, cancellable=True)
+    assert started.wait(5)
+    scheduler.cancel('export')
+    settle(scheduler)
+    scheduler.shutdown()
+    assert results == [] and errors == []
+    assert len(stages) < 500
+
+
+def test_errors_reach_on_error():
+    scheduler = TaskScheduler()
+    errors = []
+
+    def job():
+        raise ValueError('bad reading')
+
+    scheduler.submit('fit', job, on_error=errors.append)
+    settle(scheduler)
+    scheduler.shutdown()
+    assert [str(e) for e in errors] == ['bad reading']
+
+
+def test_cancel_token():
+    token = CancelToken()
+    token.check()
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(Cancelled):
+        token.check()
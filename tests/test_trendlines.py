@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from trendlines import fit_trendlines, trendline_curves
+
+
+def test_every_degree_matches_polyfit():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(400e-9, 700e-9, 30)
+    y = x / 2.998e8 + 1e3 * (x - 5.5e-7) ** 2 + rng.normal(0, 1e-18, 30)
+    trends = fit_trendlines(x, y)
+    x_grid, curves = trendline_curves(trends)
+    for i, degree in enumerate(trends.degrees):
+        coefficients = np.polyfit(x, y, degree)
+        rss = np.sum((y - np.polyval(coefficients, x)) ** 2)
+        assert trends.rss[i] == pytest.approx(rss, rel=1e-6)
+        np.testing.assert_allclose(curves[i], np.polyval(coefficients, x_grid), rtol=1e-8)
+    assert x_grid[0] == x.min() and x_grid[-1] == x.max()
+
+
+def test_degrees_the_data_cannot_support_are_nan():
+    trends = fit_trendlines([4e-7, 5e-7, 5e-7], [1e-15, 2e-15, 2.1e-15])
+    assert np.isfinite(trends.coefficients[0]).all()  # Two distinct x values: a line
+    assert np.isnan(trends.coefficients[1:]).all()
+    assert np.isnan(fit_trendlines([4e-7], [1e-15]).rss).all()
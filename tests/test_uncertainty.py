@@ -0,0 +1,68 @@
+from statistics import NormalDist
+import warnings
+
+import numpy as np
+import pytest
+
+from estimator import ragged_to_flat
+from uncertainty import bootstrap_speeds, jackknife_speeds
+
+
+def test_jackknife_matches_brute_force():
+    rng = np.random.default_rng(0)
+    xs = [rng.uniform(400e-9, 700e-9, n) for n in (6, 25)]
+    ys = [x / 2.998e8 * (1 + rng.normal(0, 0.01, len(x))) for x in xs]
+    result = jackknife_speeds(*ragged_to_flat(xs, ys))
+
+    z = NormalDist().inv_cdf(0.975)
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        n = len(x)
+        loo = np.array([1 / np.polyfit(np.delete(x, j), np.delete(y, j), 1)[0] for j in range(n)])
+        error = z * np.sqrt((n - 1) / n * np.sum((loo - loo.mean()) ** 2))
+        speed = 1 / np.polyfit(x, y, 1)[0]
+        assert result.low[i] == pytest.approx(speed - error, rel=1e-9)
+        assert result.high[i] == pytest.approx(speed + error, rel=1e-9)
+
+
+def test_jackknife_empty_and_short_readings_have_no_interval():
+    x = np.linspace(400e-9, 700e-9, 6)
+    y = x / 2.998e8 * (1 + np.array([1, -2, 1, 0, 2, -1]) * 1e-3)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = jackknife_speeds(x, y, [0, 0, 4, 4, 6])
+    assert np.isnan(result.low[[0, 2, 3]]).all()
+    assert result.low[1] < result.speeds[1] < result.high[1]
+    assert result.average == result.speeds[1]
+
+
+def test_bootstrap_interval_contains_the_fit():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(400e-9, 700e-9, 50)
+    y = x / 2.998e8 * (1 + rng.normal(0, 0.01, 50))
+    result = bootstrap_speeds(x, y, [0, 50], n_resamples=500, seed=2, workers=1)
+    assert result.low[0] < result.speeds[0] < result.high[0]
+    assert result.average_low < result.average < result.average_high
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bootstrap_ignores_replicates_without_a_slope(seed):
+    # Three points: many replicates draw one point three times, whose centred
+    # Σxx is pure round-off and must not turn into a zero slope or c = ∞
+    x = np.array([410, 520, 630.0]) * 1e-9
+    y = 1 / (np.array([731, 576.5, 475.9]) * 1e12)
+    result = bootstrap_speeds(x, y, [0, 3], n_resamples=2000, seed=seed, workers=1)
+    values = [result.low[0], result.high[0], result.average_low, result.average_high]
+    assert np.isfinite(values).all()
+    assert 2.9e8 < result.low[0] <= result.speeds[0] <= result.high[0] < 3.1e8
+
+
+def test_bootstrap_stops_when_checked():
+    class Stop(Exception):
+        pass
+
+    def check():
+        raise Stop()
+
+    x = np.linspace(400e-9, 700e-9, 10)
+    with pytest.raises(Stop):
+        bootstrap_speeds(x, x / 3e8, [0, 10], n_resamples=100, workers=1, check=check)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from importer import import_file
+from readings import ReadingStore
+from units import DEFAULT, FREQUENCY_UNITS, PERIOD_UNITS, WAVELENGTH_UNITS, Conversion
+
+WAVELENGTHS_NM = np.array([400.0, 550.0, 700.0])
+FREQUENCIES_THZ = 299792.458 / WAVELENGTHS_NM
+
+
+@pytest.mark.parametrize("wavelength_unit", list(WAVELENGTH_UNITS))
+@pytest.mark.parametrize("frequency_unit", list(FREQUENCY_UNITS) + list(PERIOD_UNITS))
+def test_round_trip(wavelength_unit, frequency_unit):
+    conversion = Conversion(wavelength_unit, frequency_unit)
+    x, y = DEFAULT.apply(WAVELENGTHS_NM, FREQUENCIES_THZ)
+    wavelengths, second = conversion.to_input(x, y)
+    x2, y2 = conversion.apply(wavelengths, second)
+    np.testing.assert_allclose(x2, x, rtol=1e-14)
+    np.testing.assert_allclose(y2, y, rtol=1e-14)
+
+
+def test_default_is_nm_and_thz():
+    x, y = DEFAULT.apply(WAVELENGTHS_NM, FREQUENCIES_THZ)
+    np.testing.assert_allclose(x, WAVELENGTHS_NM * 1e-9)
+    np.testing.assert_allclose(y, 1 / (FREQUENCIES_THZ * 1e12))
+
+
+def test_apply_in_place():
+    wavelengths, frequencies = WAVELENGTHS_NM.copy(), FREQUENCIES_THZ.copy()
+    x, y = Conversion("nm", "THz").apply(wavelengths, frequencies, out=(wavelengths, frequencies))
+    assert x is wavelengths and y is frequencies
+    np.testing.assert_allclose(y, 1 / (FREQUENCIES_THZ * 1e12))
+
+
+def test_uncertainties_propagate_through_the_reciprocal():
+    _, y = DEFAULT.apply(WAVELENGTHS_NM, FREQUENCIES_THZ)
+    sigma_x, sigma_y = DEFAULT.apply_uncertainties(np.full(3, 0.5), np.full(3, 2.0), y)
+    np.testing.assert_allclose(sigma_x, 0.5e-9)
+    np.testing.assert_allclose(sigma_y, 2e12 * y * y)
+    _, sigma_period = Conversion("nm", "fs").apply_uncertainties(np.full(3, 0.5), np.full(3, 2.0), y)
+    np.testing.assert_allclose(sigma_period, 2e-15)
+
+
+def test_aliases_and_unknown_units():
+    assert Conversion("A", "GHz") == Conversion("Å", "GHz")
+    assert Conversion("um", "fs").period
+    with pytest.raises(ValueError):
+        Conversion("nm", "kHz")
+
+
+def test_import_converts_in_the_store(tmp_path):
+    path = tmp_path / "readings.csv"
+    np.savetxt(path, np.column_stack([WAVELENGTHS_NM * 10, FREQUENCIES_THZ * 1e3, [1, 1, 2]]),
+               delimiter=",")
+    store = ReadingStore(("x", "y", "sx", "sy"))
+    store.append([1.0], [2.0], [np.nan], [np.nan])
+    assert import_file(store, str(path), conversion=Conversion("Å", "GHz")) == [1, 2]
+    x, y = DEFAULT.apply(WAVELENGTHS_NM, FREQUENCIES_THZ)
+    np.testing.assert_allclose(store.column("x")[1:], x)
+    np.testing.assert_allclose(store.column("y")[1:], y)
+    assert store.column("x")[0] == 1.0  # Earlier readings are left alone
@@ -0,0 +1,51 @@
+from kivy.base import EventLoop
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.tests.common import UnitTestTouch
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.widget import Widget
+
+from widgets import TouchScrollView
+
+
+class Recorder(Widget):
+    """Stands in for the plot: keeps the local position of every touch it takes."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.touches = []
+
+    def on_touch_down(self, touch):
+        if self.collide_point(*touch.pos):
+            self.touches.append(tuple(touch.pos))
+            return True
+        return False
+
+
+def test_touch_reaches_a_child_of_a_scrolled_page():
+    EventLoop.ensure_window()
+    page = BoxLayout(orientation='vertical', size_hint_y=None, height=2000)
+    plot = Recorder(size_hint_y=None, height=300)
+    page.add_widget(Widget(size_hint_y=None, height=800))
+    page.add_widget(plot)
+    page.add_widget(Widget(size_hint_y=None, height=900))
+    scroll = TouchScrollView(size_hint=(None, None), size=(400, 600), pos=(0, 0))
+    scroll.add_widget(page)
+    scroll.touch_widgets.append(plot)
+    Window.add_widget(scroll)
+    try:
+        for _ in range(3):
+            Clock.tick()
+        scroll.scroll_y = 0.5  # The plot (y 900-1200 in the page) now shows at window y 200-500
+        for _ in range(3):
+            Clock.tick()
+        assert plot.y == 900
+
+        touch = UnitTestTouch(200, 250)
+        touch.touch_down()
+        touch.touch_up()
+        assert len(plot.touches) == 1
+        x, y = plot.touches[0]
+        assert x == 200 and 900 < y < 1200
+    finally:
+        Window.remove_widget(scroll)
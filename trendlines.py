@@ -0,0 +1,77 @@
+"""Polynomial trendlines of several degrees from one QR factorization.
+
+graph.py called np.polyfit once per degree. Here the Vandermonde matrix for
+the highest degree is factored once; because its columns are nested, the
+first d+1 columns of Q and the leading block of R already solve the
+degree-d fit, and every degree's residual sum of squares follows from the
+same projection. Nothing in here imports Kivy.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+DEGREES = (1, 2, 3)
+GRID_POINTS = 100  # Samples per drawn curve, as graph.py used
+
+Trendlines = namedtuple(
+    "Trendlines",
+    ["degrees", "coefficients", "rss", "aic", "center", "scale", "x_range"]
+)
+
+
+def fit_trendlines(x, y, degrees=DEGREES):
+    """Least-squares polynomials of every degree in ``degrees`` through (x, y).
+
+    x is centred and scaled to [-1, 1] before the Vandermonde matrix is
+    built; at λ ~ 1e-7 the raw powers would be hopelessly ill-conditioned.
+    ``coefficients`` has one row per degree in increasing powers of
+    (x - center) / scale, zero-padded to the highest degree. Degrees the
+    data cannot support (no more points than coefficients) get NaN rows.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    degrees = tuple(degrees)
+    top = max(degrees)
+    n = len(x)
+
+    low, high = (x.min(), x.max()) if n else (np.nan, np.nan)
+    center = (low + high) / 2
+    scale = (high - low) / 2 if high > low else 1.0
+    u = (x - center) / scale
+
+    coefficients = np.full((len(degrees), top + 1), np.nan)
+    rss = np.full(len(degrees), np.nan)
+    aic = np.full(len(degrees), np.nan)
+    usable = min(top, len(np.unique(u)) - 1)
+    if usable < 1:
+        return Trendlines(degrees, coefficients, rss, aic, center, scale, (low, high))
+
+    q, r = np.linalg.qr(np.vander(u, usable + 1, increasing=True))
+    projection = q.T @ y
+    # Residual of the largest fit, computed directly; each lower degree
+    # leaves out more of the projection, which adds back onto it
+    top_rss = np.sum((y - q @ projection) ** 2)
+    left_out = np.r_[np.cumsum(projection[::-1] ** 2)[::-1], 0.0]
+
+    for i, degree in enumerate(degrees):
+        if degree > usable:
+            continue
+        k = degree + 1
+        coefficients[i] = 0.0
+        coefficients[i, :k] = np.linalg.solve(r[:k, :k], projection[:k])
+        rss[i] = top_rss + left_out[k]
+        if n > k:
+            with np.errstate(divide="ignore"):
+                aic[i] = n * np.log(rss[i] / n) + 2 * k
+    return Trendlines(degrees, coefficients, rss, aic, center, scale, (low, high))
+
+
+def trendline_curves(trends, points=GRID_POINTS):
+    """Evaluates every trendline on one shared grid over the data's x range.
+
+    Returns ``(x_grid, curves)`` with one row of ``curves`` per degree.
+    """
+    x_grid = np.linspace(*trends.x_range, points)
+    u = (x_grid - trends.center) / trends.scale
+    basis = np.vander(u, trends.coefficients.shape[1], increasing=True)
+    return x_grid, trends.coefficients @ basis.T
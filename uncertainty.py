@@ -0,0 +1,230 @@
+"""Bootstrap and jackknife confidence intervals for the speed of light.
+
+Readings are passed CSR-packed (flat x, y plus offsets), the same layout
+``estimator.fit_flat`` and ``ReadingStore.flat`` use.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import os
+import warnings
+
+import numpy as np
+
+from estimator import fit_flat, ragged_to_flat, segment_sums
+
+SpeedIntervals = namedtuple(
+    "SpeedIntervals",
+    ["speeds", "low", "high", "average", "average_low", "average_high", "method"]
+)
+
+MAX_CELLS = 1 << 22  # Resampled values held at once per worker (~32 MB per array)
+PARALLEL_CELLS = 1 << 24  # Below this much work a process pool costs more than it saves
+BOOTSTRAP_CELLS = 1 << 25  # Above this many resampled values, speed_intervals uses the jackknife
+SPREAD_TOLERANCE = 1e-9  # Replicates whose x spread is below this fraction of Σ(x - x̄)² have no slope
+
+
+def _segments(offsets):
+    counts = np.diff(offsets)
+    nonempty = counts > 0
+    return counts, nonempty, np.repeat(np.arange(len(counts)), counts)
+
+
+def _bootstrap_slopes(x, y, offsets, n_resamples, seed, check=None):
+    """Slopes of ``n_resamples`` bootstrap replicates, shape (n_resamples, readings).
+
+    Every replicate resamples each reading's points with replacement. A block
+    of replicates is drawn as one index matrix, turned into per-point counts
+    with a single bincount, and the resampled sums of x, y, x² and xy for all
+    replicates come out of one matrix product per reading. Replicates that
+    drew fewer than two distinct points, or whose points share one
+    wavelength, have no slope and are NaN: their centred Σxx is only
+    round-off, which would otherwise turn into a wild or infinite c.
+    ``check``, if given, is called before every block; raising from it
+    abandons the resampling.
+    """
+    rng = np.random.default_rng(seed)
+    counts, nonempty, segment = _segments(offsets)
+    total = len(x)
+    slopes = np.full((n_resamples, len(counts)), np.nan)
+    if total == 0:
+        return slopes
+
+    # Moments about each reading's own mean keep the raw sums well conditioned
+    with np.errstate(invalid="ignore"):
+        mean_x = segment_sums(x, offsets) / counts
+        mean_y = segment_sums(y, offsets) / counts
+    xc = x - mean_x[segment]
+    yc = y - mean_y[segment]
+    moments = np.column_stack([xc, yc, xc * xc, xc * yc])
+
+    block = max(1, MAX_CELLS // total)
+    base = offsets[:-1][segment]
+    size = counts[segment]
+    n = counts.astype(np.float64)
+    for first in range(0, n_resamples, block):
+        if check is not None:
+            check()
+        rows = min(block, n_resamples - first)
+        # Index matrix: column j picks a random point from the reading j belongs to
+        idx = base + (rng.random((rows, total)) * size).astype(np.int64)
+        idx += (np.arange(rows, dtype=np.int64) * total)[:, None]
+        weights = np.bincount(idx.ravel(), minlength=rows * total).reshape(rows, total)
+        weights = weights.astype(np.float64)
+
+        for g in np.flatnonzero(nonempty):
+            a, b = offsets[g], offsets[g + 1]
+            sx, sy, sxx, sxy = (weights[:, a:b] @ moments[a:b]).T
+            distinct = np.count_nonzero(weights[:, a:b], axis=1)  # Points drawn at least once
+            with np.errstate(invalid="ignore", divide="ignore"):
+                centred_xx = sxx - sx * sx / n[g]
+                centred_xy = sxy - sx * sy / n[g]
+                spread = (distinct >= 2) & (centred_xx > SPREAD_TOLERANCE * sxx)
+                slopes[first:first + rows, g] = np.where(spread, centred_xy / centred_xx, np.nan)
+    return slopes
+
+
+def _percentile_intervals(speeds, fits, method, confidence):
+    """Builds SpeedIntervals from replicate speeds of shape (replicates, readings)."""
+    tail = (1 - confidence) / 2 * 100
+    speeds = np.where(np.isfinite(speeds), speeds, np.nan)  # A zero slope must not count as c = ∞
+    with warnings.catch_warnings():
+        # Replicates that drew a single distinct wavelength have no slope
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanpercentile(speeds, [tail, 100 - tail], axis=0)
+        averages = np.nanmean(speeds, axis=1)
+        average_low, average_high = np.nanpercentile(averages, [tail, 100 - tail])
+    return SpeedIntervals(fits.speeds, low, high, np.nanmean(fits.speeds),
+                          average_low, average_high, method)
+
+
+def _replicate_speeds(x, y, offsets, n_resamples, seed, workers, check=None):
+    """Bootstrap replicate speeds, shape (n_resamples, readings), over ``workers`` processes."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if n_resamples * len(x) < PARALLEL_CELLS:
+        workers = 1
+
+    # Independent streams per block, so results do not depend on scheduling
+    blocks = min(workers, n_resamples)
+    sizes = [n_resamples // blocks + (i < n_resamples % blocks) for i in range(blocks)]
+    seeds = np.random.SeedSequence(seed).spawn(blocks)
+    if workers == 1:
+        parts = [_bootstrap_slopes(x, y, offsets, size, s, check) for size, s in zip(sizes, seeds)]
+    else:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_bootstrap_slopes, [x] * blocks, [y] * blocks,
+                                      [offsets] * blocks, sizes, seeds))
+        except (OSError, NotImplementedError):
+            # No process support (e.g. Android without sem_open): run the same blocks here
+            parts = [_bootstrap_slopes(x, y, offsets, size, s, check) for size, s in zip(sizes, seeds)]
+
+    with np.errstate(divide="ignore"):
+        return 1 / np.concatenate(parts)
+
+
+def _cached_replicate_speeds(x, y, offsets, n_resamples, seed, workers, cache, keys, check=None):
+    """Like _replicate_speeds, but resamples only the readings ``cache`` has no replicates for.
+
+    Readings are resampled independently of each other, so replicates drawn
+    in different runs still pair up into valid replicates of the average.
+    """
+    speeds = np.empty((n_resamples, len(offsets) - 1))
+    params = ("bootstrap", n_resamples, seed)
+    missing = []
+    for i, key in enumerate(keys):
+        replicates = cache.get((key, params))
+        if replicates is None:
+            missing.append(i)
+        else:
+            speeds[:, i] = replicates
+    if missing:
+        sub_x, sub_y, sub_offsets = ragged_to_flat([x[offsets[i]:offsets[i + 1]] for i in missing],
+                                                   [y[offsets[i]:offsets[i + 1]] for i in missing])
+        fresh = _replicate_speeds(sub_x, sub_y, sub_offsets, n_resamples, seed, workers, check)
+        for j, i in enumerate(missing):
+            speeds[:, i] = fresh[:, j]
+            cache.put((keys[i], params), fresh[:, j].copy())
+    return speeds
+
+
+def bootstrap_speeds(x, y, offsets, n_resamples=1000, confidence=0.95, seed=None, workers=None,
+                     cache=None, keys=None, check=None):
+    """Percentile bootstrap intervals for c per reading and for the average of c.
+
+    Large jobs are split into blocks of replicates spread over a process pool
+    with ``workers`` processes (default: one per CPU). Pass ``workers=1`` to
+    stay in-process, e.g. from a GUI that must not fork.
+
+    Given a ``cache`` (memo.ContentCache) and each reading's content digest
+    in ``keys``, every reading's replicates are kept there, and only readings
+    not seen before are resampled.
+
+    ``check`` is called between blocks of in-process replicates (it is not
+    passed to pool workers); raising from it, e.g. because the result is no
+    longer wanted, abandons the job.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    fits = fit_flat(x, y, offsets)
+    if cache is None:
+        speeds = _replicate_speeds(x, y, offsets, n_resamples, seed, workers, check)
+    else:
+        speeds = _cached_replicate_speeds(x, y, offsets, n_resamples, seed, workers, cache, keys, check)
+    return _percentile_intervals(speeds, fits, "bootstrap", confidence)
+
+
+def jackknife_speeds(x, y, offsets, confidence=0.95):
+    """Leave-one-out jackknife intervals for c, in closed form in O(total points).
+
+    Removing point i from a reading changes its centred sums by
+    n/(n-1)·dx_i² and n/(n-1)·dx_i·dy_i, so every leave-one-out slope comes
+    from one vectorized pass without refitting.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    fits = fit_flat(x, y, offsets)
+    counts, _, segment = _segments(offsets)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = counts[segment].astype(np.float64)
+        mean_x = segment_sums(x, offsets) / counts
+        mean_y = segment_sums(y, offsets) / counts
+        dx = x - mean_x[segment]
+        dy = y - mean_y[segment]
+        sxx = segment_sums(dx * dx, offsets)
+        sxy = segment_sums(dx * dy, offsets)
+
+        shrink = n / (n - 1)
+        loo_speeds = (sxx[segment] - shrink * dx * dx) / (sxy[segment] - shrink * dx * dy)
+        loo_speeds[counts[segment] < 3] = np.nan  # Leaving one out must still leave a line
+
+        # Jackknife variance: (n-1)/n · Σ(c_i - c̄)² per reading; empty readings come out NaN
+        loo_mean = segment_sums(loo_speeds, offsets) / counts
+        spread = (loo_speeds - loo_mean[segment]) ** 2
+        variance = segment_sums(spread, offsets) * (counts - 1) / counts
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    error = z * np.sqrt(variance)
+    valid = np.isfinite(fits.speeds) & np.isfinite(error)
+    average = np.mean(fits.speeds[valid]) if valid.any() else np.nan
+    # Readings are independent, so the average's variance is Σvar / k²
+    average_error = z * np.sqrt(np.sum(variance[valid])) / valid.sum() if valid.any() else np.nan
+    return SpeedIntervals(fits.speeds, fits.speeds - error, fits.speeds + error, average,
+                          average - average_error, average + average_error, "jackknife")
+
+
+def speed_intervals(x, y, offsets, n_resamples=2000, confidence=0.95, seed=None, workers=None,
+                    cache=None, keys=None, check=None):
+    """Bootstrap intervals when the resampling is affordable, jackknife ones otherwise.
+
+    The bootstrap costs n_resamples passes over every point; past
+    BOOTSTRAP_CELLS the closed-form jackknife gives an interval in a single
+    pass instead. ``cache``, ``keys`` and ``check`` are passed on to bootstrap_speeds.
+    """
+    if n_resamples * len(x) > BOOTSTRAP_CELLS:
+        return jackknife_speeds(x, y, offsets, confidence)
+    return bootstrap_speeds(x, y, offsets, n_resamples, confidence, seed, workers, cache, keys, check)
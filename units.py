@@ -0,0 +1,118 @@
+"""Conversion of instrument units to the store's SI columns.
+
+The store keeps x = λ in meters and y = 1/ν, the period, in seconds. A
+Conversion is declared by the units the numbers arrive in:
+
+    Conversion("nm", "THz")   # the app's default, as typed into the fields
+    Conversion("Å", "GHz")
+    Conversion("µm", "fs")    # periods instead of frequencies
+
+Wavelength units are Å, nm and µm; the second unit is either a frequency
+(Hz, GHz, THz) or, for period input, a time (s, ps, fs). The unit factors
+are folded together when the Conversion is built, so each column becomes a
+single numpy operation: x = λ·a, and y = b/ν for frequencies (the scaling
+and the reciprocal fused) or y = T·b for periods. ``apply`` runs them
+without intermediate arrays, and with ``out`` set to the inputs it
+converts a buffer in place. Nothing in here imports Kivy.
+"""
+import numpy as np
+
+WAVELENGTH_UNITS = {"Å": 1e-10, "nm": 1e-9, "µm": 1e-6}  # Meters per unit
+FREQUENCY_UNITS = {"Hz": 1.0, "GHz": 1e9, "THz": 1e12}  # Hertz per unit
+PERIOD_UNITS = {"s": 1.0, "ps": 1e-12, "fs": 1e-15}  # Seconds per unit
+ALIASES = {"A": "Å", "angstrom": "Å", "um": "µm", "μm": "µm", "micron": "µm"}  # ASCII and Greek-mu spellings
+
+
+def _unit(name, units, kind):
+    name = ALIASES.get(name.strip(), name.strip())
+    if name not in units:
+        raise ValueError(f"Unknown {kind} unit {name!r}; use one of {', '.join(units)}.")
+    return name
+
+
+class Conversion:
+    """From (wavelength, frequency or period) in the given units to SI (x, y)."""
+
+    def __init__(self, wavelength_unit="nm", frequency_unit="THz"):
+        self.wavelength_unit = _unit(wavelength_unit, WAVELENGTH_UNITS, "wavelength")
+        self.frequency_unit = _unit(frequency_unit, {**FREQUENCY_UNITS, **PERIOD_UNITS}, "frequency or period")
+        self.period = self.frequency_unit in PERIOD_UNITS
+        self.x_factor = WAVELENGTH_UNITS[self.wavelength_unit]
+        if self.period:
+            self.y_factor = PERIOD_UNITS[self.frequency_unit]  # y = T·b
+        else:
+            self.y_factor = 1 / FREQUENCY_UNITS[self.frequency_unit]  # y = b/ν, the reciprocal included
+
+    def __repr__(self):
+        return f"Conversion({self.wavelength_unit!r}, {self.frequency_unit!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Conversion) and (self.wavelength_unit, self.frequency_unit) == (
+            other.wavelength_unit, other.frequency_unit)
+
+    def __hash__(self):
+        return hash((self.wavelength_unit, self.frequency_unit))
+
+    @property
+    def steps(self):
+        """The pipeline as (column, operation, constant), one step per column."""
+        return (("x", "multiply", self.x_factor),
+                ("y", "multiply" if self.period else "divide constant by", self.y_factor))
+
+    @property
+    def second_quantity(self):
+        """What the second column holds: "Period" or "Frequency"."""
+        return "Period" if self.period else "Frequency"
+
+    def apply(self, wavelengths, seconds_column, out=None):
+        """Returns (x, y) in SI units, each computed in one pass.
+
+        ``out`` is an (x, y) pair of float64 arrays to write into; passing the
+        inputs themselves converts them in place.
+        """
+        x_out, y_out = out if out is not None else (None, None)
+        x = np.multiply(wavelengths, self.x_factor, out=x_out)
+        if self.period:
+            y = np.multiply(seconds_column, self.y_factor, out=y_out)
+        else:
+            y = np.divide(self.y_factor, seconds_column, out=y_out)
+        return x, y
+
+    def to_input(self, x, y):
+        """The inverse of ``apply``: (wavelength, frequency or period) in this Conversion's units."""
+        wavelengths = np.divide(x, self.x_factor)
+        if self.period:
+            return wavelengths, np.divide(y, self.y_factor)
+        return wavelengths, np.divide(self.y_factor, y)
+
+    def apply_uncertainties(self, sigma_wavelength, sigma_second, y, out=None):
+        """Returns (σx, σy) in SI units for standard uncertainties in the input units.
+
+        ``y`` is the already converted column. For frequencies the error
+        propagates through the reciprocal, σ(1/ν) = σν/ν² = σν·y²; periods
+        scale like their values.
+        """
+        sx_out, sy_out = out if out is not None else (None, None)
+        sigma_x = np.multiply(sigma_wavelength, self.x_factor, out=sx_out)
+        if self.period:
+            sigma_y = np.multiply(sigma_second, self.y_factor, out=sy_out)
+        else:
+            sigma_y = np.multiply(sigma_second, 1 / self.y_factor, out=sy_out)
+            sigma_y *= y
+            sigma_y *= y
+        return sigma_x, sigma_y
+
+    def apply_in_store(self, store, start, columns=("x", "y", "sx", "sy")):
+        """Converts every point of ``store`` from ``start`` on, in place in its buffers.
+
+        ``columns`` names the wavelength and second columns, then optionally
+        their uncertainty columns; those the store lacks are skipped.
+        """
+        names = [name for name in columns if name in store.columns]
+        views = [store.column(name)[start:] for name in names]
+        x, y = self.apply(views[0], views[1], out=(views[0], views[1]))
+        if len(views) == 4:
+            self.apply_uncertainties(views[2], views[3], y, out=(views[2], views[3]))
+
+
+DEFAULT = Conversion()  # nm and THz, the units the app has always used
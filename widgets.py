@@ -0,0 +1,130 @@
+"""Reusable Kivy widgets for the calculator screens."""
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.scrollview import ScrollView
+from kivy.utils import get_color_from_hex
+
+
+class RowLabel(Label):
+    """One left-aligned, wrapped text row inside a RowList."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.halign = 'left'
+        self.valign = 'top'
+        self.color = get_color_from_hex('#E1F5FE')
+        self.bind(width=lambda instance, width: setattr(self, 'text_size', (width, None)))
+
+
+class RowList(RecycleView):
+    """Virtualized list of text rows: only the rows in view get widgets and textures.
+
+    Rows are plain dicts with a ``text`` key and an optional ``height``.
+    """
+
+    def __init__(self, row_height=dp(40), **kwargs):
+        super().__init__(**kwargs)
+        self.viewclass = RowLabel
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            default_size=(None, row_height),
+            default_size_hint=(1, None)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.row_height = row_height
+
+    def set_row(self, index, text, height=None):
+        """Replaces row ``index``, appending it when it is one past the end."""
+        row = {'text': text, 'height': height or self.row_height}
+        if index == len(self.data):
+            self.data.append(row)
+        else:
+            self.data[index] = row
+
+    def scroll_to_end(self):
+        """Shows the newest rows."""
+        self.scroll_y = 0
+
+
+class TouchScrollView(ScrollView):
+    """ScrollView that leaves touches starting on some children to those children.
+
+    A plot being panned or pinched needs every move of the touch; a plain
+    ScrollView would take a drag that starts on it as a page scroll.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.touch_widgets = []
+
+    def on_touch_down(self, touch):
+        for widget in self.touch_widgets:
+            if widget.get_root_window() is not None and widget.collide_point(*widget.to_widget(*touch.pos)):
+                # Skip the scroll detection and hand the touch straight down the tree,
+                # in the scrolled content's coordinates as ScrollView itself would
+                touch.push()
+                touch.apply_transform_2d(self.to_local)
+                try:
+                    return super(ScrollView, self).on_touch_down(touch)
+                finally:
+                    touch.pop()
+        return super().on_touch_down(touch)
+
+
+class TimingOverlay(BoxLayout):
+    """Debug panel listing the latest timing spans, refreshed twice a second while shown."""
+
+    def __init__(self, tracer, rows=12, on_export=None, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        self.tracer = tracer
+        self.rows = rows
+        self._refresh_event = None
+        self.label = Label(
+            font_name='RobotoMono-Regular',
+            font_size=dp(11),
+            halign='left',
+            valign='top',
+            color=get_color_from_hex('#B2FF59')
+        )
+        self.label.bind(size=self.label.setter('text_size'))
+        self.export_button = Button(
+            text="Export Trace (JSON)",
+            size_hint_y=None,
+            height=dp(30),
+            background_color=get_color_from_hex('#01579B'),
+            background_normal=''
+        )
+        if on_export is not None:
+            self.export_button.bind(on_press=on_export)
+        self.add_widget(self.label)
+        self.add_widget(self.export_button)
+
+    def start(self):
+        """Turns tracing on and keeps the list current."""
+        self.tracer.enabled = True
+        if self._refresh_event is None:
+            self._refresh_event = Clock.schedule_interval(self.refresh, 0.5)
+        self.refresh()
+
+    def stop(self):
+        """Turns tracing off; already recorded spans stay available for export."""
+        self.tracer.enabled = False
+        if self._refresh_event is not None:
+            self._refresh_event.cancel()
+            self._refresh_event = None
+
+    def refresh(self, dt=None):
+        spans = self.tracer.latest(self.rows)
+        if not spans:
+            self.label.text = "Timings appear here as you add, plot and calculate."
+            return
+        self.label.text = "\n".join(
+            f"{s.duration * 1e3:9.2f} ms  {s.name:<16} {s.thread}" for s in spans
+        )